@@ -0,0 +1,8 @@
+"""
+In-process benchmarks for betterweb.
+
+The suite drives `App.__call__` with synthetic ASGI scopes, `receive`s and `send`s, so no sockets or servers are involved.
+
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare main HEAD --threshold 0.1
+"""
@@ -0,0 +1,205 @@
+import typing as t
+import os
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from .harness import CASES, Result, Skip, measure, metadata, format_time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(args: argparse.Namespace) -> int:
+    results: list[Result] = []
+    skipped: dict[str, str] = {}
+    try:
+        from . import cases  # noqa: F401  # Registers the cases
+    except Exception as exc:
+        # An older betterweb that does not import here, e.g. one that reads its files by Windows paths
+        error: t.Optional[str] = repr(exc)
+        print(f"# betterweb could not be imported: {error}", flush=True)
+    else:
+        error = None
+
+    selected = [c for c in CASES if not args.filter or any(f in c.name for f in args.filter)]
+    loop = asyncio.new_event_loop()
+    try:
+        for bench in selected:
+            try:
+                result = measure(bench, loop, args.repeat, args.min_time)
+            except Skip as exc:
+                skipped[bench.name] = str(exc)
+                print(f"{bench.name:<32}{'skipped':>12}  {exc}", flush=True)
+                continue
+            results.append(result)
+            print(
+                f"{result['name']:<32}{format_time(result['median']):>12}"
+                f" ±{format_time(result['iqr']):>10}{result['ops']:>14,.0f} ops/s"
+                + "".join(f"  ({note})" for note in result["notes"]),
+                flush=True,
+            )
+    finally:
+        loop.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"metadata": metadata(), "error": error, "results": results, "skipped": skipped},
+                f,
+                indent=2,
+            )
+    return 0
+
+
+def run_revision(revision: str, args: argparse.Namespace, output: str):
+    """
+    Runs the current suite against the `betterweb` of `revision`, checked out in a temporary worktree.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        tree = os.path.join(directory, "tree")
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", tree, revision],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+        )
+        try:
+            # Import this suite from here, then betterweb from the worktree, so a betterweb that fails to
+            # import is reported by the suite rather than ending the comparison
+            code = (
+                "import sys\n"
+                f"sys.path.insert(0, {ROOT!r})\n"
+                "from benchmarks.__main__ import main\n"
+                f"sys.path[0] = {tree!r}\n"
+                "sys.exit(main())\n"
+            )
+            command = [sys.executable, "-c", code, "run", "--output", output]
+            command += ["--repeat", str(args.repeat), "--min-time", str(args.min_time)]
+            for name in args.filter or []:
+                command += ["--filter", name]
+            print(f"# {revision}", flush=True)
+            subprocess.run(command, cwd=tree, check=True)
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", tree], cwd=ROOT, capture_output=True
+            )
+
+
+class Run(t.NamedTuple):
+    results: "dict[str, Result]"
+    # Why cases did not run, by name
+    skipped: "dict[str, str]"
+    # Why betterweb could not be imported, if it could not
+    error: t.Optional[str]
+
+
+def load(source: str, args: argparse.Namespace, directory: str) -> Run:
+    if source.endswith(".json") and os.path.exists(source):
+        with open(source) as f:
+            data = json.load(f)
+    else:
+        output = os.path.join(directory, f"{len(os.listdir(directory))}.json")
+        run_revision(source, args, output)
+        with open(output) as f:
+            data = json.load(f)
+
+    def selected(name: str) -> bool:
+        return not args.filter or any(f in name for f in args.filter)
+
+    return Run(
+        {result["name"]: result for result in data["results"] if selected(result["name"])},
+        {name: reason for name, reason in data.get("skipped", {}).items() if selected(name)},
+        data.get("error"),
+    )
+
+
+def compare(args: argparse.Namespace) -> int:
+    """
+    Compares the medians of two result files or git revisions, exiting with 1 if any case got slower than `threshold`.
+    Cases one side skipped are listed with the reason, and fallbacks either side took are shown under the case.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        base = load(args.base, args, directory)
+        head = load(args.head, args, directory)
+
+    for label, side in (("base", base), ("head", head)):
+        if side.error is not None:
+            print(f"# {label}: betterweb could not be imported: {side.error}")
+
+    regressions = 0
+    print(f"{'case':<32}{'base':>12}{'head':>12}{'change':>10}")
+    for name in [*head.results, *head.skipped]:
+        before = base.results.get(name)
+        after = head.results.get(name)
+        if after is None:
+            print(f"{name:<32}{'':>12}{'skipped':>12}{'':>10}  {head.skipped[name]}")
+            continue
+        if before is None:
+            reason = base.skipped.get(name)
+            if reason is None and base.error is not None:
+                reason = "betterweb could not be imported"
+            if reason is None:
+                print(f"{name:<32}{'':>12}{format_time(after['median']):>12}{'new':>10}")
+            else:
+                print(f"{name:<32}{'skipped':>12}{format_time(after['median']):>12}{'':>10}  {reason}")
+            continue
+
+        change = after["median"] / before["median"] - 1
+        # Changes within the noise of either run are not regressions
+        noise = max(before["iqr"] / before["median"], after["iqr"] / after["median"])
+        flag = ""
+        if change > args.threshold and change > noise:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -args.threshold and -change > noise:
+            flag = "  faster"
+        print(
+            f"{name:<32}{format_time(before['median']):>12}"
+            f"{format_time(after['median']):>12}{change:>+10.1%}{flag}"
+        )
+        for label, result in (("base", before), ("head", after)):
+            for note in result.get("notes", []):
+                print(f"{'':<4}{label}: {note}")
+
+    if regressions:
+        print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+def main(argv: t.Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite")
+    run_parser.add_argument("--output", help="Write the results to this JSON file")
+
+    compare_parser = commands.add_parser(
+        "compare", help="Compare two result files or git revisions"
+    )
+    compare_parser.add_argument("base", help="A results JSON file or git revision")
+    compare_parser.add_argument("head", help="A results JSON file or git revision")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1, help="Slowdown that counts as a regression"
+    )
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument(
+            "--filter", action="append", help="Only run cases whose name contains this"
+        )
+        sub.add_argument("--repeat", type=int, default=7, help="Samples per case")
+        sub.add_argument(
+            "--min-time", type=float, default=0.1, help="Minimum seconds per sample"
+        )
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return run(args)
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
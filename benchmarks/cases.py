@@ -0,0 +1,231 @@
+import msgspec as ms
+
+from betterweb import App, APIRoute, StaticRoute, Request, ResponseConstructor, Headers
+from .harness import Skip, case, note, http_scope, receiver, discard
+
+
+def app(api_routes=None, static_routes=None, **options) -> App:
+    application = App(api_routes or {}, {}, {}, static_routes or {}, **options)
+    # Older apps have no compile step and build their lookups on the first request instead
+    if hasattr(application, "compile"):
+        application.compile()
+    else:
+        note("App.compile missing, the first request compiles")
+    return application
+
+
+async def empty(request: Request, response: ResponseConstructor):
+    await response(b"")
+
+
+# Routing
+
+
+def routing(count: int):
+    def setup():
+        routes = {f"/route/{i}": APIRoute(["GET"], empty) for i in range(count)}
+        application = app(routes)
+        scope = http_scope(f"/route/{count // 2}")
+
+        async def op():
+            await application(scope, receiver([]), discard)
+
+        return op
+
+    return setup
+
+
+for count in (10, 1_000, 50_000):
+    case(f"routing.lookup[{count}]", "routing")(routing(count))
+
+
+@case("routing.fallback", "routing")
+def fallback():
+    application = app({f"/route/{i}": APIRoute(["GET"], empty) for i in range(1_000)})
+    scope = http_scope("/missing")
+
+    async def op():
+        await application(scope, receiver([]), discard)
+
+    return op
+
+
+# Static files
+
+
+def static(size: int):
+    def setup():
+        application = app(static_routes={"/file": StaticRoute("/file", b"x" * size, "text/plain")})
+        scope = http_scope("/file")
+
+        async def op():
+            await application(scope, receiver([]), discard)
+
+        return op
+
+    return setup
+
+
+for size in (1024, 1024 * 1024):
+    case(f"static.serve[{size}]", "static")(static(size))
+
+
+# JSON responses
+
+
+def payload(items: int):
+    return [{"id": i, "name": f"item {i}", "tags": ["a", "b"], "price": i * 1.5} for i in range(items)]
+
+
+def json_response(items: int):
+    def setup():
+        data = payload(items)
+
+        async def handler(request: Request, response: ResponseConstructor):
+            await response.json(data)
+
+        application = app({"/": APIRoute(["GET"], handler)})
+        scope = http_scope("/")
+
+        async def op():
+            await application(scope, receiver([]), discard)
+
+        return op
+
+    return setup
+
+
+for items in (1, 100, 10_000):
+    case(f"json.response[{items}]", "json")(json_response(items))
+
+
+# Request bodies
+
+
+class Item(ms.Struct):
+    id: int
+    name: str
+    tags: list[str]
+    price: float
+
+
+def chunks(body: bytes, count: int) -> list[bytes]:
+    size = -(-len(body) // count)
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+def json_body(count: int, typed: bool):
+    def setup():
+        body = ms.json.encode(payload(500))
+        parts = chunks(body, count)
+
+        if typed:
+
+            async def handler(request: Request, response: ResponseConstructor, items: list[Item]):
+                await response(b"")
+
+        else:
+
+            async def handler(request: Request, response: ResponseConstructor):
+                await request.json()
+                await response(b"")
+
+        application = app({"/": APIRoute(["POST"], handler)})
+        scope = http_scope(
+            "/",
+            "POST",
+            [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        )
+
+        async def op():
+            await application(scope, receiver(parts), discard)
+
+        return op
+
+    return setup
+
+
+for count in (1, 16, 256):
+    case(f"request.json[{count} chunks]", "body")(json_body(count, False))
+case("request.json[typed]", "body")(json_body(16, True))
+
+
+@case("request.body[spooled 4MB]", "body")
+def spooled():
+    parts = chunks(b"x" * 4 * 1024 * 1024, 64)
+
+    async def handler(request: Request, response: ResponseConstructor):
+        await request.file()
+        await response(b"")
+
+    application = app({"/": APIRoute(["POST"], handler)}, spool_size=1024 * 1024)
+    scope = http_scope("/", "POST")
+
+    async def op():
+        await application(scope, receiver(parts), discard)
+
+    return op
+
+
+# Headers and cookies
+
+RAW_HEADERS = [
+    (b"host", b"localhost:8000"),
+    (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"),
+    (b"accept", b"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"),
+    (b"accept-language", b"en-GB,en;q=0.9"),
+    (b"accept-encoding", b"gzip, deflate, br, zstd"),
+    (b"connection", b"keep-alive"),
+    (b"cache-control", b"max-age=0"),
+    (b"sec-fetch-dest", b"document"),
+    (b"sec-fetch-mode", b"navigate"),
+    (b"sec-fetch-site", b"none"),
+    (b"cookie", b"; ".join(f"name{i}=value{i}".encode() for i in range(10))),
+]
+
+
+@case("headers.lookup", "headers")
+def headers_lookup():
+    if not hasattr(Headers, "from_raw"):
+        raise Skip("Headers.from_raw missing")
+
+    def op():
+        headers = Headers.from_raw(RAW_HEADERS)
+        headers.get(b"accept")
+        headers.get(b"Accept-Encoding")
+        return b"authorization" in headers
+
+    return op
+
+
+@case("headers.build", "headers")
+def headers_build():
+    def op():
+        return Headers(
+            [("content-type", "application/json"), ("cache-control", "no-cache")],
+            server="betterweb",
+        ).raw()
+
+    return op
+
+
+@case("headers.copy", "headers")
+def headers_copy():
+    base = Headers([("content-type", "application/json")])
+
+    def op():
+        headers = base.copy()
+        headers.append("x-request-id", "1")
+        return headers.raw()
+
+    return op
+
+
+@case("cookies.parse", "headers")
+def cookies_parse():
+    scope = http_scope("/", headers=RAW_HEADERS)
+
+    def op():
+        return Request(scope, receiver([])).cookies  # type: ignore[arg-type]
+
+    return op
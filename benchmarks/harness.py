@@ -0,0 +1,211 @@
+import typing as t
+import gc
+import sys
+import time
+import random
+import inspect
+import asyncio
+import platform
+import statistics
+import subprocess
+
+
+class Case:
+    """
+    A benchmark. `setup` is called once and returns the operation to time, sync or async.
+    """
+
+    def __init__(self, name: str, group: str, setup: t.Callable[[], t.Callable[[], t.Any]]):
+        self.name = name
+        self.group = group
+        self.setup = setup
+
+
+CASES: list[Case] = []
+
+
+class Skip(Exception):
+    """
+    Raised by a setup when the betterweb being measured lacks what the case needs, such as an older revision in `compare`.
+    """
+
+
+# Fallbacks the current setup took, reported with its result
+NOTES: list[str] = []
+
+
+def note(message: str):
+    """
+    Records that the current setup fell back to an older API, so its result is not quite like for like.
+    """
+    NOTES.append(message)
+
+
+def case(name: str, group: str):
+    def register(setup: t.Callable[[], t.Callable[[], t.Any]]):
+        CASES.append(Case(name, group, setup))
+        return setup
+
+    return register
+
+
+class Result(t.TypedDict):
+    name: str
+    group: str
+    number: int
+    samples: list[float]
+    min: float
+    median: float
+    mean: float
+    stdev: float
+    iqr: float
+    ops: float
+    notes: list[str]
+
+
+def timer(op: t.Callable[[], t.Any], loop: asyncio.AbstractEventLoop) -> t.Callable[[int], int]:
+    """
+    Returns a function that runs `op` `number` times and returns the nanoseconds it took.
+    """
+    if inspect.iscoroutinefunction(op):
+
+        async def run(number: int):
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                await op()
+            return time.perf_counter_ns() - start
+
+        return lambda number: loop.run_until_complete(run(number))
+
+    def run_sync(number: int):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            op()
+        return time.perf_counter_ns() - start
+
+    return run_sync
+
+
+def measure(
+    bench: Case,
+    loop: asyncio.AbstractEventLoop,
+    repeat: int = 7,
+    min_time: float = 0.1,
+) -> Result:
+    """
+    Times `bench` `repeat` times. Each sample runs the operation enough times to take at least `min_time` seconds.
+    The garbage collector is paused while sampling and the random seed fixed, so runs are comparable.
+    Raises `Skip` if the case cannot run against this betterweb.
+    """
+    random.seed(0)
+    NOTES.clear()
+    run = timer(bench.setup(), loop)
+
+    # Find how many runs take min_time, which also warms up caches
+    number = 1
+    while True:
+        elapsed = run(number)
+        if elapsed >= min_time * 1e9 or number >= 1 << 24:
+            break
+        number *= 10 if elapsed < min_time * 1e8 else 2
+
+    samples = []
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            samples.append(run(number) / number)
+    finally:
+        if enabled:
+            gc.enable()
+
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+    median = statistics.median(samples)
+    return {
+        "name": bench.name,
+        "group": bench.group,
+        "number": number,
+        "samples": samples,
+        "min": min(samples),
+        "median": median,
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "iqr": quartiles[2] - quartiles[0],
+        "ops": 1e9 / median,
+        "notes": list(NOTES),
+    }
+
+
+def metadata() -> "dict[str, t.Any]":
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        "python": sys.version,
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "revision": revision,
+        "time": time.time(),
+    }
+
+
+def format_time(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f}{unit}"
+    return f"{ns:.0f}ns"
+
+
+# Synthetic ASGI
+
+
+def http_scope(
+    path: str = "/",
+    method: str = "GET",
+    headers: "t.Optional[list[tuple[bytes, bytes]]]" = None,
+    query_string: bytes = b"",
+) -> "dict[str, t.Any]":
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string,
+        "root_path": "",
+        "headers": headers if headers is not None else [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+
+def receiver(chunks: "list[bytes]") -> t.Callable[[], t.Awaitable[dict]]:
+    """
+    A `receive` that returns `chunks` as the request body, then a disconnect.
+    """
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks or [b""])
+    ]
+    position = 0
+
+    async def receive():
+        nonlocal position
+        if position < len(messages):
+            position += 1
+            return messages[position - 1]
+        return {"type": "http.disconnect"}
+
+    return receive
+
+
+async def discard(message: dict):
+    pass
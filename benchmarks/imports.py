@@ -0,0 +1,81 @@
+"""
+Measures how long importing betterweb takes in a fresh interpreter, with `python -X importtime`.
+
+    python -m benchmarks.imports --runs 10 --top 15
+
+For each statement it reports the median wall time of the interpreter over a bare `python -c pass`,
+the import time of betterweb's own modules, and the slowest modules imported.
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = [
+    "import betterweb",
+    "from betterweb import App",
+    "from betterweb import App, APIRoute, Route, StaticRoute, DOM, use_state",
+]
+
+
+def importtime(statement: str) -> "tuple[float, dict[str, int]]":
+    """
+    Runs `statement` in a new interpreter, returning its wall time in seconds and the self time of each module in microseconds.
+    """
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))}
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    modules: "dict[str, int]" = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, _, name = line[len("import time:") :].split("|")
+        if own.strip().isdigit():
+            modules[name.strip()] = int(own)
+    return elapsed, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list per statement")
+    parser.add_argument("statements", nargs="*", default=STATEMENTS)
+    args = parser.parse_args()
+
+    bare = statistics.median(importtime("pass")[0] for _ in range(args.runs))
+
+    for statement in args.statements:
+        walls = []
+        totals: "dict[str, list[int]]" = {}
+        for _ in range(args.runs):
+            wall, modules = importtime(statement)
+            walls.append(wall)
+            for name, own in modules.items():
+                totals.setdefault(name, []).append(own)
+
+        medians = {name: statistics.median(times) for name, times in totals.items()}
+        own = sum(t for name, t in medians.items() if name.split(".")[0] == "betterweb")
+        print(statement)
+        print(f"  {'wall over python -c pass':<40}{(statistics.median(walls) - bare) * 1e3:>10.1f}ms")
+        print(f"  {'imports':<40}{sum(medians.values()) / 1e3:>10.1f}ms")
+        print(f"  {'betterweb modules':<40}{own / 1e3:>10.1f}ms")
+        for name, t in sorted(medians.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+            print(f"    {name:<38}{t / 1e3:>10.1f}ms")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Measures the per-request cost of middleware by driving `App.__call__` in-process.
+
+    python -m benchmarks.middleware --requests 20000 --depths 0 1 5 10
+
+`endpoint only` calls the compiled route directly, so its difference to `none` is the cost of dispatching without middleware.
+Each empty middleware only awaits the next app, so the difference to `none` is the cost of the chain itself.
+"""
+
+import argparse
+import asyncio
+import time
+
+from betterweb import App, APIRoute, Request, ResponseConstructor, middleware
+
+
+@middleware
+async def empty(scope, receive, send, call_next):
+    await call_next(scope, receive, send)
+
+
+async def handler(request: Request, response: ResponseConstructor):
+    await response(b"")
+
+
+def make_app(depth: int, route_depth: int = 0) -> App:
+    return App(
+        {"/": APIRoute(["GET"], handler, middleware=[empty] * route_depth)},
+        {},
+        {},
+        {},
+        middleware=[empty] * depth,
+    )
+
+
+SCOPE = {
+    "type": "http",
+    "method": "GET",
+    "path": "/",
+    "raw_path": b"/",
+    "query_string": b"",
+    "headers": [(b"host", b"localhost")],
+    "scheme": "http",
+    "server": ("localhost", 8000),
+}
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def measure(app, requests: int, repeat: int) -> float:
+    """
+    The best mean time of `repeat` runs, in nanoseconds per request.
+    """
+    for _ in range(min(requests, 1000)):
+        await app(SCOPE, receive, send)  # type: ignore[arg-type]
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(requests):
+            await app(SCOPE, receive, send)  # type: ignore[arg-type]
+        best = min(best, (time.perf_counter_ns() - start) / requests)
+    return best
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 1, 5, 10, 20])
+    args = parser.parse_args()
+
+    plain = make_app(0)
+    plain.compile()
+    endpoint = await measure(plain.http_endpoints["/"], args.requests, args.repeat)
+    base = await measure(plain, args.requests, args.repeat)
+    print(f"{'middleware':<20}{'ns/request':>12}{'overhead':>12}{'per layer':>12}")
+    print(f"{'endpoint only':<20}{endpoint:>12.0f}{endpoint - base:>12.0f}{'':>12}")
+    print(f"{'none':<20}{base:>12.0f}{0:>12.0f}{'':>12}")
+    for depth in args.depths:
+        if depth == 0:
+            continue
+        for name, app in (
+            (f"app x{depth}", make_app(depth)),
+            (f"route x{depth}", make_app(0, depth)),
+        ):
+            ns = await measure(app, args.requests, args.repeat)
+            print(f"{name:<20}{ns:>12.0f}{ns - base:>12.0f}{(ns - base) / depth:>12.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,276 @@
+"""
+Simulates page sessions over `/__bw/ws` in-process, to measure what one worker's sessions cost.
+
+    python -m benchmarks.sessions --sessions 2000 --events 10 --items 50 --output sessions.json
+    python -m benchmarks.sessions --baseline sessions.json --threshold 0.1
+
+Each client connects through a fake ASGI websocket, sends the `request` handshake for `/`,
+then clicks a counter `--events` times, waiting for the fragment after each click like the browser does.
+
+`WebsocketHandler` keeps its session on the class, so one worker serves one session at a time:
+clients run one after another, and memory is reported as what each closed session leaves behind.
+"""
+
+import typing as t
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tracemalloc
+from contextlib import redirect_stdout
+
+import msgspec as ms
+
+from betterweb import App, Route, DOM, use_state, component
+from .harness import metadata, format_time
+
+# The id the button's onclick sends, from its escaped attribute
+BUTTON = re.compile(r"id: &quot;(dom-\d+)&quot;, event: &quot;onclick&quot;")
+
+SCOPE = {
+    "type": "websocket",
+    "path": "/__bw/ws",
+    "raw_path": b"/__bw/ws",
+    "query_string": b"",
+    "headers": [(b"host", b"localhost")],
+    "scheme": "ws",
+    "server": ("localhost", 8000),
+    "subprotocols": [],
+}
+
+HANDSHAKE = ms.json.encode({"type": "request", "data": {"url": "/", "query": [], "hash": ""}})
+
+
+def make_app(items: int) -> App:
+    @component
+    async def counter():
+        count, set_count = use_state("sessions.count", 0)
+        return DOM.create(
+            "div",
+            {},
+            [DOM.create("button", {"onclick": lambda: set_count(count + 1)}, [f"Clicked {count} times"])],
+        )
+
+    async def page():
+        async def client():
+            return DOM.create(
+                "main",
+                {},
+                [
+                    await counter(),
+                    DOM.create("ul", {}, [DOM.create("li", {}, [f"Item {i}"]) for i in range(items)]),
+                ],
+            )
+
+        return client
+
+    app = App({}, {}, {"/": Route("/", page)}, {})
+    app.compile()
+    return app
+
+
+class Client:
+    """
+    One browser tab: answers every frame with the next click until the script is done.
+    """
+
+    def __init__(self, events: int, stats: "Stats"):
+        self.events = events
+        self.stats = stats
+        self.inbox: "asyncio.Queue[dict]" = asyncio.Queue()
+        self.done = asyncio.get_running_loop().create_future()
+        self.sent = 0
+        self.inbox.put_nowait({"type": "websocket.connect"})
+        self.inbox.put_nowait({"type": "websocket.receive", "bytes": HANDSHAKE})
+        self.start = time.perf_counter_ns()
+
+    async def receive(self):
+        return await self.inbox.get()
+
+    async def send(self, message):
+        if message["type"] != "websocket.send":
+            return
+
+        now = time.perf_counter_ns()
+        frame = message["bytes"] if message["bytes"] is not None else message["text"].encode()
+        data = ms.json.decode(frame)
+        html = data["data"] if data["type"] == "html" else data["data"]["html"]
+        self.stats.frame(data["type"], len(frame), now - self.start, self.sent == 0)
+
+        if self.sent == self.events:
+            if not self.done.done():
+                self.done.set_result(None)
+            return
+
+        match = BUTTON.search(html)
+        if match is None:
+            raise RuntimeError(f"No button in {data['type']} frame")
+        self.sent += 1
+        self.start = time.perf_counter_ns()
+        event = {"type": "event", "data": {"id": match.group(1), "event": "onclick"}}
+        self.inbox.put_nowait({"type": "websocket.receive", "text": ms.json.encode(event).decode()})
+
+
+class Stats:
+    def __init__(self):
+        self.frames = 0
+        self.bytes: "dict[str, list[int]]" = {}
+        self.page: list[int] = []
+        self.latency: list[int] = []
+
+    def frame(self, type: str, size: int, latency: int, first: bool):
+        self.frames += 1
+        self.bytes.setdefault(type, []).append(size)
+        (self.page if first else self.latency).append(latency)
+
+
+def percentile(values: list[int], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def rss() -> int:
+    """
+    The resident memory of this process in bytes, or 0 where it cannot be read.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+async def session(app: App, events: int, stats: Stats):
+    client = Client(events, stats)
+    task = asyncio.ensure_future(app(SCOPE, client.receive, client.send))  # type: ignore[arg-type]
+    try:
+        await asyncio.wait([client.done, task], return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            task.result()
+            raise RuntimeError("The session ended before the script did")
+    finally:
+        # The client disconnects without a close frame, like a closed tab
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+async def run(sessions: int, events: int, items: int) -> "dict[str, t.Any]":
+    app = make_app(items)
+    warmup = Stats()
+    for _ in range(min(sessions, 20)):
+        await session(app, events, warmup)
+
+    stats = Stats()
+    start = time.perf_counter_ns()
+    for _ in range(sessions):
+        await session(app, events, stats)
+    elapsed = (time.perf_counter_ns() - start) / 1e9
+
+    # A second pass with tracemalloc, as tracing allocations slows everything down
+    tracemalloc.start()
+    rss_before = rss()
+    traced_before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for _ in range(sessions):
+        await session(app, events, Stats())
+    traced_after, peak = tracemalloc.get_traced_memory()
+    rss_after = rss()
+    tracemalloc.stop()
+
+    frames = [size for sizes in stats.bytes.values() for size in sizes]
+    return {
+        "sessions": sessions,
+        "events": events,
+        "items": items,
+        "seconds": elapsed,
+        "sessions_per_second": sessions / elapsed,
+        "renders_per_second": stats.frames / elapsed,
+        "page_p50": percentile(stats.page, 0.5),
+        "page_p99": percentile(stats.page, 0.99),
+        "event_p50": percentile(stats.latency, 0.5),
+        "event_p99": percentile(stats.latency, 0.99),
+        "frame_bytes": sum(frames) / len(frames),
+        "frame_bytes_by_type": {k: sum(v) / len(v) for k, v in stats.bytes.items()},
+        "retained_per_session": (traced_after - traced_before) / sessions,
+        "peak_traced": peak - traced_before,
+        "rss_per_session": (rss_after - rss_before) / sessions,
+    }
+
+
+# Whether a higher value is worse, for each gated metric
+GATED = {
+    "renders_per_second": False,
+    "event_p50": True,
+    "event_p99": True,
+    "page_p99": True,
+    "frame_bytes": True,
+    "retained_per_session": True,
+}
+
+
+def report(result: "dict[str, t.Any]"):
+    print(f"{result['sessions']} sessions x {result['events']} events in {result['seconds']:.2f}s")
+    print(f"{'renders/s':<24}{result['renders_per_second']:>14,.0f}")
+    print(f"{'sessions/s':<24}{result['sessions_per_second']:>14,.0f}")
+    print(f"{'page p50 / p99':<24}{format_time(result['page_p50']):>14}{format_time(result['page_p99']):>12}")
+    print(f"{'event p50 / p99':<24}{format_time(result['event_p50']):>14}{format_time(result['event_p99']):>12}")
+    for type, size in result["frame_bytes_by_type"].items():
+        print(f"{f'{type} frame bytes':<24}{size:>14,.0f}")
+    print(f"{'retained bytes/session':<24}{result['retained_per_session']:>14,.0f}")
+    print(f"{'peak traced bytes':<24}{result['peak_traced']:>14,.0f}")
+    print(f"{'rss bytes/session':<24}{result['rss_per_session']:>14,.0f}")
+
+
+def gate(result: "dict[str, t.Any]", baseline: "dict[str, t.Any]", threshold: float) -> int:
+    """
+    Compares `result` to `baseline`, returning how many metrics got worse by more than `threshold`.
+    """
+    regressions = 0
+    for name, higher_worse in GATED.items():
+        before, after = baseline[name], result[name]
+        if not before:
+            continue
+        change = after / before - 1
+        worse = change > threshold if higher_worse else change < -threshold
+        regressions += worse
+        print(f"{name:<24}{before:>14,.1f}{after:>14,.1f}{change:>+10.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=10, help="Clicks per session")
+    parser.add_argument("--items", type=int, default=50, help="List items on the page, for its size")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Exit with 1 if worse than the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # The websocket handler logs every message
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        result = asyncio.run(run(args.sessions, args.events, args.items))
+    report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"metadata": metadata(), "results": result}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        print()
+        for name in ("sessions", "events", "items"):
+            if baseline[name] != result[name]:
+                print(f"The baseline was run with {name}={baseline[name]}, not {result[name]}")
+                return 2
+        if gate(result, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Measures the per-request cost of tracing by driving `App.__call__` in-process.
+
+    python -m benchmarks.tracing --requests 20000 --rates 0.01 0.1 1
+
+Spans go to a `RingBuffer`, so the numbers are the cost of recording without any I/O.
+The first round of each configuration warms it up and is not counted.
+"""
+
+import argparse
+import asyncio
+import time
+
+from betterweb import App, APIRoute, Request, ResponseConstructor
+from betterweb.server.tracing import Tracer, RingBuffer
+
+
+async def handler(request: Request, response: ResponseConstructor):
+    await response.json({"hello": "world"})
+
+
+SCOPE = {
+    "type": "http",
+    "method": "GET",
+    "path": "/",
+    "raw_path": b"/",
+    "query_string": b"",
+    "headers": [(b"host", b"localhost")],
+    "scheme": "http",
+    "server": ("localhost", 8000),
+}
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def make_app() -> App:
+    app = App({"/": APIRoute(["GET"], handler)}, {}, {}, {})
+    app.compile()
+    return app
+
+
+async def loop(app: App, requests: int) -> float:
+    """
+    The mean time of `requests` requests, in nanoseconds.
+    """
+    start = time.perf_counter_ns()
+    for _ in range(requests):
+        await app(SCOPE, receive, send)  # type: ignore[arg-type]
+    return (time.perf_counter_ns() - start) / requests
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.01, 0.1, 1.0])
+    parser.add_argument(
+        "--no-traceparent", action="store_true", help="Do not look for a caller's traceparent header"
+    )
+    args = parser.parse_args()
+
+    # The app is compiled for the tracer's configuration, so each rate gets its own
+    configs: "list[tuple[str, list[RingBuffer], float]]" = [("off", [], 1.0)]
+    configs += [(f"sampled {rate:g}", [RingBuffer()], rate) for rate in args.rates]
+    apps = []
+    for _, exporters, rate in configs:
+        Tracer.configure(*exporters, sample_rate=rate, traceparent=not args.no_traceparent)
+        apps.append(make_app())
+
+    # Rounds go through every configuration in turn and each keeps its best round,
+    # so drift in the machine's speed affects them all alike
+    best = [float("inf")] * len(configs)
+    for round in range(args.repeat + 1):
+        for i, ((_, exporters, rate), app) in enumerate(zip(configs, apps)):
+            Tracer.configure(*exporters, sample_rate=rate, traceparent=not args.no_traceparent)
+            ns = await loop(app, args.requests)
+            if round:
+                best[i] = min(best[i], ns)
+
+    base = best[0]
+    print(f"{'tracing':<20}{'ns/request':>12}{'overhead':>12}")
+    print(f"{'off':<20}{base:>12.0f}{'':>12}")
+    for (name, _, _), ns in zip(configs[1:], best[1:]):
+        print(f"{name:<20}{ns:>12.0f}{(ns - base) / base:>11.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,2 +1,26 @@
-from .server import APIRoute, App, Response, Request, ResponseConstructor, Route, StreamResponse, WSRoute, Websocket, Route, DOM, StaticRoute, use_state, use_memo, Request, RouteError, Headers, Cookie, URL
-from .client import Console, LocalStorage, Router
\ No newline at end of file
+import typing as t
+from .shared import lazy
+
+EXPORTS = {
+    **dict.fromkeys(
+        [
+            "APIRoute", "App", "Response", "Request", "ResponseConstructor", "Route", "StreamResponse",
+            "WSRoute", "Websocket", "Disconnected", "DOM", "StaticRoute", "use_state", "use_memo", "memo_stats",
+            "RouteError", "Headers", "Cookie", "URL", "FormData", "UploadFile", "Compression", "JSONEncoder",
+            "ResponseCache", "component", "middleware", "Middleware", "Metrics", "Counter", "Gauge",
+            "Histogram", "ServerTiming", "Tracer", "Span", "RingBuffer", "JSONLines", "OTLP", "Profiler",
+            "Warmup", "Drain",
+        ],
+        ".server",
+    ),
+    **dict.fromkeys(["Console", "LocalStorage", "Router"], ".client"),
+    "main": ".cli",
+}
+
+__all__ = list(EXPORTS)
+__getattr__, __dir__ = lazy(__name__, EXPORTS)
+
+if t.TYPE_CHECKING:
+    from .server import APIRoute, App, Response, Request, ResponseConstructor, Route, StreamResponse, WSRoute, Websocket, Disconnected, DOM, StaticRoute, use_state, use_memo, memo_stats, RouteError, Headers, Cookie, URL, FormData, UploadFile, Compression, JSONEncoder, ResponseCache, component, middleware, Middleware, Metrics, Counter, Gauge, Histogram, ServerTiming, Tracer, Span, RingBuffer, JSONLines, OTLP, Profiler, Warmup, Drain
+    from .client import Console, LocalStorage, Router
+    from .cli import main
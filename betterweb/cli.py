@@ -0,0 +1,64 @@
+import typing as t
+import os
+import sys
+import argparse
+
+
+def main(argv: t.Optional[list[str]] = None):
+    """
+    The `betterweb` command.
+
+    ```bash
+    betterweb serve main:app --workers 4 --reuse-port --loop uvloop --http httptools
+    ```
+    """
+    parser = argparse.ArgumentParser(prog="betterweb", description="A simple web framework for Python.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Serve an app with uvicorn")
+    serve.add_argument("app", help="The app as module:attribute, e.g. main:app")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--workers", type=int, default=1, help="Worker processes, e.g. one per core")
+    serve.add_argument(
+        "--reuse-port",
+        action="store_true",
+        help="Give each worker its own socket with SO_REUSEPORT, balanced by the kernel",
+    )
+    serve.add_argument("--reload", action="store_true", help="Restart when the code changes")
+    serve.add_argument(
+        "--factory", action="store_true", help="The app is a function that builds it, called in each worker"
+    )
+    serve.add_argument("--loop", default="auto", help="auto, asyncio or uvloop")
+    serve.add_argument("--http", default="auto", help="auto, h11 or httptools")
+    serve.add_argument("--backlog", type=int, default=2048, help="Connections waiting to be accepted")
+    serve.add_argument(
+        "--limit-concurrency", type=int, help="Connections and tasks per worker before answering 503"
+    )
+    serve.add_argument(
+        "--timeout-keep-alive", type=int, default=5, help="Seconds to keep idle connections open"
+    )
+    serve.add_argument("--log-level", help="critical, error, warning, info, debug or trace")
+
+    args = parser.parse_args(argv)
+
+    # Import apps from the working directory, like `python -m`
+    sys.path.insert(0, os.getcwd())
+
+    from .server.serve import serve as run
+
+    run(
+        args.app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        reload=args.reload,
+        reuse_port=args.reuse_port,
+        factory=args.factory,
+        loop=args.loop,
+        http=args.http,
+        backlog=args.backlog,
+        limit_concurrency=args.limit_concurrency,
+        timeout_keep_alive=args.timeout_keep_alive,
+        log_level=args.log_level,
+    )
@@ -2,7 +2,19 @@
 import { z } from "https://unpkg.com/zod@3.25.67/v3/index.js";
 // import {z} from "zod"
 
-const socket = new WebSocket("ws://localhost:8000/__bw/ws");
+let socket: WebSocket;
+// Milliseconds to wait before reconnecting once the server closes the socket, when it asked to
+let reconnectDelay: number | null = null;
+// Failed attempts since the socket was last open, doubling the wait before the next one
+let attempts = 0;
+const BACKOFF_BASE = 500;
+const BACKOFF_MAX = 30000;
+const decoder = new TextDecoder();
+
+// Full jitter: a random wait up to the doubled base, so clients cut off together do not return together
+function backoff(): number {
+	return Math.random() * Math.min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempts);
+}
 
 type Process<T extends z.ZodSchema> = {
 	type: string;
@@ -82,6 +94,20 @@ processes.add({
 	function: (data) => (document.body.innerHTML = data),
 });
 
+processes.add({
+	type: "fragment",
+	data: z.object({
+		id: z.string(),
+		html: z.string(),
+	}),
+	function: ({ id, html }) => {
+		const element = document.getElementById(id);
+		if (element) {
+			element.outerHTML = html;
+		}
+	},
+});
+
 processes.add({
 	type: "ls",
 	data: z.union([
@@ -154,24 +180,56 @@ processes.add({
 	},
 });
 
-socket.onmessage = async (event) => {
-	const json = JSON.parse(await (event.data as Blob).text());
+processes.add({
+	type: "reconnect",
+	data: z.object({
+		delay: z.number(),
+	}),
+	function: ({ delay }) => {
+		reconnectDelay = delay;
+	},
+});
 
-	// const processed = ProcessJSON.parse(json);
-	processes.runNamed(json.type, json.data);
-};
+function connect() {
+	socket = new WebSocket("ws://localhost:8000/__bw/ws");
+	// Frames are decoded synchronously, so a reconnect frame is handled before the close that follows it
+	socket.binaryType = "arraybuffer";
 
-socket.onopen = () => {
-	socket.send(
-		JSON.stringify({
-			type: "request",
-			data: getUrlData(),
-		})
-	);
-};
+	socket.onmessage = (event) => {
+		const json = JSON.parse(
+			typeof event.data === "string" ? event.data : decoder.decode(event.data as ArrayBuffer)
+		);
+
+		// const processed = ProcessJSON.parse(json);
+		processes.runNamed(json.type, json.data);
+	};
+
+	socket.onopen = () => {
+		attempts = 0;
+		socket.send(
+			JSON.stringify({
+				type: "request",
+				data: getUrlData(),
+			})
+		);
+	};
+
+	// Come back after the delay the server picked when it is restarting, or back off after any other abnormal close
+	socket.onclose = (event) => {
+		if (reconnectDelay !== null) {
+			setTimeout(connect, reconnectDelay);
+			reconnectDelay = null;
+		} else if (event.code !== 1000) {
+			setTimeout(connect, backoff());
+			attempts++;
+		}
+	};
+
+	// @ts-expect-error Assigning value
+	window.socket = socket;
+}
 
-// @ts-expect-error Assigning value
-window.socket = socket;
+connect();
 
 // --- Router Implementation ---
 function getUrlData() {
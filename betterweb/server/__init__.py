@@ -1,3 +1,38 @@
-from .api import APIRoute, ResponseConstructor, Response, Request, RouteError, StreamResponse, WSRoute, Websocket, Route, StaticRoute, use_state, use_memo, Headers, Cookie, URL
-from .app import App
-from .dom import DOM
\ No newline at end of file
+import typing as t
+from ..shared import lazy
+
+# These share their name with their module, so they must be bound before the module is imported elsewhere
+from .component import component
+from .middleware import middleware, Middleware
+
+EXPORTS = {
+    **dict.fromkeys(
+        [
+            "APIRoute", "ResponseConstructor", "Response", "Request", "RouteError", "StreamResponse", "WSRoute",
+            "Websocket", "Disconnected", "Route", "StaticRoute", "use_state", "use_memo", "memo_stats",
+            "Headers", "Cookie", "URL", "FormData", "UploadFile", "Compression", "JSONEncoder", "ResponseCache",
+            "ServerTiming",
+        ],
+        ".api",
+    ),
+    "App": ".app",
+    "DOM": ".dom",
+    **dict.fromkeys(["Metrics", "Counter", "Gauge", "Histogram"], ".metrics"),
+    **dict.fromkeys(["Tracer", "Span", "RingBuffer", "JSONLines", "OTLP"], ".tracing"),
+    "Profiler": ".profiling",
+    "Warmup": ".warmup",
+    "Drain": ".drain",
+}
+
+__all__ = [*EXPORTS, "component", "middleware", "Middleware"]
+__getattr__, __dir__ = lazy(__name__, EXPORTS)
+
+if t.TYPE_CHECKING:
+    from .api import APIRoute, ResponseConstructor, Response, Request, RouteError, StreamResponse, WSRoute, Websocket, Disconnected, Route, StaticRoute, use_state, use_memo, memo_stats, Headers, Cookie, URL, FormData, UploadFile, Compression, JSONEncoder, ResponseCache, ServerTiming
+    from .app import App
+    from .dom import DOM
+    from .metrics import Metrics, Counter, Gauge, Histogram
+    from .tracing import Tracer, Span, RingBuffer, JSONLines, OTLP
+    from .profiling import Profiler
+    from .warmup import Warmup
+    from .drain import Drain
@@ -1,4 +1,30 @@
-from .route import APIRoute, WSRoute, Websocket, Route, StaticRoute
-from .response import ResponseConstructor, Response, RouteError, StreamResponse, Headers, Cookie, URL
-from .state import use_state, use_memo
-from .request import Request
\ No newline at end of file
+import typing as t
+from ...shared import lazy
+
+EXPORTS = {
+    **dict.fromkeys(["APIRoute", "WSRoute", "Websocket", "Disconnected", "Route", "StaticRoute"], ".route"),
+    **dict.fromkeys(
+        [
+            "ResponseConstructor", "Response", "RouteError", "StreamResponse", "Headers", "Cookie", "URL",
+            "Compression", "JSONEncoder",
+        ],
+        ".response",
+    ),
+    **dict.fromkeys(["use_state", "use_memo", "memo_stats"], ".state"),
+    "Request": ".request",
+    **dict.fromkeys(["FormData", "UploadFile"], ".form"),
+    "ResponseCache": ".cache",
+    **dict.fromkeys(["ServerTiming", "Timing"], ".timing"),
+}
+
+__all__ = list(EXPORTS)
+__getattr__, __dir__ = lazy(__name__, EXPORTS)
+
+if t.TYPE_CHECKING:
+    from .route import APIRoute, WSRoute, Websocket, Disconnected, Route, StaticRoute
+    from .response import ResponseConstructor, Response, RouteError, StreamResponse, Headers, Cookie, URL, Compression, JSONEncoder
+    from .state import use_state, use_memo, memo_stats
+    from .request import Request
+    from .form import FormData, UploadFile
+    from .cache import ResponseCache
+    from .timing import ServerTiming, Timing
@@ -0,0 +1,232 @@
+import typing as t
+import time
+import asyncio as io
+from collections import OrderedDict
+from .response.etag import etag_matches
+
+if t.TYPE_CHECKING:
+    from .request import Request
+    from .types import sendType
+
+
+class CacheEntry:
+    def __init__(
+        self,
+        status: int,
+        headers: "list[tuple[bytes, bytes]]",
+        body: bytes,
+        ttl: float,
+    ):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.created = time.monotonic()
+        self.expires = self.created + ttl
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers)
+
+
+class CacheStats(t.TypedDict):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    bytes: int
+
+
+class ResponseCache:
+    """
+    Caches whole responses of an `APIRoute` in memory.
+
+    Responses are keyed by method, path, query string and the `vary` request headers.
+    Only `200` responses sent in one piece, without `set-cookie` or `cache-control: no-store`/`private`, are stored.
+    Concurrent misses for the same key wait for the first one instead of each calling the handler,
+    until it turns out not to be cacheable.
+
+    - `ttl`: Seconds a response is served from the cache.
+    - `vary`: Request headers that select different responses, e.g. `["accept-language"]`.
+    - `max_bytes`: The memory budget of the cache. The least recently used responses are evicted past it.
+    - `max_entry_bytes`: Responses larger than this are not stored.
+    - `methods`: The request methods that are cached.
+    """
+
+    CACHEABLE = {200}
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        vary: t.Iterable[str] = (),
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 1024 * 1024,
+        methods: t.Iterable[str] = ("GET", "HEAD"),
+    ):
+        self.ttl = ttl
+        self.vary = [v.lower().encode("latin-1") for v in vary]
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.methods = set(methods)
+
+        self.entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self.inflight: "dict[tuple, io.Future[None]]" = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, request: "Request") -> tuple:
+        return (
+            request.method,
+            request.path,
+            request.query_string,
+            *(tuple(request.headers.get(v, bytes=True)) for v in self.vary),
+        )
+
+    def get(self, key: tuple) -> t.Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            self.remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key: tuple, entry: CacheEntry):
+        if entry.size > self.max_entry_bytes:
+            return
+        self.remove(key)
+        self.entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+
+    def remove(self, key: tuple):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> CacheStats:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "bytes": self.bytes,
+        }
+
+    async def replay(self, entry: CacheEntry, request: "Request", send: "sendType"):
+        age = str(int(time.monotonic() - entry.created)).encode("ascii")
+
+        for k, v in entry.headers:
+            if k == b"etag" and etag_matches(request.headers.get(b"if-none-match"), v.decode("latin-1")):
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 304,
+                        "headers": [(k, v), (b"age", age)],
+                    }
+                )
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": entry.status,
+                "headers": [*entry.headers, (b"age", age)],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"" if request.method == "HEAD" else entry.body,
+            }
+        )
+
+    async def serve(
+        self,
+        request: "Request",
+        send: "sendType",
+        handle: "t.Callable[[sendType], t.Awaitable[None]]",
+    ):
+        """
+        Answers from the cache, or calls `handle` and stores what it sends.
+        """
+        if request.method not in self.methods:
+            return await handle(send)
+
+        key = self.key(request)
+
+        while True:
+            entry = self.get(key)
+            if entry is not None:
+                self.hits += 1
+                return await self.replay(entry, request, send)
+
+            pending = self.inflight.get(key)
+            if pending is None:
+                break
+            # Another request is computing this response, wait for it instead of calling the handler again
+            await io.shield(pending)
+            if key not in self.entries:
+                # Not cacheable, so compute our own
+                return await handle(send)
+
+        self.misses += 1
+        pending = self.inflight[key] = io.get_running_loop().create_future()
+        try:
+            await handle(self.recorder(key, send, pending))
+        finally:
+            self.release(key, pending)
+
+    def release(self, key: tuple, pending: "io.Future[None]"):
+        """
+        Lets the requests waiting on `pending` go on, to the stored response or to compute their own.
+        """
+        if self.inflight.get(key) is pending:
+            del self.inflight[key]
+        if not pending.done():
+            pending.set_result(None)
+
+    def recorder(self, key: tuple, send: "sendType", pending: "io.Future[None]") -> "sendType":
+        status = 0
+        headers: "list[tuple[bytes, bytes]]" = []
+        body = bytearray()
+        cacheable = True
+
+        async def _send(message):
+            nonlocal status, headers, cacheable
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(k.lower(), v) for k, v in message.get("headers", [])]
+                cacheable = status in self.CACHEABLE and not any(
+                    k == b"set-cookie"
+                    or (k == b"cache-control" and (b"no-store" in v or b"private" in v))
+                    for k, v in headers
+                )
+
+            elif message["type"] == "http.response.body" and cacheable:
+                if message.get("more_body", False):
+                    # A stream, which may never end, so it is not stored
+                    cacheable = False
+                else:
+                    body.extend(message.get("body", b""))
+                    if len(body) <= self.max_entry_bytes:
+                        stored = [(k, v) for k, v in headers if k != b"content-length"]
+                        stored.append((b"content-length", str(len(body)).encode("ascii")))
+                        self.set(key, CacheEntry(status, stored, bytes(body), self.ttl))
+                    body.clear()
+
+            if not cacheable:
+                # Waiting requests compute their own response rather than wait for this one to end
+                self.release(key, pending)
+
+            return await send(message)
+
+        return _send  # type: ignore[return-value]
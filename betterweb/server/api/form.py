@@ -0,0 +1,273 @@
+import re
+import typing as t
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qsl
+from .response.utils import Headers
+from .response.error import RouteError
+
+OPTION = re.compile(r';\s*([^\s=;]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+
+def parse_options(header: str) -> tuple[str, dict[str, str]]:
+    """
+    Splits a header like `form-data; name="file"; filename="a.txt"` into its value and options.
+    """
+    value, _, rest = header.partition(";")
+    options = {}
+    for match in OPTION.finditer(f";{rest}"):
+        key, option = match.group(1).lower(), match.group(2).strip()
+        if option.startswith('"') and option.endswith('"'):
+            option = re.sub(r"\\(.)", r"\1", option[1:-1])
+        options[key] = option
+    return value.strip().lower(), options
+
+
+class UploadFile:
+    def __init__(
+        self,
+        name: str,
+        filename: str,
+        content_type: str,
+        headers: Headers,
+        spool_size: int,
+    ):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.headers = headers
+        self.size = 0
+        self.file: t.IO[bytes] = SpooledTemporaryFile(max_size=spool_size)  # type: ignore[assignment]
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        self.file.write(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.file.seek(offset, whence)
+
+    def close(self):
+        self.file.close()
+
+
+class FormData:
+    def __init__(self, entries: "t.Optional[list[tuple[str, str | UploadFile]]]" = None):
+        self._entries = entries or []
+
+    def get(self, name: str) -> "t.Optional[str | UploadFile]":
+        for key, value in self._entries:
+            if key == name:
+                return value
+        return None
+
+    def getAll(self, name: str) -> "list[str | UploadFile]":
+        return [value for key, value in self._entries if key == name]
+
+    def has(self, name: str) -> bool:
+        return any(key == name for key, _ in self._entries)
+
+    def append(self, name: str, value: "str | UploadFile"):
+        self._entries.append((name, value))
+
+    def keys(self) -> list[str]:
+        return [key for key, _ in self._entries]
+
+    def values(self) -> "list[str | UploadFile]":
+        return [value for _, value in self._entries]
+
+    def entries(self) -> "list[tuple[str, str | UploadFile]]":
+        return self._entries
+
+    def __getitem__(self, name: str):
+        if not self.has(name):
+            raise KeyError(name)
+        return self.get(name)
+
+    def __contains__(self, name: str):
+        return self.has(name)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        for _, value in self._entries:
+            if isinstance(value, UploadFile):
+                value.close()
+
+
+class MultipartParser:
+    """
+    Incremental multipart/form-data parser.
+
+    `feed` takes body chunks as they arrive and returns `("headers", Headers)`,
+    `("data", bytes)` and `("end", None)` events. At most one chunk plus a
+    delimiter is buffered, however large the parts are.
+    """
+
+    PREAMBLE = 0
+    BOUNDARY = 1
+    HEADERS = 2
+    BODY = 3
+    DONE = 4
+
+    def __init__(self, boundary: bytes, max_header_size: int = 16 * 1024):
+        self.delimiter = b"\r\n--" + boundary
+        self.max_header_size = max_header_size
+        # The first delimiter is not preceded by a line break
+        self.buffer = bytearray(b"\r\n")
+        self.state = self.PREAMBLE
+
+    @property
+    def done(self) -> bool:
+        return self.state == self.DONE
+
+    def feed(self, chunk: bytes) -> "list[tuple[str, t.Any]]":
+        self.buffer += chunk
+        events: "list[tuple[str, t.Any]]" = []
+        keep = len(self.delimiter) - 1
+
+        while True:
+            if self.state == self.PREAMBLE:
+                index = self.buffer.find(self.delimiter)
+                if index == -1:
+                    if len(self.buffer) > keep:
+                        del self.buffer[:-keep]
+                    break
+                del self.buffer[: index + len(self.delimiter)]
+                self.state = self.BOUNDARY
+
+            elif self.state == self.BOUNDARY:
+                if len(self.buffer) < 2:
+                    break
+                if self.buffer[:2] == b"--":
+                    self.state = self.DONE
+                elif self.buffer[:2] == b"\r\n":
+                    del self.buffer[:2]
+                    self.state = self.HEADERS
+                else:
+                    raise RouteError(400, "Malformed multipart boundary", Headers())
+
+            elif self.state == self.HEADERS:
+                if self.buffer[:2] == b"\r\n":
+                    index = -2
+                else:
+                    index = self.buffer.find(b"\r\n\r\n")
+                if index == -1:
+                    if len(self.buffer) > self.max_header_size:
+                        raise RouteError(431, "Multipart headers too large", Headers())
+                    break
+
+                headers = []
+                for line in bytes(self.buffer[: max(index, 0)]).split(b"\r\n"):
+                    name, sep, value = line.partition(b":")
+                    if not sep:
+                        raise RouteError(400, "Malformed multipart header", Headers())
+                    headers.append((name.strip().lower(), value.strip()))
+
+                del self.buffer[: index + 4]
+                events.append(("headers", Headers.from_raw(headers)))
+                self.state = self.BODY
+
+            elif self.state == self.BODY:
+                index = self.buffer.find(self.delimiter)
+                if index == -1:
+                    if len(self.buffer) > keep:
+                        events.append(("data", bytes(self.buffer[:-keep])))
+                        del self.buffer[:-keep]
+                    break
+                if index:
+                    events.append(("data", bytes(self.buffer[:index])))
+                del self.buffer[: index + len(self.delimiter)]
+                events.append(("end", None))
+                self.state = self.BOUNDARY
+
+            else:
+                self.buffer.clear()
+                break
+
+        return events
+
+
+async def iter_multipart(
+    stream: t.AsyncIterator[bytes],
+    boundary: bytes,
+    spool_size: int,
+    max_part_size: t.Optional[int] = None,
+    max_field_size: int = 64 * 1024,
+    max_parts: t.Optional[int] = None,
+) -> "t.AsyncIterator[tuple[str, str | UploadFile]]":
+    parser = MultipartParser(boundary)
+    parts = 0
+    name = ""
+    field: t.Optional[bytearray] = None
+    upload: t.Optional[UploadFile] = None
+    size = 0
+
+    try:
+        async for chunk in stream:
+            for event, value in parser.feed(chunk):
+                if event == "headers":
+                    parts += 1
+                    if max_parts is not None and parts > max_parts:
+                        raise RouteError(413, "Too many form parts", Headers())
+
+                    disposition, options = parse_options(
+                        value.get(b"content-disposition", bytes=True)[0].decode("latin-1")
+                        if b"content-disposition" in value
+                        else ""
+                    )
+                    if disposition != "form-data" or "name" not in options:
+                        raise RouteError(400, "Malformed multipart part", Headers())
+
+                    name = options["name"]
+                    size = 0
+                    if "filename" in options:
+                        content_type = value.get(b"content-type")
+                        upload = UploadFile(
+                            name,
+                            options["filename"],
+                            content_type[0] if content_type else "application/octet-stream",
+                            value,
+                            spool_size,
+                        )
+                        field = None
+                    else:
+                        upload = None
+                        field = bytearray()
+
+                elif event == "data":
+                    size += len(value)
+                    if upload is not None:
+                        if max_part_size is not None and size > max_part_size:
+                            raise RouteError(413, "Form part too large", Headers())
+                        upload.write(value)
+                    elif field is not None:
+                        if size > max_field_size:
+                            raise RouteError(413, "Form field too large", Headers())
+                        field += value
+
+                elif upload is not None:
+                    upload.seek(0)
+                    # Handed over: from here the caller closes it
+                    received, upload = upload, None
+                    yield name, received
+                elif field is not None:
+                    yield name, field.decode("utf-8", "replace")
+                    field = None
+
+        if not parser.done:
+            raise RouteError(400, "Unexpected end of multipart body", Headers())
+    except BaseException:
+        # The file being received is not handed over, so its temporary file is removed here
+        if upload is not None:
+            upload.close()
+        raise
+
+
+def parse_urlencoded(body: bytes) -> "list[tuple[str, str | UploadFile]]":
+    return parse_qsl(body.decode("utf-8", "replace"), keep_blank_values=True)  # type: ignore[return-value]
@@ -0,0 +1,113 @@
+import re
+from .response.utils import Headers
+from .response.error import RouteError
+
+TOKEN = re.compile(rb'["\[\]{},]')
+STRING = re.compile(rb'["\\]')
+WHITESPACE = b" \t\r\n"
+
+
+class JSONArrayParser:
+    """
+    Incremental splitter for a top level JSON array.
+
+    `feed` takes body chunks as they arrive and returns the raw bytes of every
+    element completed so far. Only the element being received is buffered.
+    """
+
+    def __init__(self, max_item_size: "int | None" = None):
+        self.max_item_size = max_item_size
+        self.buffer = bytearray()
+        self.started = False
+        self.done = False
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        # Elements split off so far, to tell `[]` from a trailing comma
+        self.count = 0
+
+    def element(self, element: bytes) -> bytes:
+        """
+        Checks one element before it is returned.
+        """
+        if not element.strip(WHITESPACE):
+            raise RouteError(422, "Empty JSON array element", Headers())
+        if self.max_item_size is not None and len(element) > self.max_item_size:
+            raise RouteError(413, "JSON array item too large", Headers())
+        self.count += 1
+        return element
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        if self.done:
+            if chunk.strip(WHITESPACE):
+                raise RouteError(422, "Unexpected data after JSON array", Headers())
+            return []
+
+        self.buffer += chunk
+        items: list[bytes] = []
+
+        if not self.started:
+            start = len(self.buffer) - len(self.buffer.lstrip(WHITESPACE))
+            if start == len(self.buffer):
+                self.buffer.clear()
+                return items
+            if self.buffer[start] != ord("["):
+                raise RouteError(422, "Expected a JSON array", Headers())
+            del self.buffer[: start + 1]
+            self.started = True
+
+        buffer = self.buffer
+        # Start of the current element, the buffer is only compacted once per chunk
+        start = 0
+        while True:
+            if self.in_string:
+                match = STRING.search(buffer, self.pos)
+                if match is None:
+                    self.pos = len(buffer)
+                    break
+                if match.group() == b"\\":
+                    if match.end() >= len(buffer):
+                        # The escaped character has not arrived yet
+                        self.pos = match.start()
+                        break
+                    self.pos = match.end() + 1
+                    continue
+                self.in_string = False
+                self.pos = match.end()
+                continue
+
+            match = TOKEN.search(buffer, self.pos)
+            if match is None:
+                self.pos = len(buffer)
+                break
+
+            char = buffer[match.start()]
+            self.pos = match.end()
+            if char == ord('"'):
+                self.in_string = True
+            elif char == ord("[") or char == ord("{"):
+                self.depth += 1
+            elif char == ord("]") or char == ord("}"):
+                if self.depth == 0:
+                    element = bytes(buffer[start : match.start()])
+                    if self.count or element.strip(WHITESPACE):
+                        items.append(self.element(element))
+                    if buffer[self.pos :].strip(WHITESPACE):
+                        raise RouteError(422, "Unexpected data after JSON array", Headers())
+                    buffer.clear()
+                    self.done = True
+                    return items
+                self.depth -= 1
+            elif char == ord(",") and self.depth == 0:
+                items.append(self.element(bytes(buffer[start : match.start()])))
+                start = self.pos
+
+        if start:
+            del buffer[:start]
+            self.pos -= start
+
+        # The element still being received, so one too large is not buffered whole
+        if self.max_item_size is not None and len(buffer) > self.max_item_size:
+            raise RouteError(413, "JSON array item too large", Headers())
+
+        return items
@@ -1,20 +1,40 @@
-from uvicorn._types import (
-    HTTPScope,
-    LifespanScope,
-    HTTPRequestEvent,
-    HTTPDisconnectEvent
-)
 import typing as t
 import msgspec as ms
+from functools import cached_property
+from collections import OrderedDict
 from http import cookies
-from .response.utils import Cookie, URL
-
-ASGIReceiveEvent = t.Union[
-    HTTPRequestEvent,
-    HTTPDisconnectEvent,
-]
-
-ASGIReceiveCallable = t.Callable[[], t.Awaitable[ASGIReceiveEvent]]
+from urllib.parse import parse_qs
+from tempfile import SpooledTemporaryFile
+from .response.utils import Cookie, URL, Headers
+from .response.error import RouteError
+from .jsonarray import JSONArrayParser
+from .form import FormData, UploadFile, iter_multipart, parse_options, parse_urlencoded
+from .timing import Timing, NULL_SPAN
+
+if t.TYPE_CHECKING:
+    from .response.encoder import JSONEncoder
+from ..tracing import Tracer
+
+if t.TYPE_CHECKING:
+    # uvicorn is only needed to serve, so its types are not imported at runtime
+    from uvicorn._types import (
+        HTTPScope,
+        LifespanScope,
+        HTTPRequestEvent,
+        HTTPDisconnectEvent
+    )
+
+    ASGIReceiveEvent = t.Union[
+        HTTPRequestEvent,
+        HTTPDisconnectEvent,
+    ]
+
+    ASGIReceiveCallable = t.Callable[[], t.Awaitable[ASGIReceiveEvent]]
+
+T = t.TypeVar("T")
+
+# The body has not been decoded yet, as `None` is a valid decoded body
+UNDECODED: t.Any = object()
 
 def cookie_parser(cookie_string: str) -> dict[str, str]:
     ret = {}
@@ -30,34 +50,99 @@ def cookie_parser(cookie_string: str) -> dict[str, str]:
 
 
 class Request:
-    def __init__(self, scope: HTTPScope, receive: ASGIReceiveCallable):
+    SPOOL_SIZE = 1024 * 1024
+    CHUNK_SIZE = 64 * 1024
+    # Decoders built by `decoder`, least recently used first
+    DECODERS: "OrderedDict[t.Any, ms.json.Decoder]" = OrderedDict()
+    MAX_DECODERS = 256
+
+    def __init__(
+        self,
+        scope: "HTTPScope",
+        receive: "ASGIReceiveCallable",
+        max_body_size: t.Optional[int] = None,
+        spool_size: int = SPOOL_SIZE,
+    ):
+        """
+        - `max_body_size`: Bodies larger than this many bytes are rejected with a 413. Optional: defaults to no limit.
+        - `spool_size`: Bodies larger than this many bytes are buffered in a temporary file instead of memory.
+        """
         self._scope = scope
         self._receive = receive
+        self.max_body_size = max_body_size
+        self.spool_size = spool_size
+
         self._body_consumed = False
+        self._streamed = False
+        self._buffer = bytearray()
+        self._spool: t.Optional[SpooledTemporaryFile] = None
+        self._body: t.Optional[bytes] = None
+        self._form: t.Optional[FormData] = None
+        # Files yielded by `parts`, removed when the request is closed
+        self._uploads: "list[UploadFile]" = []
+        self._json: t.Any = UNDECODED
+        self.timing: t.Optional[Timing] = None
+        # Set for requests the tracer sampled
+        self.traced = False
+        # The app's encoder for JSON responses, if it has its own
+        self.json_encoder: "t.Optional[JSONEncoder]" = None
+
+    def span(self, name: str) -> t.ContextManager[None]:
+        """
+        Times the `with` block as the span `name` of the `Server-Timing` header, if the request is timed.
+        """
+        if self.timing is None:
+            return NULL_SPAN
+        return self.timing.span(name)
+
+    def trace(self, name: str) -> "t.ContextManager[t.Any]":
+        """
+        Records the `with` block as the span `name` of the request's trace, if it is traced.
+        """
+        if not self.traced:
+            return NULL_SPAN
+        return Tracer.span(name)
 
     @property
-    def scope(self) -> HTTPScope:
+    def scope(self) -> "HTTPScope":
         return self._scope
 
     @property
-    def receive(self) -> ASGIReceiveCallable:
+    def receive(self) -> "ASGIReceiveCallable":
         return self._receive
 
     @property
     def http_version(self) -> str:
         return self.scope["http_version"]
     
-    @property
-    def cookies(self):
-        return [Cookie(k, v) for k, v in cookie_parser(self.headers.get(b"cookie", b"").decode()).items()]
+    @cached_property
+    def cookies(self) -> list[Cookie]:
+        return [
+            Cookie(k, v)
+            for header in self.headers.get(b"cookie")
+            for k, v in cookie_parser(header).items()
+        ]
 
     @property
     def method(self) -> str:
         return self.scope["method"]
 
-    @property
+    @cached_property
     def url(self) -> URL:
-        return URL(self.scope["raw_path"].decode())
+        host = self.headers.get(b"host")
+        if host:
+            netloc = host[0]
+        elif self.server is not None and self.server[1] is not None:
+            netloc = f"{self.server[0]}:{self.server[1]}"
+        elif self.server is not None:
+            netloc = self.server[0]
+        else:
+            netloc = ""
+
+        url = f"{self.scheme}://{netloc}{self.raw_path.decode()}"
+        if self.query_string:
+            url = f"{url}?{self.query_string.decode()}"
+        return URL(url)
 
     @property
     def scheme(self) -> str:
@@ -79,9 +164,13 @@ class Request:
     def root_path(self) -> str:
         return self.scope["root_path"]
 
-    @property
-    def headers(self) -> dict[bytes, bytes]:
-        return dict(self.scope["headers"])
+    @cached_property
+    def headers(self) -> Headers:
+        return Headers.from_raw(self.scope["headers"])  # type: ignore[arg-type]
+
+    @cached_property
+    def query(self) -> dict[str, list[str]]:
+        return parse_qs(self.query_string.decode("latin-1"), keep_blank_values=True)
 
     @property
     def client(self) -> tuple[str, int] | None:
@@ -92,7 +181,7 @@ class Request:
         return self.scope["server"]
 
     @property
-    def state(self) -> LifespanScope | None:
+    def state(self) -> "LifespanScope | None":
         return self.scope.get("state", None) # type: ignore[return-value]
 
     @property
@@ -108,57 +197,281 @@ class Request:
     def __len__(self) -> int:
         return len(self.scope)
 
-    async def _fetch_body(self):
+    async def _chunks(self) -> t.AsyncIterator[bytes]:
         if self._body_consumed:
-            return
+            raise RuntimeError("The request body has already been read")
+        self._body_consumed = True
 
-        body = b""
-        iter = []
+        if self.max_body_size is not None:
+            length = self.headers.get(b"content-length")
+            if length and length[0].isdigit() and int(length[0]) > self.max_body_size:
+                raise RouteError(413, "Request Entity Too Large", Headers())
+
+        size = 0
         more_body = True
         while more_body:
             message = await self._receive()
             assert message["type"] == "http.request"
-            body += message.get("body")
-            iter.append(message.get("body"))
+            chunk = message.get("body", b"")
             more_body = message.get("more_body", False)
 
-        self._body_consumed = True
-        self._body_iter = iter
-        self._body = body
-
-    async def json(self):
-        if not self._body_consumed:
-            await self._fetch_body()
+            size += len(chunk)
+            if self.max_body_size is not None and size > self.max_body_size:
+                raise RouteError(413, "Request Entity Too Large", Headers())
 
-        if hasattr(self, "_json"):
-            return self._json
+            if chunk:
+                yield chunk
 
-        if hasattr(self, "_body"):
-            self._json = ms.json.decode(self._body)
-            return self._json
+    def _store(self, chunk: bytes):
+        if self._spool is not None:
+            self._spool.write(chunk)
+        elif len(self._buffer) + len(chunk) > self.spool_size:
+            self._spool = SpooledTemporaryFile(max_size=self.spool_size)
+            self._spool.write(self._buffer)
+            self._spool.write(chunk)
+            self._buffer = bytearray()
+        else:
+            self._buffer += chunk
 
-    async def stream(self):
+    async def _fetch_body(self):
         if self._body_consumed:
-            for body in self._body_iter:
-                yield body
+            if self._streamed:
+                raise RuntimeError(
+                    "The request body was streamed without replay and is no longer available"
+                )
             return
 
-        more_body = True
-        self._body = b""
-        self._body_iter = []
+        with self.span("body"):
+            async for chunk in self._chunks():
+                self._store(chunk)
 
-        while more_body:
-            message = await self._receive()
-            assert message["type"] == "http.request"
-            body = message.get("body")
+    async def body(self) -> bytes:
+        await self._fetch_body()
 
-            self._body_iter.append(message.get("body")) 
-            self._body += body
-            more_body = message.get("more_body", False)
-            yield body
+        if self._body is None:
+            if self._spool is not None:
+                self._spool.seek(0)
+                self._body = self._spool.read()
+            else:
+                self._body = bytes(self._buffer)
+                self._buffer = bytearray()
+
+        return self._body
+
+    async def file(self) -> t.IO[bytes]:
+        """
+        Returns the body as a binary file, read from the start.
+        Bodies larger than `spool_size` are kept on disk instead of in memory.
+        """
+        await self._fetch_body()
+
+        if self._spool is None:
+            self._spool = SpooledTemporaryFile(max_size=self.spool_size)
+            self._spool.write(self._body if self._body is not None else self._buffer)
+            self._buffer = bytearray()
+
+        self._spool.seek(0)
+        return self._spool  # type: ignore[return-value]
+
+    @classmethod
+    def decoder(cls, type: t.Any) -> ms.json.Decoder:
+        """
+        Returns a JSON decoder for `type`, reusing one built earlier for the same type.
+        Keeps the `MAX_DECODERS` most recently used, so types built at runtime can not grow it without bound.
+        """
+        try:
+            decoder = cls.DECODERS[type]
+        except KeyError:
+            decoder = cls.DECODERS[type] = ms.json.Decoder(type)
+            if len(cls.DECODERS) > cls.MAX_DECODERS:
+                cls.DECODERS.popitem(last=False)
+            return decoder
+        except TypeError:
+            # Unhashable types can not be cached
+            return ms.json.Decoder(type)
+        cls.DECODERS.move_to_end(type)
+        return decoder
+
+    @t.overload
+    async def json(self) -> t.Any: ...
+
+    @t.overload
+    async def json(self, type: type[T]) -> T: ...
+
+    @t.overload
+    async def json(self, type: t.Any = None, *, decoder: "ms.json.Decoder[T]") -> T: ...
+
+    async def json(self, type: t.Any = None, *, decoder: t.Optional[ms.json.Decoder] = None):
+        """
+        Decodes the body as JSON.
+
+        - `type`: Validates the body against this type while decoding. Optional: defaults to any JSON value.
+        - `decoder`: A prebuilt decoder to use instead of `type`.
+
+        Raises a 422 `RouteError` if the body is not valid JSON of that type.
+        """
+        if type is None and decoder is None:
+            if self._json is UNDECODED:
+                body = await self.body()
+                with self.span("decode"):
+                    self._json = self._decode(ms.json.decode, body)
+            return self._json
 
-    async def text(self):
-        if not self._body_consumed:
+        if decoder is None:
+            decoder = self.decoder(type)
+        body = await self.body()
+        with self.span("decode"):
+            return self._decode(decoder.decode, body)
+
+    async def json_items(
+        self,
+        type: t.Any = None,
+        max_item_size: t.Optional[int] = None,
+    ) -> t.AsyncIterator[t.Any]:
+        """
+        Decodes a JSON array body one element at a time, as the chunks containing it arrive.
+
+        - `type`: Validates each element against this type. Optional: defaults to any JSON value.
+        - `max_item_size`: The maximum size of one element in bytes. Optional: defaults to no limit.
+
+        Raises a 422 `RouteError` if the body is not a valid JSON array of that type.
+        """
+        decode = ms.json.decode if type is None else self.decoder(type).decode
+        parser = JSONArrayParser(max_item_size)
+
+        async for chunk in self.stream():
+            for item in parser.feed(chunk):
+                yield self._decode(decode, item)
+
+        if not parser.done:
+            raise RouteError(422, "Unexpected end of JSON array", Headers())
+
+    @staticmethod
+    def _decode(decode: t.Callable[[bytes], t.Any], body: bytes):
+        try:
+            return decode(body)
+        except ms.DecodeError as exc:
+            raise RouteError(422, str(exc), Headers())
+
+    async def stream(self, replay: bool = False) -> t.AsyncIterator[bytes]:
+        """
+        Yields the body in chunks as they are received.
+
+        - `replay`: Keep the chunks so the body can be read again afterwards. Optional: defaults to False.
+        """
+        if self._body_consumed:
             await self._fetch_body()
+            if self._body is not None:
+                yield self._body
+            elif self._spool is not None:
+                self._spool.seek(0)
+                while chunk := self._spool.read(self.CHUNK_SIZE):
+                    yield chunk
+            elif self._buffer:
+                yield bytes(self._buffer)
+            return
+
+        self._streamed = not replay
+        async for chunk in self._chunks():
+            if replay:
+                self._store(chunk)
+            yield chunk
+
+    async def text(self):
+        return (await self.body()).decode()
+
+    async def parts(
+        self,
+        max_size: t.Optional[int] = None,
+        max_part_size: t.Optional[int] = None,
+        max_field_size: int = 64 * 1024,
+        max_parts: t.Optional[int] = 1000,
+    ) -> "t.AsyncIterator[tuple[str, str | UploadFile]]":
+        """
+        Yields the `(name, value)` pairs of a multipart or urlencoded form as they are received.
+        File parts are written to temporary files and yielded as `UploadFile`s.
+
+        - `max_size`: The maximum size of the whole body in bytes. Optional: defaults to `max_body_size`.
+        - `max_part_size`: The maximum size of a file in bytes. Optional: defaults to no limit.
+        - `max_field_size`: The maximum size of a non-file field in bytes.
+        - `max_parts`: The maximum number of fields and files. Optional: defaults to 1000.
+        """
+        content_type = self.headers.get(b"content-type")
+        kind, options = parse_options(content_type[0] if content_type else "")
+
+        # Only for this call, so the body can still be read up to `max_body_size` otherwise
+        limit = self.max_body_size
+        if max_size is not None and (limit is None or max_size < limit):
+            limit = max_size
+
+        if kind == "multipart/form-data" and options.get("boundary"):
+            async for name, value in iter_multipart(
+                self._limited(self.stream(), limit),
+                options["boundary"].encode("latin-1"),
+                self.spool_size,
+                max_part_size,
+                max_field_size,
+                max_parts,
+            ):
+                if isinstance(value, UploadFile):
+                    self._uploads.append(value)
+                yield name, value
+
+        elif kind == "application/x-www-form-urlencoded":
+            body = bytearray()
+            async for chunk in self._limited(self.stream(replay=True), limit):
+                body += chunk
+            entries = parse_urlencoded(bytes(body))
+            if max_parts is not None and len(entries) > max_parts:
+                raise RouteError(413, "Too many form parts", Headers())
+            for part in entries:
+                yield part
+
+        else:
+            raise RouteError(415, "Unsupported Media Type", Headers())
+
+    async def _limited(self, chunks: t.AsyncIterator[bytes], limit: t.Optional[int]) -> t.AsyncIterator[bytes]:
+        """
+        Passes `chunks` through, raising a 413 `RouteError` once they add up to more than `limit` bytes.
+        """
+        if limit is None:
+            async for chunk in chunks:
+                yield chunk
+            return
 
-        return self._body.decode()
\ No newline at end of file
+        length = self.headers.get(b"content-length")
+        if length and length[0].isdigit() and int(length[0]) > limit:
+            raise RouteError(413, "Request Entity Too Large", Headers())
+
+        size = 0
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > limit:
+                raise RouteError(413, "Request Entity Too Large", Headers())
+            yield chunk
+
+    async def form(self, **limits: t.Any) -> FormData:
+        """
+        Reads the whole form. Takes the same limits as `parts`.
+        """
+        if self._form is None:
+            form = FormData()
+            try:
+                async for name, value in self.parts(**limits):
+                    form.append(name, value)
+            except BaseException:
+                form.close()
+                raise
+            self._form = form
+
+        return self._form
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        if self._form is not None:
+            self._form.close()
+        for upload in self._uploads:
+            upload.close()
+        self._uploads = []
@@ -1,5 +1,7 @@
 from .response import Response
-from .constructor import ResponseConstructor
+from .constructor import ResponseConstructor, SSEEvent
 from .error import RouteError
 from .stream import StreamResponse
+from .compression import Compression
+from .encoder import JSONEncoder
 from .utils import Headers, Cookie, URL
\ No newline at end of file
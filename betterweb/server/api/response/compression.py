@@ -0,0 +1,239 @@
+import typing as t
+import zlib
+import asyncio as io
+
+if t.TYPE_CHECKING:
+    from ..types import sendType
+    from ...middleware import ASGIApp
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard  # type: ignore[import-not-found]
+except ImportError:
+    zstandard = None
+
+
+class Encoder:
+    """
+    A streaming compressor for one response.
+    """
+
+    def __init__(self, encoding: str, level: t.Optional[int] = None):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(
+                6 if level is None else level, zlib.DEFLATED, 31
+            )
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=4 if level is None else level)
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(
+                level=3 if level is None else level
+            ).compressobj()
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """
+        Compresses a chunk. With `flush` everything given so far can be decoded by the client right away.
+        """
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            return out + self._compressor.flush() if flush else out
+
+        out = self._compressor.compress(data)
+        if flush:
+            if self.encoding == "gzip":
+                out += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            else:
+                out += self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return out
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+    def all(self, data: bytes) -> bytes:
+        return self.compress(data) + self.finish()
+
+
+class Compression:
+    """
+    Compresses responses for clients that accept it.
+
+    - `minimum_size`: Complete bodies smaller than this many bytes are sent as is.
+    - `content_types`: Only responses whose content type starts with one of these are compressed.
+    - `encodings`: The encodings to offer, most preferred first. `br` needs `brotli` and `zstd` needs `zstandard` installed.
+    - `level`: The compression level. Optional: defaults to a fast level for each encoding.
+    - `thread_size`: Complete bodies of at least this many bytes are compressed in a thread instead of on the event loop.
+    - `flush`: Flush the compressor after every streamed chunk, so clients see chunks as they are sent.
+    """
+
+    CONTENT_TYPES = (
+        "text/",
+        "application/json",
+        "application/x-ndjson",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+    )
+
+    def __init__(
+        self,
+        minimum_size: int = 500,
+        content_types: t.Iterable[str] = CONTENT_TYPES,
+        encodings: t.Iterable[str] = ("zstd", "br", "gzip"),
+        level: t.Optional[int] = None,
+        thread_size: int = 1024 * 1024,
+        flush: bool = True,
+    ):
+        self.minimum_size = minimum_size
+        self.content_types = tuple(c.encode("ascii") for c in content_types)
+        self.encodings = [
+            e
+            for e in encodings
+            if (e != "br" or brotli is not None) and (e != "zstd" or zstandard is not None)
+        ]
+        self.level = level
+        self.thread_size = thread_size
+        self.flush = flush
+
+    def negotiate(self, accept_encoding: str) -> t.Optional[str]:
+        """
+        Picks the most preferred offered encoding that `accept_encoding` allows.
+        """
+        accepted: dict[str, float] = {}
+        for item in accept_encoding.split(","):
+            name, _, params = item.partition(";")
+            q = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            accepted[name.strip().lower()] = q
+
+        for encoding in self.encodings:
+            if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return None
+
+    def compressible(self, headers: "t.Iterable[tuple[bytes, bytes]]") -> bool:
+        content_type = None
+        for k, v in headers:
+            k = k.lower()
+            if k == b"content-encoding":
+                return False
+            if k == b"content-type":
+                content_type = v.lower()
+        return content_type is not None and content_type.startswith(self.content_types)
+
+    @staticmethod
+    def encoded_headers(
+        headers: "t.Iterable[tuple[bytes, bytes]]", encoding: str
+    ) -> "list[tuple[bytes, bytes]]":
+        """
+        The headers of a response once it is compressed with `encoding`.
+
+        A strong ETag promises the same bytes, which the compressed body is not, so it is made weak.
+        Weak comparison still matches it to `If-None-Match`, as the content is the same.
+        `accept-encoding` is added to an existing `Vary` rather than sent as a second one.
+        """
+        out = []
+        vary = False
+        for k, v in headers:
+            name = k.lower()
+            if name == b"content-length":
+                continue
+            if name == b"etag" and not v.startswith(b"W/"):
+                v = b"W/" + v
+            elif name == b"vary":
+                vary = True
+                values = [value.strip().lower() for value in v.split(b",")]
+                if b"*" not in values and b"accept-encoding" not in values:
+                    v = v + b", accept-encoding"
+            out.append((k, v))
+        if not vary:
+            out.append((b"vary", b"accept-encoding"))
+        out.append((b"content-encoding", encoding.encode("ascii")))
+        return out
+
+    def __call__(self, app: "ASGIApp") -> "ASGIApp":
+        """
+        Wraps an ASGI app, so `Compression` can be used as middleware for the whole app or single routes.
+        """
+
+        async def compress(scope, receive, send):
+            if scope["type"] == "http":
+                accept = b",".join(
+                    v for k, v in scope["headers"] if k.lower() == b"accept-encoding"
+                )
+                send = self.wrap(accept.decode("latin-1"), send)
+            await app(scope, receive, send)
+
+        return compress
+
+    def wrap(self, accept_encoding: str, send: "sendType") -> "sendType":
+        """
+        Returns a `send` that compresses the response passed through it.
+        """
+        encoding = self.negotiate(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            return send
+
+        start: t.Optional[dict] = None
+        encoder: t.Optional[Encoder] = None
+
+        async def _send(message):
+            nonlocal start, encoder
+
+            if message["type"] == "http.response.start":
+                if self.compressible(message.get("headers", [])):
+                    start = message
+                    return
+                return await send(message)
+
+            if message["type"] != "http.response.body" or (start is None and encoder is None):
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                assert start is not None
+                if not more_body and len(body) < self.minimum_size:
+                    await send(start)
+                    start = None
+                    return await send(message)
+
+                headers = self.encoded_headers(start.get("headers", []), encoding)
+                if not more_body:
+
+                    compressor = Encoder(encoding, self.level)
+                    if len(body) >= self.thread_size:
+                        body = await io.to_thread(compressor.all, body)
+                    else:
+                        body = compressor.all(body)
+                    headers.append((b"content-length", str(len(body)).encode("ascii")))
+                else:
+                    encoder = Encoder(encoding, self.level)
+
+                await send({**start, "headers": headers})
+                start = None
+
+                if encoder is None:
+                    return await send({**message, "body": body})
+
+            if more_body:
+                data = encoder.compress(body, self.flush)
+            else:
+                data = encoder.compress(body) + encoder.finish()
+            await send({**message, "body": data})
+
+        return _send  # type: ignore[return-value]
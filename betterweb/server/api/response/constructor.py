@@ -1,15 +1,33 @@
+import re
 import typing as t
-import msgspec as ms
+import asyncio as io
 
 if t.TYPE_CHECKING:
     from ..types import sendType, ConstructorOptions, OPTIONS
+    from ..request import ASGIReceiveCallable
 from .stream import StreamResponse
 from .response import Response
 from datetime import datetime
 from .utils import Headers, Cookie
+from .utils.headers import EMPTY_HEADERS
+from .encoder import JSONEncoder
+from .etag import make_etag, etag_matches
+from ..timing import NULL_SPAN
+
+# The line breaks of the event stream format, unlike `str.splitlines`, which also splits on U+2028 and others
+SSE_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+
+class SSEEvent(t.TypedDict, total=False):
+    data: t.Any
+    event: str
+    id: str
+    retry: int
 
 
 class ResponseConstructor:
+    encoder = JSONEncoder()
+
     def __init__(
         self,
         send: "sendType",
@@ -18,6 +36,10 @@ class ResponseConstructor:
         self.send = send
         self.options = options
         self.cookies = []
+        encoder = options.get("encoder")
+        if encoder is not None:
+            self.encoder = encoder
+        self._etag: t.Optional[str] = None
 
     async def __call__(
         self, body: t.Optional[bytes] = None, options: t.Optional["OPTIONS"] = None
@@ -25,22 +47,104 @@ class ResponseConstructor:
         options = options or {
             "status": 200,
             "statusText": "",
-            "headers": Headers(),
+            "headers": EMPTY_HEADERS.copy(),
         }
+        await self.respond(body or b"", options)
+        return Response(body, options, self.options)
+
+    def raw_headers(
+        self,
+        headers: Headers,
+        length: t.Optional[int] = None,
+        content_type: t.Optional[bytes] = None,
+        extra: "t.Optional[list[tuple[bytes, bytes]]]" = None,
+    ) -> list[tuple[bytes, bytes]]:
+        """
+        Builds the ASGI header list,
+        adding `content-type` and `content-length` unless already set, a `set-cookie` per cookie and `extra`.
+        When nothing is added, the raw list of `headers` is returned as is.
+        """
+        added: list[tuple[bytes, bytes]] = []
+        if content_type is not None and b"content-type" not in headers:
+            added.append((b"content-type", content_type))
+        if length is not None and b"content-length" not in headers:
+            added.append((b"content-length", str(length).encode("ascii")))
+        for cookie in self.cookies:
+            added.append((b"set-cookie", str(cookie).encode("latin-1")))
+        if extra:
+            added.extend(extra)
+
+        if not added:
+            return headers.raw()
+        return [*headers.raw(), *added]
+
+    async def respond(
+        self,
+        body: bytes,
+        options: "OPTIONS",
+        content_type: t.Optional[bytes] = None,
+    ):
+        """
+        Sends a complete response: one start event with every header, then the whole body.
+        """
+        etag = None
+        # An ETag names a version of the resource, which an error or redirect body is not
+        if options["status"] == 200:
+            etag = self._etag
+            if etag is None and self.options.get("etag"):
+                etag = make_etag(body, self.options.get("etag") == "weak")
+            if etag is not None and self.if_none_match(etag):
+                return await self.not_modified(etag)
+
+        headers = self.raw_headers(
+            options["headers"],
+            len(body),
+            content_type,
+            [(b"etag", etag.encode("latin-1"))] if etag is not None else None,
+        )
+
         await self.send(
             {
                 "type": "http.response.start",
                 "status": options["status"],
-                "headers": options["headers"],
+                "headers": headers,
             }
         )
-        await self.send(
-            {
-                "type": "http.response.body",
-                "body": b"",
-            }
-        )
-        return Response(body, options, self.options)
+        await self.send({"type": "http.response.body", "body": body})
+
+    async def etag(self, value: str, weak: bool = False) -> bool:
+        """
+        Sets the ETag of the response before rendering it, e.g. from a version number.
+
+        If the request already has that version, a `304 Not Modified` is sent and `True` returned,
+        so the handler can return without rendering.
+
+        - `value`: The ETag, quoted or not.
+        - `weak`: Whether the ETag is weak. Defaults to False.
+        """
+        tag = value if value.startswith(('"', 'W/"')) else f'"{value}"'
+        if weak and not tag.startswith("W/"):
+            tag = f"W/{tag}"
+        self._etag = tag
+
+        if self.if_none_match(tag):
+            await self.not_modified(tag)
+            return True
+        return False
+
+    def if_none_match(self, etag: str) -> bool:
+        request = self.options.get("request")
+        if request is None:
+            return False
+        return etag_matches(request.headers.get(b"if-none-match"), etag)
+
+    async def not_modified(self, etag: str):
+        headers = [(b"etag", etag.encode("latin-1"))]
+        for cookie in self.cookies:
+            headers.append((b"set-cookie", str(cookie).encode("latin-1")))
+
+        await self.send({"type": "http.response.start", "status": 304, "headers": headers})
+        await self.send({"type": "http.response.body", "body": b""})
 
     def cookie(
         self,
@@ -85,27 +189,185 @@ class ResponseConstructor:
 
     async def start(self, status: int, headers: Headers):
         await self.send(
-            {"type": "http.response.start", "status": status, "headers": headers}
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": self.raw_headers(headers),
+            }
         )
 
-    async def json(self, data: dict, options: t.Optional["OPTIONS"] = None):
-        json = ms.json.encode(data)
+    async def json(self, data: t.Any, options: t.Optional["OPTIONS"] = None):
+        """
+        Sends `data` as JSON. It can be anything `msgspec` encodes, including `msgspec.Struct`s.
+        """
+        with self.span("encode"):
+            json = self.encoder.encode(data)
 
-        options = options or {"status": 200, "headers": Headers(), "statusText": ""}
+        options = options or {"status": 200, "headers": EMPTY_HEADERS.copy(), "statusText": ""}
 
-        await self.start(
-            options["status"],
-            options["headers"],
+        await self.respond(json, options, b"application/json")
+
+        return Response(json, options, self.options)
+
+    async def stream(self, options: t.Optional["OPTIONS"] = None) -> StreamResponse:
+        """
+        Starts a streamed response, returning a `StreamResponse` to `send` chunks to and `close`.
+        """
+        return await StreamResponse.init(self.send, options, self.cookies)
+
+    async def stream_from(
+        self, source: t.AsyncIterable[bytes], options: t.Optional["OPTIONS"] = None
+    ) -> StreamResponse:
+        """
+        Streams the chunks of `source`, at the pace the client reads them, and stops it if the client disconnects.
+        """
+        stream = await StreamResponse.init(self.send, options, self.cookies)
+        await stream.pipe(source, self.receive)
+        return stream
+
+    def span(self, name: str) -> t.ContextManager[None]:
+        request = self.options.get("request")
+        if request is None:
+            return NULL_SPAN
+        return request.span(name)
+
+    @property
+    def receive(self) -> "t.Optional[ASGIReceiveCallable]":
+        request = self.options.get("request")
+        return request.receive if request is not None else None
+
+    async def ndjson(
+        self,
+        items: "t.AsyncIterable[t.Any] | t.Iterable[t.Any]",
+        options: t.Optional["OPTIONS"] = None,
+        batch_size: int = 100,
+    ):
+        """
+        Streams `items` as newline-delimited JSON as they are produced.
+
+        - `items`: An iterable or async iterable of anything `msgspec` encodes.
+        - `batch_size`: The number of items encoded into each chunk sent.
+        """
+
+        async def batches():
+            batch: list[t.Any] = []
+            if isinstance(items, t.AsyncIterable):
+                async for item in items:
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        yield self.encoder.encode_lines(batch)
+                        batch.clear()
+            else:
+                for item in items:
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        yield self.encoder.encode_lines(batch)
+                        batch.clear()
+
+            if batch:
+                yield self.encoder.encode_lines(batch)
+
+        return await self.stream_from(
+            batches(), self._with_headers(options, b"application/x-ndjson")
         )
 
-        await self.send(
-            {
-                "type": "http.response.body",
-                "body": json,
-            }
+    async def sse(
+        self,
+        source: "t.AsyncIterable[SSEEvent | str | t.Any]",
+        options: t.Optional["OPTIONS"] = None,
+        heartbeat: t.Optional[float] = 15.0,
+        retry: t.Optional[int] = None,
+    ):
+        """
+        Streams `source` as Server-Sent Events.
+
+        - `source`: An async iterable of `SSEEvent`s, strings, or anything `msgspec` encodes as the event data.
+        - `heartbeat`: Seconds without events after which a comment is sent to keep the connection open. `None` disables it.
+        - `retry`: Milliseconds the browser should wait before reconnecting. Optional: defaults to the browser's choice.
+        """
+
+        async def events():
+            if retry is not None:
+                yield f"retry: {retry}\n\n".encode()
+
+            iterator = aiter(source)
+            upcoming = io.ensure_future(anext(iterator))
+            try:
+                while True:
+                    done, _ = await io.wait({upcoming}, timeout=heartbeat)
+                    if not done:
+                        yield b": ping\n\n"
+                        continue
+
+                    try:
+                        event = upcoming.result()
+                    except StopAsyncIteration:
+                        return
+
+                    yield self.sse_frame(event)
+                    upcoming = io.ensure_future(anext(iterator))
+            finally:
+                if not upcoming.done():
+                    upcoming.cancel()
+                    try:
+                        await upcoming
+                    except BaseException:
+                        pass
+                aclose = getattr(iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+
+        return await self.stream_from(
+            events(),
+            self._with_headers(
+                options,
+                b"text/event-stream",
+                [(b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")],
+            ),
         )
 
-        return Response(json, options, self.options)
+    def sse_frame(self, event: "SSEEvent | str | t.Any") -> bytes:
+        if not isinstance(event, dict) or "data" not in event:
+            event = {"data": event}
+
+        lines = []
+        if event.get("event") is not None:
+            lines.append(f"event: {self.sse_field('event', event['event'])}")
+        if event.get("id") is not None:
+            lines.append(f"id: {self.sse_field('id', event['id'])}")
+        if event.get("retry") is not None:
+            lines.append(f"retry: {int(event['retry'])}")
+
+        data = event["data"]
+        if isinstance(data, bytes):
+            data = data.decode()
+        elif not isinstance(data, str):
+            data = self.encoder.encode(data).decode()
+        lines.extend(f"data: {line}" for line in SSE_LINE_BREAK.split(data))
+
+        return ("\n".join(lines) + "\n\n").encode()
+
+    @staticmethod
+    def sse_field(name: str, value: t.Any) -> str:
+        """
+        `value` as an event stream field, raising a `ValueError` if it has a line break or NUL, which would start another field.
+        """
+        value = str(value)
+        if "\r" in value or "\n" in value or "\0" in value:
+            raise ValueError(f"Server-sent event {name} cannot contain CR, LF or NUL: {value!r}")
+        return value
 
-    async def stream(self, options: t.Optional["OPTIONS"] = None):
-        return await StreamResponse.init(self.send, options)
+    @staticmethod
+    def _with_headers(
+        options: t.Optional["OPTIONS"],
+        content_type: bytes,
+        extra: "t.Optional[list[tuple[bytes, bytes]]]" = None,
+    ) -> "OPTIONS":
+        options = options or {"status": 200, "headers": EMPTY_HEADERS, "statusText": ""}
+        headers = options["headers"].copy()
+        if b"content-type" not in headers:
+            headers.append(b"content-type", content_type)
+        for k, v in extra or []:
+            if k not in headers:
+                headers.append(k, v)
+        return {**options, "headers": headers}
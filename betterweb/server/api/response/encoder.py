@@ -0,0 +1,60 @@
+import typing as t
+import msgspec as ms
+
+
+class JSONEncoder:
+    """
+    A reusable JSON encoder that encodes into pooled buffers.
+
+    Reusing the `msgspec.json.Encoder` and its output buffers means a response
+    does not grow a fresh buffer while encoding, only the final `bytes` are allocated.
+
+    - `buffer_size`: The starting size of a pooled buffer.
+    - `max_buffer_size`: Buffers grown past this are dropped instead of pooled, so one huge response does not pin memory.
+    - `pool_size`: The maximum number of idle buffers kept.
+    - `enc_hook`: Passed to `msgspec.json.Encoder`, to encode custom types.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 4096,
+        max_buffer_size: int = 1024 * 1024,
+        pool_size: int = 16,
+        enc_hook: t.Optional[t.Callable[[t.Any], t.Any]] = None,
+    ):
+        self.encoder = ms.json.Encoder(enc_hook=enc_hook)
+        self.buffer_size = buffer_size
+        self.max_buffer_size = max_buffer_size
+        self.pool_size = pool_size
+        self.pool: list[bytearray] = []
+
+    def acquire(self) -> bytearray:
+        if self.pool:
+            return self.pool.pop()
+        return bytearray(self.buffer_size)
+
+    def release(self, buffer: bytearray):
+        if len(buffer) <= self.max_buffer_size and len(self.pool) < self.pool_size:
+            self.pool.append(buffer)
+
+    def encode(self, data: t.Any) -> bytes:
+        buffer = self.acquire()
+        try:
+            self.encoder.encode_into(data, buffer)
+            return bytes(buffer)
+        finally:
+            self.release(buffer)
+
+    def encode_lines(self, items: t.Iterable[t.Any]) -> bytes:
+        """
+        Encodes `items` as newline-delimited JSON.
+        """
+        buffer = self.acquire()
+        try:
+            del buffer[:]
+            for item in items:
+                self.encoder.encode_into(item, buffer, -1)
+                buffer.append(10)
+            return bytes(buffer)
+        finally:
+            self.release(buffer)
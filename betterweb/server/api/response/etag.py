@@ -0,0 +1,27 @@
+import zlib
+import hashlib
+
+
+def make_etag(body: bytes, weak: bool = True) -> str:
+    """
+    Builds an ETag from the body.
+
+    A weak ETag uses a fast CRC-32 and the length, which is enough to tell versions apart.
+    A strong ETag promises the same bytes, so it uses a 128-bit BLAKE2b digest that collisions cannot be expected for.
+    """
+    if weak:
+        return f'W/"{len(body):x}-{zlib.crc32(body):08x}"'
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: list[str], etag: str) -> bool:
+    """
+    Whether any `If-None-Match` header value matches `etag`, using the weak comparison the header calls for.
+    """
+    etag = etag.removeprefix("W/")
+    for header in if_none_match:
+        for candidate in header.split(","):
+            candidate = candidate.strip()
+            if candidate == "*" or candidate.removeprefix("W/") == etag:
+                return True
+    return False
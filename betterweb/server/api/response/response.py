@@ -21,7 +21,7 @@ class Response:
         self._body = body
         self._options = options
         self._constructor = constructor
-        self._url = constructor["url"]
+        self._request = constructor["request"]
         self._redirect = constructor["redirect"]
         self._type = constructor["type"]
 
@@ -30,7 +30,6 @@ class Response:
         self._status = options["status"]
         self._statusText = options["statusText"]
         self._headers = options["headers"]
-        self._cookies = constructor["cookies"]
 
     @property
     def body(self):
@@ -66,11 +65,11 @@ class Response:
 
     @property
     def url(self):
-        return self._url
+        return self._request.url
 
     @property
     def cookies(self):
-        self._cookies
+        return self._request.cookies
 
     def json(self):
         return ms.json.decode(self._body) # type: ignore
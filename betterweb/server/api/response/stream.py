@@ -1,34 +1,72 @@
 from .response import Response
 import typing as t
-from .utils import Headers
+import asyncio as io
+import weakref
+from .utils import Cookie
+from .utils.headers import EMPTY_HEADERS
 
 if t.TYPE_CHECKING:
+    from ..request import ASGIReceiveCallable
     from ..types import sendType, OPTIONS
 
 class StreamResponse(Response):
+    # Streams started and not yet closed, to end them when the server shuts down.
+    # Weak, as a handler that fails may never close its stream
+    streams: "weakref.WeakSet[StreamResponse]" = weakref.WeakSet()
+
     def __init__(self, send: 'sendType', options: 't.Optional[OPTIONS]' = None):
         self._send = send
         self.options = options or {
             "status": 200,
             "statusText": "",
-            "headers": Headers(),
+            "headers": EMPTY_HEADERS.copy(),
         }
+        self.closed = False
+        self._pump: 't.Optional[io.Future[None]]' = None
 
     @classmethod
-    async def init(cls, send: 'sendType', options: 't.Optional[OPTIONS]' = None):
+    async def init(
+        cls,
+        send: 'sendType',
+        options: 't.Optional[OPTIONS]' = None,
+        cookies: 't.Optional[list[Cookie]]' = None,
+    ):
         self = cls(send, options)
 
+        headers = self.options["headers"].raw()
+        if cookies:
+            headers = [
+                *headers,
+                *((b"set-cookie", str(cookie).encode("latin-1")) for cookie in cookies),
+            ]
+
         await self._send(
             {
                 "type": "http.response.start",
-                "status": 200,
-                "headers": self.options["headers"],
+                "status": self.options["status"],
+                "headers": headers,
             }
         )
+        cls.streams.add(self)
 
         return self
 
+    @property
+    def events(self) -> bool:
+        """
+        Whether this is a Server-Sent Events stream, which browsers reconnect to on their own.
+        """
+        return any(
+            value.startswith("text/event-stream")
+            for value in self.options["headers"].get("content-type")
+        )
+
     async def send(self, data: bytes):
+        """
+        Sends a chunk. Does nothing once the stream is closed, so check `closed` to stop producing them.
+        """
+        if self.closed:
+            return
         await self._send(
             {
                 "type": "http.response.body",
@@ -38,6 +76,10 @@ class StreamResponse(Response):
         )
 
     async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.streams.discard(self)
         await self._send(
             {
                 "type": "http.response.body",
@@ -45,3 +87,86 @@ class StreamResponse(Response):
                 "more_body": False,
             }
         )
+
+    async def end(self, retry: t.Optional[int] = None):
+        """
+        Closes the stream early, stopping the `source` being piped into it, e.g. when the server shuts down.
+
+        - `retry`: For Server-Sent Events, the milliseconds the browser should wait before reconnecting.
+        """
+        if self.closed:
+            return
+        if self._pump is not None:
+            self._pump.cancel()
+        if retry is not None and self.events:
+            await self.send(f"retry: {retry}\n\n".encode())
+        await self.close()
+
+    async def pipe(
+        self,
+        source: t.AsyncIterable[bytes],
+        receive: 't.Optional[ASGIReceiveCallable]' = None,
+    ):
+        """
+        Sends every chunk of `source` then closes the stream.
+
+        The next chunk is only requested once the previous one was accepted by the transport,
+        so a slow client slows down `source`. If `receive` is given and the client disconnects,
+        `source` is stopped and closed. Any unread request body is discarded.
+        If `source` raises, it is closed and the error raised, without ending the body as if it were complete.
+        """
+
+        async def pump():
+            async for chunk in source:
+                await self.send(chunk)
+
+        sending = self._pump = io.ensure_future(pump())
+        waiting: "set[io.Future[None]]" = {sending}
+        listening = None
+        if receive is not None:
+            listening = io.ensure_future(self._disconnect(receive))
+            waiting.add(listening)
+
+        finished = False
+        try:
+            try:
+                await io.wait(waiting, return_when=io.FIRST_COMPLETED)
+            finally:
+                if listening is not None:
+                    listening.cancel()
+
+            if sending.done() and not sending.cancelled():
+                # Raises what `source` raised
+                sending.result()
+                finished = True
+                await self.close()
+                return
+
+            # The client disconnected, or the stream was ended
+            sending.cancel()
+            try:
+                await sending
+            except io.CancelledError:
+                pass
+        finally:
+            self._pump = None
+            if not finished:
+                if not sending.done():
+                    # Let the generator unwind before closing it, as it cannot be closed while running
+                    sending.cancel()
+                    try:
+                        await sending
+                    except (io.CancelledError, Exception):
+                        pass
+                self.closed = True
+                self.streams.discard(self)
+                aclose = getattr(source, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+
+    @staticmethod
+    async def _disconnect(receive: 'ASGIReceiveCallable'):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
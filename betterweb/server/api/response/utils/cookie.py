@@ -62,7 +62,7 @@ class Cookie:
         if self.secure:
             options.append("Secure")
 
-        return f"{self.name}={self.value}; {"; ".join(options)}"
+        return "; ".join([f"{self.name}={self.value}", *options])
 
     @staticmethod
     def to_dict(cookies: "list[Cookie]"):
@@ -1,9 +1,20 @@
 import typing as t
 
+
 class Headers:
+    """
+    A case-insensitive multi-dict over an ASGI header list.
+
+    The raw list is kept as is and can be passed to `send` without copying.
+    A lowercase index is built on the first lookup.
+    Copies share the list until one of them is changed.
+    """
+
+    __slots__ = ("_raw", "_index", "_shared")
+
     def __init__(
         self,
-        headers: "t.Iterable[tuple[bytes | str, bytes | str]]" = [],
+        headers: "t.Iterable[tuple[bytes | str, bytes | str]]" = (),
         **kwargs: "str | bytes",
     ):
         heads: "list[tuple[bytes, bytes]]" = []
@@ -16,13 +27,68 @@ class Headers:
             heads.append((k, v))
 
         for k, v in kwargs.items():
-            if isinstance(k, str):
-                k = k.encode()
             if isinstance(v, str):
                 v = v.encode()
-            heads.append((k, v))
-
-        self.headers = heads
+            heads.append((k.encode(), v))
+
+        self._raw = heads
+        self._index: "t.Optional[dict[bytes, list[bytes]]]" = None
+        self._shared = False
+
+    @classmethod
+    def from_raw(cls, headers: "list[tuple[bytes, bytes]]"):
+        """
+        Wraps an ASGI header list as is, without copying or re-encoding it.
+        The list is copied before the first change, so it is never modified.
+        """
+        self = cls.__new__(cls)
+        self._raw = headers
+        self._index = None
+        self._shared = True
+        return self
+
+    @property
+    def headers(self) -> "list[tuple[bytes, bytes]]":
+        return self._raw
+
+    def raw(self) -> "list[tuple[bytes, bytes]]":
+        """
+        The ASGI header list, to pass to `send` without copying. Do not modify it.
+        """
+        return self._raw
+
+    def copy(self) -> "Headers":
+        """
+        Returns a copy that shares the header list until either one is changed.
+        """
+        copy = Headers.from_raw(self._raw)
+        copy._index = self._index
+        self._shared = True
+        return copy
+
+    def _lookup(self) -> "dict[bytes, list[bytes]]":
+        if self._index is None:
+            index: "dict[bytes, list[bytes]]" = {}
+            for k, v in self._raw:
+                k = k.lower()
+                if k in index:
+                    index[k].append(v)
+                else:
+                    index[k] = [v]
+            self._index = index
+        return self._index
+
+    def _own(self):
+        if self._shared:
+            self._raw = list(self._raw)
+            self._index = None
+            self._shared = False
+
+    @staticmethod
+    def _key(key: str | bytes) -> bytes:
+        if isinstance(key, str):
+            key = key.encode()
+        return key.lower()
 
     @t.overload
     def get(self, key: str | bytes, bytes: t.Literal[False] = False) -> list[str]: ...
@@ -31,13 +97,43 @@ class Headers:
     def get(self, key: str | bytes, bytes: t.Literal[True] = True) -> list[bytes]: ...
 
     def get(self, key: str | bytes, bytes: bool = False):  # type: ignore[override]
-        if isinstance(key, str):
-            key = key.encode()
-        return [v.decode() if bytes else v for k, v in self.headers if k == key]
+        values = self._lookup().get(self._key(key), [])
+        if bytes:
+            return list(values)
+        return [v.decode() for v in values]
 
     def __getitem__(self, key: str | bytes):
         return self.get(key)
 
+    def append(self, key: str | bytes, value: str | bytes):
+        self._own()
+        if isinstance(key, str):
+            key = key.encode()
+        if isinstance(value, str):
+            value = value.encode()
+        self._raw.append((key, value))
+        if self._index is not None:
+            self._index.setdefault(key.lower(), []).append(value)
+
+    def remove(self, key: str | bytes):
+        key = self._key(key)
+        if key not in self:
+            return
+        self._own()
+        self._raw[:] = [(k, v) for k, v in self._raw if k.lower() != key]
+        if self._index is not None:
+            self._index.pop(key, None)
+
+    def set(self, key: str | bytes, value: str | bytes):
+        self.remove(key)
+        self.append(key, value)
+
+    def __setitem__(self, key: str | bytes, value: str | bytes):
+        self.set(key, value)
+
+    def __delitem__(self, key: str | bytes):
+        self.remove(key)
+
     @t.overload
     def items(self, bytes: t.Literal[False] = False) -> list[tuple[str, str]]: ...
 
@@ -46,24 +142,31 @@ class Headers:
 
     def items(self, bytes: bool = False):
         if bytes:
-            return self.headers
-        return [(k.decode(), v.decode()) for k, v in self.headers]
+            return self._raw
+        return [(k.decode(), v.decode()) for k, v in self._raw]
 
     def __iter__(self):
-        return iter(self.headers)
+        return iter(self._raw)
 
     def __len__(self):
-        return len(self.headers)
+        return len(self._raw)
 
     def __eq__(self, other: t.Any) -> bool:
         if not isinstance(other, Headers):
             return False
-        return self.headers == other.headers
+        return self._raw == other._raw
 
     def __contains__(self, key: str | bytes):
-        if isinstance(key, str):
-            key = key.encode()
-        return any(k == key for k, v in self.headers)
+        return self._key(key) in self._lookup()
 
     def __bool__(self):
-        return bool(self.headers)
+        return bool(self._raw)
+
+    def __repr__(self):
+        return f"Headers({self._raw!r})"
+
+
+EMPTY_HEADERS = Headers.from_raw([])
+"""
+A shared empty `Headers`. Never change it: defaults take a `copy()`, which shares the empty list until it is changed.
+"""
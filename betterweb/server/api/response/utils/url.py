@@ -4,7 +4,7 @@ from .....client import Router
 
 class URL:
     REGEX = re.compile(
-        "([a-zA-Z][a-zA-Z0-9+.-]*):\\/\\/(?:([^/#?:@]*)(?::([0-9]*))?@)?(?:([^#:]*)(?::([0-9]+))?)?(?:([^?#]*))(?:\\?([^#]*))?(?:#(.*))?"
+        "([a-zA-Z][a-zA-Z0-9+.-]*):\\/\\/(?:([^/#?:@]*)(?::([0-9]*))?@)?(?:([^/#?:]*)(?::([0-9]+))?)?(?:([^?#]*))(?:\\?([^#]*))?(?:#(.*))?"
     )
 
     @t.overload
@@ -1,8 +1,11 @@
 import typing as t
+import inspect
+import msgspec as ms
 from .response.error import RouteError
 from .response.constructor import ResponseConstructor
 from ..dom import DOMNode, DOM
 from .response import Headers, Cookie
+from .cache import ResponseCache
 
 if t.TYPE_CHECKING:
     from .types import (
@@ -13,36 +16,100 @@ if t.TYPE_CHECKING:
         HTTPScope,
         websocketSendEvents,
     )
+    from ..middleware import Middleware
 
 
 class APIRoute:
+    # Methods whose requests have no body to decode
+    BODYLESS = frozenset({"GET", "HEAD"})
+
     def __init__(
         self,
         methods: list[str],
-        handler: 't.Callable[["Request", ResponseConstructor], t.Awaitable[None]]',
+        handler: 't.Callable[..., t.Awaitable[None]]',
+        cache: t.Optional[ResponseCache] = None,
+        etag: 't.Optional[t.Literal["weak", "strong"]]' = None,
+        middleware: 't.Optional[list[Middleware]]' = None,
     ):
+        """
+        - `methods`: The HTTP methods the route accepts.
+        - `handler`: Called with the `Request` and a `ResponseConstructor`.
+          If it takes a third, annotated positional parameter without a default, the JSON body is decoded and validated as that type and passed in.
+          GET and HEAD requests have no body, so they pass `None`.
+        - `cache`: Serves repeated requests from a `ResponseCache` without calling the handler. Optional: defaults to no caching.
+        - `etag`: Adds a `"weak"` or `"strong"` ETag hashed from each complete response body, and answers matching `If-None-Match` requests with a 304. Optional: defaults to no ETags.
+        - `middleware`: Middleware run for this route only, inside the app's and router's. Optional: defaults to none.
+        """
         self.methods = methods
         self.handler = handler
+        self.cache = cache
+        self.etag = etag
+        self.middleware = middleware or []
+        self.decoder = self.body_decoder(handler, methods)
+
+    @classmethod
+    def body_decoder(cls, handler: t.Callable, methods: t.Iterable[str]) -> "t.Optional[ms.json.Decoder]":
+        """
+        Builds the decoder for the body parameter of `handler`, if it has one and a method of the route can send a body.
+        """
+        if all(method.upper() in cls.BODYLESS for method in methods):
+            return None
+
+        params = list(inspect.signature(handler).parameters.values())
+        if len(params) < 3:
+            return None
+        param = params[2]
+        if (
+            param.kind not in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD)
+            or param.default is not param.empty
+            or param.annotation is param.empty
+        ):
+            return None
+
+        try:
+            annotation = t.get_type_hints(handler).get(param.name, t.Any)
+        except Exception:
+            # A forward reference that can not be resolved is decoded as any JSON value
+            annotation = param.annotation
+            if isinstance(annotation, str):
+                annotation = t.Any
+
+        return ms.json.Decoder(annotation)
 
     async def __call__(
         self,
         request: "Request",
         send: "sendType",
     ) -> None:
+        if request.method not in self.methods:
+            raise RouteError(405, "Method Not Allowed", Headers())
+
+        if self.cache is not None:
+            await self.cache.serve(request, send, lambda send: self.handle(request, send))
+        else:
+            await self.handle(request, send)
+
+    async def handle(self, request: "Request", send: "sendType") -> None:
         response = ResponseConstructor(
             send,
             {
-                "url": request.url,
+                "request": request,
                 "redirect": False,
                 "type": "basic",
-                "cookies": request.cookies,
+                "etag": self.etag,
+                "encoder": request.json_encoder,
             },
         )
 
-        if request.method not in self.methods:
-            raise RouteError(405, "Method Not Allowed", Headers())
-
-        await self.handler(request, response)
+        if self.decoder is not None:
+            body = None
+            if request.method not in self.BODYLESS:
+                body = await request.json(decoder=self.decoder)
+            with request.span("handler"), request.trace("handler"):
+                await self.handler(request, response, body)
+        else:
+            with request.span("handler"), request.trace("handler"):
+                await self.handler(request, response)
 
 
 T = t.TypeVar("T")
@@ -53,6 +120,16 @@ class Receive(t.TypedDict):
     text: t.Optional[str]
 
 
+class Disconnected(Exception):
+    """
+    Raised by `Websocket.receive` once the client has gone, with the close `code` it sent.
+    """
+
+    def __init__(self, code: int = 1000):
+        super().__init__(f"Websocket disconnected with code {code}")
+        self.code = code
+
+
 class Websocket:
     def __init__(self, send: "websocketSendType", receive: "websocketReceiveType"):
         self._send = send
@@ -70,7 +147,7 @@ class Websocket:
                 "subprotocol": subprotocol,
                 "headers": Headers(
                     (headers or []), Cookie=str(Cookie.to_dict(cookies or []))
-                ),
+                ).raw(),
             }
         )
 
@@ -101,8 +178,13 @@ class Websocket:
         await self._send({"type": "websocket.close", "code": code, "reason": reason})
 
     async def receive(self) -> "Receive":
+        """
+        Waits for the next message, raising `Disconnected` once the client has gone.
+        """
         while True:
             msg = await self._receive()
+            if msg["type"] == "websocket.disconnect":
+                raise Disconnected(msg.get("code", 1000))
             if msg["type"] == "websocket.receive":
                 return {
                     "bytes": msg.get("bytes", None),
@@ -111,9 +193,15 @@ class Websocket:
 
 
 class WSRoute:
-    def __init__(self, handler: t.Callable[[Websocket], t.Awaitable[None]], close=True):
+    def __init__(
+        self,
+        handler: t.Callable[[Websocket], t.Awaitable[None]],
+        close=True,
+        middleware: "t.Optional[list[Middleware]]" = None,
+    ):
         self.handler = handler
         self.close = close
+        self.middleware = middleware or []
 
     async def __call__(
         self, send: "websocketSendType", receive: "websocketReceiveType"
@@ -129,7 +217,11 @@ class WSRoute:
         msg = await receive()
         if msg["type"] == "websocket.connect":
             websocket = Websocket(_send, receive)
-            await self.handler(websocket)
+            try:
+                await self.handler(websocket)
+            except Disconnected:
+                # There is no one left to send a close to
+                has_closed = True
 
         if self.close and not has_closed:
             await send({"type": "websocket.close"})
@@ -165,7 +257,9 @@ class Route:
 class StaticRoute:
     def __init__(self, path: str, data: bytes, mime: str):
         self.path = path
-        self.data = data
+        self._data: t.Optional[bytes] = data
+        self._load: t.Optional[t.Callable[[], bytes]] = None
+        self._headers: "t.Optional[list[tuple[bytes, bytes]]]" = None
         self.mime = mime
 
     @classmethod
@@ -174,15 +268,45 @@ class StaticRoute:
             content = f.read()
         return cls(path, content, mime)
 
+    @classmethod
+    def from_resource(cls, package: str, name: str, mime: str):
+        """
+        Serves the file `name` shipped inside `package`, read on the first request rather than at startup.
+        """
+        def load() -> bytes:
+            from importlib import resources
+
+            return resources.files(package).joinpath(name).read_bytes()
+
+        route = cls(name, b"", mime)
+        route._data = None
+        route._load = load
+        return route
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            self._data = self._load()  # type: ignore[misc]
+        return self._data
+
+    def prepare(self):
+        """
+        Reads the file and builds the response headers. Done on the first request, or on startup by `Warmup`.
+        """
+        self._headers = [
+            (b"content-type", self.mime.encode("ascii")),
+            (b"content-length", str(len(self.data)).encode("ascii")),
+        ]
+
     async def __call__(self, scope: "HTTPScope", receive, send: "sendType") -> None:
+        if self._headers is None:
+            self.prepare()
+
         await send(
             {
                 "type": "http.response.start",
                 "status": 200,
-                "headers": [
-                    (b"content-type", self.mime.encode("ascii")),
-                    (b"content-length", str(len(self.data)).encode("ascii")),
-                ],
+                "headers": self._headers,  # type: ignore[typeddict-item]
             }
         )
 
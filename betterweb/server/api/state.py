@@ -1,7 +1,13 @@
 import typing as t
+import time
+import asyncio as io
+from collections import OrderedDict
+from ..component import Component
+from ..tracing import Tracer
 
 T = t.TypeVar("T")
 I = t.TypeVar("I")
+R = t.TypeVar("R")
 
 
 class State(t.Generic[T, I]):
@@ -10,6 +16,7 @@ class State(t.Generic[T, I]):
     def __init__(self, initial: I):
         self.data = initial
         self.new = initial
+        self.subscribers: "set[Component]" = set()
         # Use lazy import to avoid circular dependency
         self._ws = None
 
@@ -36,45 +43,150 @@ class State(t.Generic[T, I]):
 
     @property
     def value(self) -> T | I:
+        Component.track(self)
         return self.data
 
     def dispatch(self, data: T):
-        self.new = data
-        self.ws.schedule_render()
+        with Tracer.span("state.dispatch", subscribers=len(self.subscribers)):
+            self.new = data
+            for component in list(self.subscribers):
+                component.dirty = True
+                self.ws.schedule_render(component)
 
 
-class Memo:
-    states: "dict[str, Memo]" = {}
+class MemoStats(t.TypedDict):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+
+class Memo(t.Generic[R]):
+    states: "OrderedDict[str, Memo]" = OrderedDict()
+    maxsize: t.Optional[int] = 1024
+    hits = 0
+    misses = 0
+    evictions = 0
 
     def __init__(
-        self, func: t.Callable[[], None | t.Callable[[], None]], deps: list[t.Any]
+        self,
+        func: t.Callable[[], R | t.Awaitable[R]],
+        deps: list[t.Any],
+        ttl: t.Optional[float] = None,
+        cleanup: t.Optional[t.Callable[[R], None]] = None,
     ):
         self.func = func
         self.deps = deps
-        self.cleanup = None
+        self.ttl = ttl
+        self.cleanup = cleanup
+        self.value: t.Optional[R] = None
+        # Whether `value` holds a result, as `None` can be one
+        self.computed = False
+        self.task: "t.Optional[io.Task[R]]" = None
+        self.created = 0.0
         self.run()
 
     def run(self):
-        if self.cleanup is not None:
-            self.cleanup()
+        self.clean()
+        self.created = time.monotonic()
+
+        if io.iscoroutinefunction(self.func):
+            self.task = io.ensure_future(self.func())  # type: ignore[arg-type]
+            self.task.add_done_callback(self._done)
+        else:
+            self.value = self.func()  # type: ignore[assignment]
+            self.computed = True
 
-        self.cleanup = self.func()
+    def _done(self, task: "io.Task[R]"):
+        if task.cancelled() or task.exception() is not None:
+            # Failed results are not cached, the next render retries
+            if task is self.task and Memo.states.get(self.func.__name__) is self:
+                del Memo.states[self.func.__name__]
+            return
+
+        if task is not self.task:
+            # Replaced while running: its awaiters have the result, and nothing else keeps it
+            if self.cleanup is not None:
+                self.cleanup(task.result())
+            return
+
+        self.value = task.result()
+        self.computed = True
+
+    def clean(self):
+        """
+        Lets go of the current value, calling `cleanup` with it.
+        A call still running is left to finish for the renders awaiting it, and cleaned up when it does.
+        """
+        self.task = None
+        if self.computed and self.cleanup is not None:
+            self.cleanup(self.value)  # type: ignore[arg-type]
+        self.value = None
+        self.computed = False
+
+    @property
+    def expired(self) -> bool:
+        return self.ttl is not None and time.monotonic() - self.created > self.ttl
+
+    def same(self, deps: list[t.Any]) -> bool:
+        if self.deps is deps:
+            return True
+        if len(self.deps) != len(deps):
+            return False
+        return all(a is b or a == b for a, b in zip(self.deps, deps))
+
+    def result(self) -> "R | t.Awaitable[R]":
+        if self.task is not None:
+            # Shielded so one cancelled render does not cancel the shared computation
+            return io.shield(self.task)
+        return self.value  # type: ignore[return-value]
 
     @classmethod
     def create(
-        cls, func: t.Callable[[], None | t.Callable[[], None]], deps: list[t.Any]
-    ):
-        if func.__name__ in cls.states:
-            effect = cls.states[func.__name__]
-            if effect.deps != deps:
-                effect.deps = deps
-                effect.run()
+        cls,
+        func: t.Callable[[], R | t.Awaitable[R]],
+        deps: list[t.Any],
+        ttl: t.Optional[float] = None,
+        cleanup: t.Optional[t.Callable[[R], None]] = None,
+    ) -> "Memo[R]":
+        name = func.__name__
+        memo = cls.states.get(name)
 
-            return effect
+        if memo is None:
+            cls.misses += 1
+            memo = cls(func, deps, ttl, cleanup)
+            cls.states[name] = memo
+            cls.evict()
+            return memo
+
+        cls.states.move_to_end(name)
+        memo.func = func
+        memo.ttl = ttl
+        memo.cleanup = cleanup
+        if memo.expired or not memo.same(deps):
+            cls.misses += 1
+            memo.deps = deps
+            memo.run()
         else:
-            effect = cls(func, deps)
-            cls.states[func.__name__] = effect
-            return effect
+            cls.hits += 1
+
+        return memo
+
+    @classmethod
+    def evict(cls):
+        while cls.maxsize is not None and len(cls.states) > cls.maxsize:
+            _, memo = cls.states.popitem(last=False)
+            memo.clean()
+            cls.evictions += 1
+
+    @classmethod
+    def stats(cls) -> MemoStats:
+        return {
+            "hits": cls.hits,
+            "misses": cls.misses,
+            "evictions": cls.evictions,
+            "size": len(cls.states),
+        }
 
 
 def use_state[
@@ -90,7 +202,7 @@ def use_state[
 
     - tuple[T | I, Callable[[T], None]]
         - The stateful value
-        - A function to dispatch a new value to the state, causing a rerender
+        - A function to dispatch a new value to the state, causing a rerender of the components that read it
     """
     if callable(initial):
         i = initial()
@@ -98,30 +210,58 @@ def use_state[
         i = initial
     state: State[T, T] = State.create(name, i)
 
-    return state.data, state.dispatch
+    return state.value, state.dispatch
+
+
+@t.overload
+def use_memo(
+    func: t.Callable[[], t.Awaitable[R]],
+    deps: t.Optional[list[t.Any]] = None,
+    ttl: t.Optional[float] = None,
+    cleanup: t.Optional[t.Callable[[R], None]] = None,
+) -> t.Awaitable[R]: ...
+
+
+@t.overload
+def use_memo(
+    func: t.Callable[[], R],
+    deps: t.Optional[list[t.Any]] = None,
+    ttl: t.Optional[float] = None,
+    cleanup: t.Optional[t.Callable[[R], None]] = None,
+) -> R: ...
 
 
 def use_memo(
-    func: t.Callable[[], None | t.Callable[[], None]],
+    func: t.Callable[[], t.Any],
     deps: t.Optional[list[t.Any]] = None,
+    ttl: t.Optional[float] = None,
+    cleanup: t.Optional[t.Callable[[t.Any], None]] = None,
 ):
     """
     Creates a memoized value.
-    Is run when the dependencies change.
+    Is run when the dependencies change, compared by identity then equality.
 
-    - `func`: The function to memoize. The name must be unique.
+    - `func`: The function to memoize. The name must be unique. Can be async.
     - `deps`: The dependencies of the memoized value. Optional: defaults to an empty list.
+    - `ttl`: Seconds after which the value is recomputed even if the dependencies are unchanged. Optional: defaults to never.
+    - `cleanup`: Called with a value once it is replaced or evicted, e.g. to close a connection. Optional: defaults to none.
 
     Returns:
 
-    - None
-    - Cleanup function - Called immediately before the next render
+    - The cached return value of `func`
+    - An awaitable of it if `func` is async. Concurrent awaits share one call,
+      which finishes for them even if the dependencies change meanwhile.
     """
 
     if deps is None:
         deps = []
 
-    e = Memo.create(func, deps)
+    return Memo.create(func, deps, ttl, cleanup).result()
 
-    if e.deps != deps:
-        e.deps = deps
+
+def memo_stats() -> MemoStats:
+    """
+    Returns the hit, miss and eviction counts of `use_memo`, and the number of cached memos.
+    At most `Memo.maxsize` memos are kept, least recently used first out.
+    """
+    return Memo.stats()
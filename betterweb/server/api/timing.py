@@ -0,0 +1,137 @@
+import typing as t
+import time
+import random
+import logging
+from contextlib import contextmanager, nullcontext
+
+if t.TYPE_CHECKING:
+    from .request import Request
+    from .types import sendType
+
+logger = logging.getLogger("betterweb")
+
+NULL_SPAN = nullcontext()
+"""
+Used as the span of requests that are not timed, so timing them costs nothing.
+"""
+
+
+class Timing:
+    """
+    The phases of one request, timed with `time.perf_counter_ns`.
+    """
+
+    __slots__ = ("start", "spans", "open")
+
+    def __init__(self):
+        self.start = time.perf_counter_ns()
+        self.spans: "dict[str, int]" = {}
+        self.open: "dict[str, int]" = {}
+
+    def begin(self, name: str):
+        self.open[name] = time.perf_counter_ns()
+
+    def end(self, name: str):
+        start = self.open.pop(name, None)
+        if start is not None:
+            self.add(name, time.perf_counter_ns() - start)
+
+    def add(self, name: str, duration: int):
+        """
+        Adds `duration` nanoseconds to the span `name`.
+        """
+        self.spans[name] = self.spans.get(name, 0) + duration
+
+    @contextmanager
+    def span(self, name: str):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def durations(self) -> "dict[str, int]":
+        """
+        The nanoseconds of every span, counting spans still open up to now, and the `total`.
+        """
+        now = time.perf_counter_ns()
+        durations = dict(self.spans)
+        for name, start in self.open.items():
+            durations[name] = durations.get(name, 0) + now - start
+        durations["total"] = now - self.start
+        return durations
+
+    def header(self) -> bytes:
+        return ", ".join(
+            f"{name};dur={duration / 1e6:.3f}" for name, duration in self.durations().items()
+        ).encode("latin-1")
+
+
+class ServerTiming:
+    """
+    Times the phases of API requests: reading the body, decoding it, the handler and encoding the response.
+    Handlers can add their own spans with `request.span(name)`.
+
+    - `header`: Send the phases in a `Server-Timing` header, shown by browser devtools.
+    - `sample_rate`: The fraction of requests to send the header for.
+    - `trusted`: Only send the header to requests this returns True for, e.g. from an internal network. Optional: defaults to every request.
+    - `slow`: Log the phases of requests taking at least this many seconds to the `betterweb` logger. Optional: defaults to no log.
+    """
+
+    def __init__(
+        self,
+        header: bool = True,
+        sample_rate: float = 1.0,
+        trusted: "t.Optional[t.Callable[[Request], bool]]" = None,
+        slow: t.Optional[float] = None,
+    ):
+        self.header = header
+        self.sample_rate = sample_rate
+        self.trusted = trusted
+        self.slow = None if slow is None else int(slow * 1e9)
+
+    def exposed(self, request: "Request") -> bool:
+        if not self.header:
+            return False
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        return self.trusted is None or self.trusted(request)
+
+    def wrap(self, request: "Request", send: "sendType") -> "sendType":
+        """
+        Starts timing `request` and returns a `send` that adds the header and logs it if slow.
+        Requests that get neither are not timed.
+        """
+        exposed = self.exposed(request)
+        if not exposed and self.slow is None:
+            return send
+
+        timing = request.timing = Timing()
+
+        async def _send(message):
+            if message["type"] == "http.response.start" and exposed:
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", timing.header()),
+                    ],
+                }
+            await send(message)
+
+            if (
+                self.slow is not None
+                and message["type"] == "http.response.body"
+                and not message.get("more_body", False)
+            ):
+                durations = timing.durations()
+                if durations["total"] >= self.slow:
+                    logger.warning(
+                        "Slow request %s %s took %.1fms (%s)",
+                        request.method,
+                        request.path,
+                        durations.pop("total") / 1e6,
+                        ", ".join(f"{k}={v / 1e6:.1f}ms" for k, v in durations.items()),
+                    )
+
+        return _send  # type: ignore[return-value]
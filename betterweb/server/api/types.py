@@ -18,7 +18,8 @@ from uvicorn._types import (
 )
 import typing as t
 from .request import Request
-from .response.utils import Headers, Cookie, URL
+from .response.utils import Headers
+from .response.encoder import JSONEncoder
 
 class OPTIONS(t.TypedDict):
     status: int
@@ -27,10 +28,11 @@ class OPTIONS(t.TypedDict):
 
 
 class ConstructorOptions(t.TypedDict):
-    url: URL
+    request: Request
     redirect: bool
     type: str
-    cookies: list[Cookie]
+    etag: t.NotRequired[t.Optional[t.Literal["weak", "strong"]]]
+    encoder: t.NotRequired[t.Optional[JSONEncoder]]
 
 
 sendType = t.Callable[
@@ -1,17 +1,23 @@
-import uvicorn
-from uvicorn._types import Scope, ASGIReceiveCallable, ASGISendCallable
 import typing as t
-from .api import APIRoute, WSRoute, Route, StaticRoute, Request
+from .api import APIRoute, WSRoute, Websocket, Route, StaticRoute, Request, RouteError, Compression, JSONEncoder, ServerTiming, Headers
 from .predefined.ws import WebsocketHandler
 from .router import Router
+from .middleware import ASGIApp, Middleware, compile_middleware
+from .metrics import Metrics
+from .tracing import Tracer
 
-def read(path: str):
-    with open(path, "rb") as f:
-        return f.read()
+if t.TYPE_CHECKING:
+    from uvicorn._types import Scope, ASGIReceiveCallable, ASGISendCallable
+    from .api import ResponseConstructor
+    from .profiling import Profiler
+    from .warmup import Warmup, Hook
+    from .drain import Drain
 
 
 class App:
-    DEFAULT_PAGE = read("betterweb\\server\\default.html")
+    DEFAULT_PAGE = StaticRoute.from_resource("betterweb.server", "default.html", "text/html; charset=utf-8")
+    # The websocket pages keep their session on
+    SESSION_PATH = "/__bw/ws"
 
     def __init__(
         self,
@@ -22,8 +28,19 @@ class App:
         errors: "t.Optional[dict[int, Route]]" = None,
         loading: "t.Optional[Route]" = None,
 
-        on_startup: t.Callable[[], None] | None = None,
-        on_shutdown: t.Callable[[], None] | None = None,
+        on_startup: "Hook | None" = None,
+        on_shutdown: "Hook | None" = None,
+        warmup: "t.Optional[Warmup]" = None,
+        drain: "t.Optional[Drain]" = None,
+
+        max_body_size: t.Optional[int] = None,
+        spool_size: int = Request.SPOOL_SIZE,
+        compression: t.Optional[Compression] = None,
+        json_encoder: t.Optional[JSONEncoder] = None,
+        middleware: "t.Optional[list[Middleware]]" = None,
+        metrics: bool = False,
+        server_timing: t.Optional[ServerTiming] = None,
+        profiler: "t.Optional[Profiler]" = None,
     ):
         self.api_routes = api_routes
         self.websockets = websocket_routes
@@ -34,6 +51,28 @@ class App:
 
         self.on_startup = on_startup
         self.on_shutdown = on_shutdown
+        self.warmup = warmup
+        self.drain = drain
+        self.ready = False
+        self.lifespan_started = False
+        self.draining = False
+        self.inflight = 0
+
+        self.max_body_size = max_body_size
+        self.spool_size = spool_size
+        self.compression = compression
+        self.json_encoder = json_encoder
+
+        self.metrics = metrics
+        self.server_timing = server_timing
+        self.profiler = profiler
+
+        self.middleware = middleware or []
+        self.route_middleware: "dict[str, list[Middleware]]" = {}
+        self.http_endpoints: "dict[str, ASGIApp]" = {}
+        self.traced_endpoints: "dict[str, ASGIApp]" = {}
+        self.ws_endpoints: "dict[str, ASGIApp]" = {}
+        self.app: t.Optional[ASGIApp] = None
 
         self.init()
 
@@ -41,14 +80,20 @@ class App:
         WebsocketHandler.app_init(self)
         DEFAULT_ROUTE_PREFIX = "/__bw"
         DEFAULT_STATIC_ROUTES = {
-            "/client.js": StaticRoute.from_file(
-                "C:\\Users\\AJD21\\OneDrive\\Desktop\\Programming\\Python\\BetterWeb\\betterweb\\js\\dist\\conection.js",
-                "application/javascript",
+            "/client.js": StaticRoute.from_resource(
+                "betterweb", "js/dist/conection.js", "application/javascript"
             ),
         }
         DEFAULT_WEBSOCKET_ROUTES = {
-            "/ws": WSRoute(WebsocketHandler.init, close=False)
+            "/ws": WSRoute(WebsocketHandler.session, close=False)
         }
+        DEFAULT_API_ROUTES: "dict[str, APIRoute]" = {
+            "/ready": APIRoute(["GET", "HEAD"], self.readiness),
+        }
+        if self.metrics:
+            DEFAULT_API_ROUTES["/metrics"] = APIRoute(["GET"], Metrics.endpoint)
+        if self.profiler is not None:
+            DEFAULT_API_ROUTES.update(self.profiler.routes())
 
         for path, route in DEFAULT_STATIC_ROUTES.items():
             self.static_routes[f"{DEFAULT_ROUTE_PREFIX}{path}"] = route
@@ -56,7 +101,18 @@ class App:
         for path, route in DEFAULT_WEBSOCKET_ROUTES.items():
             self.websockets[f"{DEFAULT_ROUTE_PREFIX}{path}"] = route
 
+        for path, route in DEFAULT_API_ROUTES.items():
+            self.api_routes[f"{DEFAULT_ROUTE_PREFIX}{path}"] = route
+
+    def add_middleware(self, middleware: "Middleware"):
+        """
+        Adds middleware around every route, inside the middleware already added.
+        """
+        self.middleware.append(middleware)
+        self.app = None
+
     def add_router(self, router: "Router", prefix: str):
+        self.route_middleware.update(router.scoped_middleware(prefix))
         self.api_routes.update(
             {
                 f"{prefix}{path}": route
@@ -78,63 +134,286 @@ class App:
                 for path, route in router.static_routes.items()
             }
         )
+        self.app = None
 
-    async def __call__(
-        self, scope: Scope, receive: ASGIReceiveCallable, send: ASGISendCallable
-    ) -> None:
-        if scope["type"] == "lifespan":
-            while True:
-                message = await receive()
-                if message["type"] == "lifespan.startup":
-                    if self.on_startup:
-                        self.on_startup()
-                    await send({"type": "lifespan.startup.complete"})
-                elif message["type"] == "lifespan.shutdown":
-                    if self.on_shutdown:
-                        self.on_shutdown()
-                    await send({"type": "lifespan.shutdown.complete"})
-                    return
+    def compile(self) -> ASGIApp:
+        """
+        Builds the call chain of every route with its middleware, app middleware outermost then router then route.
+        Routes without middleware are called directly. Runs on startup, or on the first request after a change
+        or to a route added since.
+        """
+        # Sampled requests take a second chain with the tracing middleware, so the rest skip it
+        http: "dict[str, ASGIApp]" = {}
+        traced: "dict[str, ASGIApp]" = {}
+        for path, route in self.static_routes.items():
+            middleware = self.route_middleware.get(path, [])
+            http[path] = compile_middleware(route, [*self.recorder(path), *middleware])  # type: ignore[arg-type]
+            if Tracer.enabled:
+                traced[path] = compile_middleware(
+                    route,  # type: ignore[arg-type]
+                    [*self.recorder(path), Tracer.middleware(path), *middleware],
+                )
+        for path, route in self.api_routes.items():
+            middleware = [*self.route_middleware.get(path, []), *route.middleware]
+            http[path] = compile_middleware(self.api_endpoint(route), [*self.recorder(path), *middleware])
+            if Tracer.enabled:
+                traced[path] = compile_middleware(
+                    self.api_endpoint(route, traced=True),
+                    [*self.recorder(path), Tracer.middleware(path), *middleware],
+                )
 
-        elif scope["type"] == "http":
-            if scope["path"] in self.api_routes:
-                route = self.api_routes[scope["path"]]
-
-                if scope["method"] not in route.methods:
-                    await send(
-                        {
-                            "type": "http.response.start",
-                            "status": 405,
-                            "headers": [(b"allow", ",".join(route.methods).encode())],
-                        }
-                    )
-                request = Request(scope, receive) # type: ignore[arg-type]
-                await self.api_routes[scope["path"]](request, send)
+        ws: "dict[str, ASGIApp]" = {}
+        for path, route in self.websockets.items():
+            ws[path] = compile_middleware(
+                self.ws_endpoint(route),
+                [*self.route_middleware.get(path, []), *route.middleware],
+            )
+
+        self.http_endpoints = http
+        self.traced_endpoints = traced
+        self.ws_endpoints = ws
+        self.app = compile_middleware(
+            self.dispatch,
+            [*([self.compression] if self.compression is not None else []), *self.middleware],
+        )
+        return self.app
+
+    def recorder(self, path: str) -> "list[Middleware]":
+        recorders = []
+        if self.metrics:
+            recorders.append(Metrics.middleware(path))
+        return recorders
+
+    def api_endpoint(self, route: APIRoute, traced: bool = False) -> ASGIApp:
+        allow = ",".join(route.methods).encode()
+
+        async def endpoint(scope, receive, send):
+            if scope["method"] not in route.methods:
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 405,
+                        "headers": [(b"allow", allow)],
+                    }
+                )
+                await send({"type": "http.response.body", "body": b""})
                 return
-            elif scope["path"] in self.static_routes:
-                await self.static_routes[scope["path"]](scope, receive, send)
-            else:
+
+            request = Request(scope, receive, self.max_body_size, self.spool_size)
+            request.traced = traced
+            request.json_encoder = self.json_encoder
+            if self.server_timing is not None:
+                send = self.server_timing.wrap(request, send)
+            started = False
+
+            async def tracked(message):
+                nonlocal started
+                if message["type"] == "http.response.start":
+                    started = True
+                await send(message)
+
+            try:
+                await route(request, tracked)
+            except RouteError as exc:
+                # Too late for an error response, so the server aborts the one under way
+                if started:
+                    raise
                 await send(
                     {
                         "type": "http.response.start",
-                        "status": 200,
-                        "headers": [
-                            (b"content-type", b"text/html; charset=utf-8"),
-                        ],
+                        "status": exc.status,
+                        "headers": exc.headers.raw(),
                     }
                 )
-                await send({"type": "http.response.body", "body": self.DEFAULT_PAGE})
+                await send({"type": "http.response.body", "body": exc.statusText.encode()})
+            finally:
+                request.close()
+
+        return endpoint
+
+    @staticmethod
+    def ws_endpoint(route: WSRoute) -> ASGIApp:
+        async def endpoint(scope, receive, send):
+            await route(send, receive)
+
+        return endpoint
+
+    async def __call__(
+        self, scope: "Scope", receive: "ASGIReceiveCallable", send: "ASGISendCallable"
+    ) -> None:
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+
+        app = self.app
+        if app is None:
+            app = self.compile()
+            if not self.lifespan_started and not self.draining:
+                # Served without lifespan events, so there is no startup to wait for
+                self.ready = True
+        await app(scope, receive, send)
+
+    async def lifespan(self, receive: "ASGIReceiveCallable", send: "ASGISendCallable"):
+        from .warmup import call
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.lifespan_started = True
+                try:
+                    await self.startup()
+                except Exception as exc:
+                    await send({"type": "lifespan.startup.failed", "message": repr(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    await self.shutdown()
+                    if self.on_shutdown:
+                        await call(self.on_shutdown)
+                    await Tracer.close()
+                except Exception as exc:
+                    await send({"type": "lifespan.shutdown.failed", "message": repr(exc)})
+                    return
+                await send({"type": "lifespan.shutdown.complete"})
                 return
 
-        elif scope["path"] in self.websockets and scope["type"] == "websocket":
-            await self.websockets[scope["path"]](send, receive)  # type: ignore[arg-type]
-            return
-        else:
+    async def startup(self):
+        """
+        Builds the route table, runs `on_startup` then the warmup, and only then reports ready.
+        """
+        from .warmup import call
+
+        self.compile()
+        if self.on_startup:
+            await call(self.on_startup)
+        if self.warmup is not None:
+            await self.warmup.run(self)
+        self.ready = True
+
+    async def shutdown(self):
+        """
+        Stops reporting ready and drains open sessions, streams and requests with the `Drain`.
+        Runs once, when the server starts shutting down.
+        """
+        if self.draining:
             return
+        if self.drain is None:
+            from .drain import Drain
+
+            self.drain = Drain()
+        self.draining = True
+        self.ready = False
+        await self.drain.run(self)
+
+    async def readiness(self, request: Request, response: "ResponseConstructor"):
+        """
+        `/__bw/ready`: 200 once startup and warmup have finished, 503 before then and while shutting down.
+        Without lifespan events there is no startup, so it is 200 from the first request.
+        """
+        await response(
+            b"ready" if self.ready else b"not ready",
+            {
+                "status": 200 if self.ready else 503,
+                "statusText": "",
+                "headers": Headers([(b"content-type", b"text/plain"), (b"cache-control", b"no-store")]),
+            },
+        )
+
+    async def dispatch(
+        self, scope: "Scope", receive: "ASGIReceiveCallable", send: "ASGISendCallable"
+    ) -> None:
+        if scope["type"] == "http":
+            endpoint = None
+            if self.traced_endpoints:
+                # Decided here rather than in middleware, so unsampled requests take the untraced chain
+                traceparent = None
+                if Tracer.traceparent:
+                    for key, value in scope["headers"]:
+                        if key == b"traceparent":
+                            traceparent = value
+                            break
+                if traceparent is not None:
+                    sampled = Tracer.sampled(traceparent)
+                else:
+                    # The sampler's skip, inlined as this runs on every request
+                    sampler = Tracer.sampler
+                    if sampler.skip:
+                        sampler.skip -= 1
+                        sampled = False
+                    else:
+                        sampled = sampler()
+                if sampled:
+                    endpoint = self.traced_endpoints.get(scope["path"])
+            if endpoint is None:
+                endpoint = self.http_endpoints.get(scope["path"])
+            if endpoint is None:
+                endpoint = self.added_endpoint(scope["path"]) or self.DEFAULT_PAGE  # type: ignore[assignment]
+            self.inflight += 1
+            try:
+                await endpoint(scope, receive, send)
+            finally:
+                self.inflight -= 1
+
+        elif scope["type"] == "websocket":
+            if self.draining:
+                # A close before the handshake reaches the client as a 403 it will not retry,
+                # so accept, then ask pages to reconnect like the sessions already open.
+                # Other routes have their own protocol, so they only get the restart close code
+                if (await receive())["type"] == "websocket.connect":
+                    websocket = Websocket(send, receive)  # type: ignore[arg-type]
+                    await websocket.accept()
+                    if scope["path"] == self.SESSION_PATH:
+                        await WebsocketHandler.reconnect(websocket, self.drain.delay())  # type: ignore[union-attr]
+                    else:
+                        await websocket.close(1012, "Server restarting")
+                return
+            endpoint = self.ws_endpoints.get(scope["path"])
+            if endpoint is None:
+                endpoint = self.added_endpoint(scope["path"], websocket=True)
+            if endpoint is not None:
+                await endpoint(scope, receive, send)
+
+    def added_endpoint(self, path: str, websocket: bool = False) -> t.Optional[ASGIApp]:
+        """
+        Builds the chains again if a route was added at `path` since they were built, and returns its endpoint.
+        Only runs for paths without an endpoint, so serving pages costs a few more lookups.
+        """
+        if websocket:
+            if path not in self.websockets:
+                return None
+            self.compile()
+            return self.ws_endpoints.get(path)
+        if path not in self.api_routes and path not in self.static_routes:
+            return None
+        self.compile()
+        return self.http_endpoints.get(path)
+
+    def run(
+        self,
+        host="127.0.0.1",
+        port=8000,
+        reload=False,
+        workers: int = 1,
+        reuse_port: bool = False,
+        target: t.Optional[str] = None,
+        **options: t.Any,
+    ):
+        """
+        Serves the app with uvicorn.
+
+        - `workers`: The number of worker processes, each a copy of this app made with `fork`.
+        - `reuse_port`: Give each worker its own socket with `SO_REUSEPORT`, so the kernel spreads connections evenly. Otherwise workers share one socket.
+        - `target`: The app's import string, e.g. `"main:app"`. Needed for `reload`, and for `workers` where `fork` is not available.
+        - `options`: Passed to uvicorn, e.g. `loop="uvloop"`, `http="httptools"`, `backlog`, `limit_concurrency` or `timeout_keep_alive`.
+        """
+        from .serve import serve
 
-    def run(self, host="127.0.0.1", port=8000, reload=False):
-        uvicorn.run(
-            self,
+        serve(
+            target or self,
             host=host,
             port=port,
+            workers=workers,
             reload=reload,
+            reuse_port=reuse_port,
+            **options,
         )
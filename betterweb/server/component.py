@@ -0,0 +1,130 @@
+import typing as t
+import functools
+from .dom import DOMNode
+from .tracing import Tracer
+
+if t.TYPE_CHECKING:
+    from .api.state import State
+
+P = t.ParamSpec("P")
+
+
+class Component:
+    components: "dict[str, Component]" = {}
+    stack: "list[Component]" = []
+
+    def __init__(
+        self,
+        key: str,
+        func: t.Callable[..., t.Awaitable[DOMNode]],
+        parent: "t.Optional[Component]" = None,
+    ):
+        self.key = key
+        self.func = func
+        self.parent = parent
+        self.args: tuple = ()
+        self.kwargs: dict[str, t.Any] = {}
+        self.id: t.Optional[str] = None
+        self.dirty = True
+        self.states: "set[State]" = set()
+        self.children: "set[Component]" = set()
+
+    @classmethod
+    def create(
+        cls,
+        name: str,
+        func: t.Callable[..., t.Awaitable[DOMNode]],
+        args: tuple = (),
+        kwargs: t.Optional[dict[str, t.Any]] = None,
+    ):
+        parent = cls.stack[-1] if cls.stack else None
+        key = name if parent is None else f"{parent.key}/{name}"
+
+        if key in cls.components:
+            component = cls.components[key]
+            component.func = func
+            component.parent = parent
+        else:
+            component = cls(key, func, parent)
+            cls.components[key] = component
+
+        component.args = args
+        component.kwargs = kwargs or {}
+
+        if parent is not None:
+            parent.children.add(component)
+
+        return component
+
+    @property
+    def depth(self) -> int:
+        depth = 0
+        parent = self.parent
+        while parent is not None:
+            depth += 1
+            parent = parent.parent
+        return depth
+
+    @classmethod
+    def track(cls, state: "State"):
+        """
+        Records that the component currently rendering read `state`.
+        Does nothing outside of a render.
+        """
+        if cls.stack:
+            component = cls.stack[-1]
+            component.states.add(state)
+            state.subscribers.add(component)
+
+    def untrack(self):
+        for state in self.states:
+            state.subscribers.discard(self)
+        self.states.clear()
+
+    async def render(self) -> DOMNode:
+        self.untrack()
+        previous = self.children
+        self.children = set()
+
+        self.stack.append(self)
+        try:
+            with Tracer.span("render", component=self.key):
+                node = await self.func(*self.args, **self.kwargs)
+        finally:
+            self.stack.pop()
+
+        for child in previous - self.children:
+            child.unmount()
+
+        self.id = node["properties"].get("id")
+        self.dirty = False
+        return node
+
+    def unmount(self):
+        self.untrack()
+        for child in self.children:
+            child.unmount()
+        self.children.clear()
+        self.dirty = False
+
+        if self.components.get(self.key) is self:
+            del self.components[self.key]
+
+
+def component(
+    func: t.Callable[P, t.Awaitable[DOMNode]],
+) -> t.Callable[P, t.Awaitable[DOMNode]]:
+    """
+    Marks an async function returning a DOM node as a component.
+
+    States read while a component renders are tracked, so dispatching them
+    only rerenders that component instead of the whole page.
+    Pass `key=` when calling the same component more than once under one parent.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args: P.args, key: t.Optional[str] = None, **kwargs: P.kwargs):
+        name = func.__qualname__ if key is None else f"{func.__qualname__}:{key}"
+        return await Component.create(name, func, args, kwargs).render()
+
+    return wrapper  # type: ignore[return-value]
@@ -0,0 +1,97 @@
+import typing as t
+import time
+import random
+import logging
+import functools
+import asyncio as io
+from .warmup import call
+
+if t.TYPE_CHECKING:
+    from .app import App
+    from .api import StreamResponse
+
+logger = logging.getLogger("betterweb")
+
+Flush = t.Callable[["dict[str, t.Any]"], "t.Awaitable[None] | None"]
+
+
+class Drain:
+    """
+    How the app shuts down, so a deploy does not cut off open pages and streams and have every client reconnect at once.
+    New page websockets are told to reconnect and closed, and other new websockets closed, then:
+
+    - Open page sessions are told to reconnect after a random delay within `reconnect`, and closed.
+    - Open Server-Sent Events streams are ended, with the same kind of delay as their `retry`.
+    - Other requests get `timeout` seconds to finish, after which any stream still open is ended.
+    - `flush` is called with the latest value of every `use_state` state, including values dispatched but not yet rendered.
+
+    - `timeout`: Seconds in-flight requests may take to finish.
+    - `reconnect`: The shortest and longest delay in seconds before clients reconnect.
+    - `flush`: A sync or async function called with the states by name, to save them to a store. Optional: defaults to none.
+    """
+
+    # Seconds between checks for in-flight requests
+    POLL = 0.05
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        reconnect: "tuple[float, float]" = (1.0, 10.0),
+        flush: t.Optional[Flush] = None,
+    ):
+        self.timeout = timeout
+        self.reconnect = reconnect
+        self.flush = flush
+
+    def delay(self) -> int:
+        """
+        A random reconnect delay in milliseconds.
+        """
+        return int(random.uniform(*self.reconnect) * 1000)
+
+    async def run(self, app: "App"):
+        from .api import StreamResponse
+        from .api.state import State
+        from .predefined.ws import WebsocketHandler
+
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+
+        sessions = list(WebsocketHandler.sessions)
+        for websocket in sessions:
+            try:
+                await WebsocketHandler.reconnect(websocket, self.delay())
+            except Exception as exc:
+                # The client left in the meantime
+                logger.debug("Could not ask a session to reconnect: %r", exc)
+
+        streams = [stream for stream in StreamResponse.streams if stream.events]
+        for stream in streams:
+            await self.end(stream, self.delay())
+
+        while app.inflight and time.monotonic() < deadline:
+            await io.sleep(self.POLL)
+        unfinished = app.inflight
+
+        for stream in list(StreamResponse.streams):
+            await self.end(stream)
+
+        if self.flush is not None:
+            # `new` is the latest dispatched value, which `data` only catches up with on the next render
+            states = {name: state.new for name, state in State.states.items()}
+            await call(functools.partial(self.flush, states))
+
+        logger.info(
+            "Drained %d sessions and %d event streams in %.1fms, %d requests were still running at the deadline",
+            len(sessions),
+            len(streams),
+            (time.perf_counter() - start) * 1e3,
+            unfinished,
+        )
+
+    @staticmethod
+    async def end(stream: "StreamResponse", retry: t.Optional[int] = None):
+        try:
+            await stream.end(retry)
+        except Exception as exc:
+            logger.debug("Could not end a stream: %r", exc)
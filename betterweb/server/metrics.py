@@ -0,0 +1,232 @@
+import typing as t
+import time
+from bisect import bisect_left
+from .api.response.utils.headers import Headers
+
+if t.TYPE_CHECKING:
+    from .api import Request, ResponseConstructor
+    from .middleware import ASGIApp, Middleware
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: "tuple[str, ...]", values: "tuple[str, ...]", extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    type: t.ClassVar[str]
+
+    def __init__(self, name: str, help: str, labels: t.Iterable[str] = ()):
+        """
+        - `name`: The metric name, e.g. `bw_http_requests_total`.
+        - `help`: A description of the metric.
+        - `labels`: The label names. Values are passed positionally when recording.
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: "dict[tuple[str, ...], t.Any]" = {}
+
+    def clear(self):
+        self.values.clear()
+
+    def lines(self) -> t.Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.labels, labels)} {value}"
+
+
+class Counter(Metric):
+    """
+    A value that only goes up, e.g. the number of requests.
+    """
+
+    type = "counter"
+
+    def inc(self, *labels: str, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down, e.g. the number of open sessions.
+    """
+
+    type = "gauge"
+
+    def inc(self, *labels: str, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def dec(self, *labels: str, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - value
+
+    def set(self, value: float, *labels: str):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Counts observations into fixed buckets, e.g. request durations.
+
+    - `buckets`: The upper bounds of the buckets, ascending. A `+Inf` bucket is added.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: t.Iterable[str] = (),
+        buckets: t.Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str):
+        # One count per bucket, then the +Inf bucket, then the sum
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def lines(self) -> t.Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        for labels, counts in self.values.items():
+            total = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                total += count
+                le = _labels(self.labels, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {total}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {counts[-1]}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {total}"
+
+
+M = t.TypeVar("M", bound=Metric)
+
+
+class Metrics:
+    """
+    The metrics of this worker process.
+
+    Everything runs on the event loop, so recording is a dict update without locks.
+    Each worker keeps its own values, to be summed by the scraper.
+    """
+
+    registry: "dict[str, Metric]" = {}
+    CONTENT_TYPE = b"text/plain; version=0.0.4; charset=utf-8"
+
+    @classmethod
+    def register(cls, metric: M) -> M:
+        cls.registry[metric.name] = metric
+        return metric
+
+    @classmethod
+    def export(cls) -> str:
+        """
+        Every registered metric in the Prometheus text format.
+        """
+        lines: list[str] = []
+        for metric in cls.registry.values():
+            lines.extend(metric.lines())
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    async def endpoint(cls, request: "Request", response: "ResponseConstructor"):
+        await response(
+            cls.export().encode(),
+            {
+                "status": 200,
+                "statusText": "",
+                "headers": Headers([(b"content-type", cls.CONTENT_TYPE)]),
+            },
+        )
+
+    @staticmethod
+    def middleware(route: str) -> "Middleware":
+        """
+        Records the duration, status and bytes sent of each request to `route`.
+        """
+
+        def wrap(app: "ASGIApp") -> "ASGIApp":
+            async def record(scope, receive, send):
+                start = time.perf_counter_ns()
+                status = 500
+                size = 0
+
+                async def _send(message):
+                    nonlocal status, size
+                    if message["type"] == "http.response.start":
+                        status = message["status"]
+                    elif message["type"] == "http.response.body":
+                        size += len(message.get("body", b""))
+                    await send(message)
+
+                try:
+                    await app(scope, receive, _send)
+                finally:
+                    HTTP_DURATION.observe((time.perf_counter_ns() - start) / 1e9, route)
+                    HTTP_REQUESTS.inc(route, scope["method"], str(status))
+                    HTTP_BYTES.inc(route, value=size)
+
+            return record
+
+        return wrap
+
+    @staticmethod
+    def rendered(kind: str, start: int):
+        """
+        Records a render of `kind` that started at `start`, from `time.perf_counter_ns`.
+        """
+        RENDERS.inc(kind)
+        RENDER_DURATION.observe((time.perf_counter_ns() - start) / 1e9, kind)
+
+
+HTTP_REQUESTS = Metrics.register(
+    Counter("bw_http_requests_total", "HTTP requests handled.", ["route", "method", "status"])
+)
+HTTP_DURATION = Metrics.register(
+    Histogram("bw_http_request_duration_seconds", "Time to handle an HTTP request.", ["route"])
+)
+HTTP_BYTES = Metrics.register(
+    Counter("bw_http_response_bytes_total", "Response body bytes sent.", ["route"])
+)
+RENDERS = Metrics.register(
+    Counter("bw_renders_total", "Pages and fragments rendered.", ["kind"])
+)
+RENDER_DURATION = Metrics.register(
+    Histogram("bw_render_duration_seconds", "Time to render a page or fragment to HTML.", ["kind"])
+)
+FRAME_BYTES = Metrics.register(
+    Histogram(
+        "bw_websocket_frame_bytes",
+        "Size of the frames sent to a session.",
+        ["type"],
+        SIZE_BUCKETS,
+    )
+)
+SESSION_HTML_BYTES = Metrics.register(
+    Histogram(
+        "bw_websocket_session_html_bytes",
+        "HTML sent to a session over its lifetime, pages and fragments.",
+        buckets=SIZE_BUCKETS,
+    )
+)
+SESSIONS = Metrics.register(Gauge("bw_websocket_sessions", "Open websocket sessions."))
+EVENTS = Metrics.register(
+    Counter("bw_websocket_events_total", "Client events handled.", ["event"])
+)
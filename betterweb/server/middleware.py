@@ -0,0 +1,43 @@
+import typing as t
+from functools import partial
+
+if t.TYPE_CHECKING:
+    from uvicorn._types import Scope, ASGIReceiveCallable, ASGISendCallable
+
+ASGIApp = t.Callable[["Scope", "ASGIReceiveCallable", "ASGISendCallable"], t.Awaitable[None]]
+Middleware = t.Callable[[ASGIApp], ASGIApp]
+"""
+A middleware takes the ASGI app it wraps and returns a new one, e.g. `lambda app: CORSMiddleware(app)`.
+"""
+
+
+def middleware(
+    func: "t.Callable[[Scope, ASGIReceiveCallable, ASGISendCallable, ASGIApp], t.Awaitable[None]]",
+) -> Middleware:
+    """
+    Makes a middleware from a function that is given the next app to call:
+
+    ```python
+    @middleware
+    async def timing(scope, receive, send, call_next):
+        start = time.perf_counter()
+        await call_next(scope, receive, send)
+        print(scope["path"], time.perf_counter() - start)
+    ```
+    """
+
+    def wrap(app: ASGIApp) -> ASGIApp:
+        return partial(func, call_next=app)  # type: ignore[call-arg]
+
+    wrap.__name__ = getattr(func, "__name__", "middleware")
+    return wrap
+
+
+def compile_middleware(app: ASGIApp, middleware: "t.Sequence[Middleware]") -> ASGIApp:
+    """
+    Wraps `app` in `middleware`, the first one outermost.
+    Without middleware `app` itself is returned, so nothing is added to the call.
+    """
+    for wrap in reversed(middleware):
+        app = wrap(app)
+    return app
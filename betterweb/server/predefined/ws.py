@@ -1,11 +1,15 @@
 import typing as t
 import msgspec as ms
 import asyncio as io
+import time
 from .errors import ErrorHandler
+from ..metrics import Metrics, SESSIONS, EVENTS, FRAME_BYTES, SESSION_HTML_BYTES
+from ..tracing import Tracer
 
 if t.TYPE_CHECKING:
-    from ..api import Websocket
+    from ..api import Websocket, Route
     from ..app import App
+    from ..component import Component
 
 JSONTYPES = t.Union[
     str, int, float, bool, None, dict["JSONTYPES", "JSONTYPES"], list["JSONTYPES"]
@@ -42,6 +46,16 @@ class HTML(t.TypedDict):
     data: str
 
 
+class FragmentBody(t.TypedDict):
+    id: str
+    html: str
+
+
+class Fragment(t.TypedDict):
+    type: t.Literal["fragment"]
+    data: FragmentBody
+
+
 class LocalStorageType(t.TypedDict, t.Generic[T]):
     type: T
 
@@ -82,7 +96,16 @@ class Router(t.TypedDict):
     data: t.Union[PushBody, ReplaceBody, ReloadBody, BackBody, ForwardBody]
 
 
-PROCESSES = t.Union[Console, ConsoleClear, HTML, LocalStorage, Router]
+class ReconnectBody(t.TypedDict):
+    delay: int
+
+
+class Reconnect(t.TypedDict):
+    type: t.Literal["reconnect"]
+    data: ReconnectBody
+
+
+PROCESSES = t.Union[Console, ConsoleClear, HTML, Fragment, LocalStorage, Router, Reconnect]
 
 
 class WebsocketHandler:
@@ -94,11 +117,47 @@ class WebsocketHandler:
 
     app: "App"
     dirty: bool
+    root: "t.Optional[Component]" = None
+    pending: "set[Component]" = set()
+    sessions: "set[Websocket]" = set()
+    # HTML sent to each open session so far, with metrics on
+    html_bytes: "dict[Websocket, int]" = {}
 
     @classmethod
     def app_init(cls, app: "App"):
         cls.app = app
 
+    @classmethod
+    async def session(cls, websocket: "Websocket"):
+        """
+        Runs `init` for a websocket, counting it as an open session until the client disconnects.
+        """
+        from ..api.route import Disconnected
+
+        metrics = cls.app.metrics
+        if metrics:
+            SESSIONS.inc()
+        cls.sessions.add(websocket)
+        try:
+            await cls.init(websocket)
+        except Disconnected:
+            pass
+        finally:
+            cls.sessions.discard(websocket)
+            html = cls.html_bytes.pop(websocket, 0)
+            if metrics:
+                SESSIONS.dec()
+                SESSION_HTML_BYTES.observe(html)
+
+    @staticmethod
+    async def reconnect(websocket: "Websocket", delay: int):
+        """
+        Tells the client to reconnect after `delay` milliseconds, then closes the session as the server is restarting.
+        """
+        frame: Reconnect = {"type": "reconnect", "data": {"delay": delay}}
+        await websocket.sendBytes(ms.json.encode(frame))
+        await websocket.close(1012, "Server restarting")
+
     @classmethod
     async def init(cls, websocket: "Websocket"):
         cls.websocket = websocket
@@ -118,7 +177,6 @@ class WebsocketHandler:
         data = data["data"]
 
         while True:
-            print(data)
             cls.loc = data["url"]
             cls.query = dict(data["query"])
             cls.hash = data["hash"]
@@ -133,49 +191,20 @@ class WebsocketHandler:
                     }
                 )
             from ..dom import DOM
+            from ..component import Component
             try:
-                client = await route.handler()
+                with Tracer.trace("ws.page", "consumer", url=cls.loc):
+                    client = await route.handler()
+                    if cls.root is not None:
+                        cls.root.unmount()
+                    cls.root = Component("__root__", client)
+                    cls.pending = set()
+                    try:
+                        await cls.render()
+                    except Exception as exc:
+                        await cls.render_error(route, exc)
 
                 while True:
-                    if cls.dirty:
-                        try:
-                            # Import DOM here to avoid circular import
-                                html = DOM.to_html(await client())
-                                await cls.send(
-                                    {
-                                        "type": "html",
-                                        "data": html,
-                                    }
-                                )
-                                cls.dirty = False
-
-                        except Exception as exc:
-                            # Import RouteError here to avoid circular import
-                            from ..api.response.error import RouteError
-
-                            if isinstance(exc, RouteError):
-                                err = await route.error(exc.status)
-                                if err is not None:
-
-                                    await cls.send({
-                                        "type": "html",
-                                        "data": err,
-                                    })
-                                else:
-                                    await cls.send(
-                                    {
-                                        "type": "html",
-                                        "data": DOM.to_html(ErrorHandler(exc.status).h())
-                                    }
-                                )
-                            else:
-                                await cls.send(
-                                {
-                                    "type": "html",
-                                    "data": DOM.to_html(ErrorHandler(500).h())
-                                }
-                                )
-
                     msg = await cls.websocket.receive()
                     data = ms.json.decode(msg["text"])  # type: ignore[assignment]
     
@@ -183,15 +212,24 @@ class WebsocketHandler:
                         break
 
                     elif data["type"] == "event":
-                        # Import DOM here to avoid circular import
-
-                        print(DOM.events)
-
-                        handler = DOM.events[data["data"]["id"]][data["data"]["event"]]
-                        if io.iscoroutinefunction(handler):
-                            await handler()
-                        else:
-                            handler()
+                        with Tracer.trace(
+                            "ws.event",
+                            "consumer",
+                            id=data["data"]["id"],
+                            event=data["data"]["event"],
+                        ):
+                            handler = DOM.events[data["data"]["id"]][data["data"]["event"]]
+                            if cls.app.metrics:
+                                EVENTS.inc(data["data"]["event"])
+                            with Tracer.span("event.handler"):
+                                if io.iscoroutinefunction(handler):
+                                    await handler()
+                                else:
+                                    handler()
+                            try:
+                                await cls.render()
+                            except Exception as exc:
+                                await cls.render_error(route, exc)
 
                     else:
                         raise RuntimeError("Invalid request")
@@ -199,6 +237,10 @@ class WebsocketHandler:
             except Exception as exc:
                 # Import RouteError here to avoid circular import
                 from ..api.response.error import RouteError
+                from ..api.route import Disconnected
+
+                if isinstance(exc, Disconnected):
+                    raise
                 print("Error", exc)
                 if isinstance(exc, RouteError):
                     err = await route.error(exc.status)
@@ -228,12 +270,82 @@ class WebsocketHandler:
                 break
 
     @classmethod
-    def schedule_render(cls):
-        cls.dirty = True
+    async def render_error(cls, route: "Route", exc: Exception):
+        """
+        Sends the route's error page for an exception raised while rendering.
+        """
+        from ..dom import DOM
+        # Import RouteError here to avoid circular import
+        from ..api.response.error import RouteError
+
+        if isinstance(exc, RouteError):
+            err = await route.error(exc.status)
+            if err is not None:
+                await cls.send({"type": "html", "data": err})
+            else:
+                await cls.send(
+                    {
+                        "type": "html",
+                        "data": DOM.to_html(ErrorHandler(exc.status).h()),
+                    }
+                )
+        else:
+            await cls.send(
+                {"type": "html", "data": DOM.to_html(ErrorHandler(500).h())}
+            )
+
+    @classmethod
+    def schedule_render(cls, component: "t.Optional[Component]" = None):
+        if component is None or component is cls.root:
+            cls.dirty = True
+        else:
+            cls.pending.add(component)
+
+    @classmethod
+    async def render(cls):
+        """
+        Sends the whole page if the root is dirty,
+        otherwise sends a fragment for each dirty component.
+        """
+        from ..dom import DOM
+
+        if cls.dirty:
+            cls.pending.clear()
+            start = time.perf_counter_ns()
+            node = await cls.root.render()
+            with Tracer.span("dom.to_html"):
+                html = DOM.to_html(node)
+            if cls.app.metrics:
+                Metrics.rendered("page", start)
+            await cls.send({"type": "html", "data": html})
+            cls.dirty = False
+            return
+
+        # Shallowest first: rerendering a parent also rerenders its children
+        pending = sorted(cls.pending, key=lambda component: component.depth)
+        cls.pending.clear()
+        for component in pending:
+            if not component.dirty:
+                continue
+
+            id = component.id
+            start = time.perf_counter_ns()
+            node = await component.render()
+            with Tracer.span("dom.to_html"):
+                html = DOM.to_html(node)
+            if cls.app.metrics:
+                Metrics.rendered("fragment", start)
+            await cls.send({"type": "fragment", "data": {"id": id, "html": html}})
 
     @classmethod
     async def send(cls, data: PROCESSES):
-        await cls.websocket.sendBytes(ms.json.encode(data))
+        frame = ms.json.encode(data)
+        if cls.app.metrics:
+            FRAME_BYTES.observe(len(frame), data["type"])
+            if data["type"] == "html" or data["type"] == "fragment":
+                cls.html_bytes[cls.websocket] = cls.html_bytes.get(cls.websocket, 0) + len(frame)
+        with Tracer.span("ws.send", type=data["type"], bytes=len(frame)):
+            await cls.websocket.sendBytes(frame)
 
     @classmethod
     async def receive(cls):
@@ -0,0 +1,236 @@
+import typing as t
+import sys
+import time
+import signal
+import hmac
+import threading
+import tracemalloc
+import asyncio as io
+from collections import Counter
+from .api import APIRoute, RouteError, Headers
+
+if t.TYPE_CHECKING:
+    from types import FrameType
+    from .api import Request, ResponseConstructor
+
+# Where the event loop waits for I/O (the selector, or the runner under uvloop), so samples ending here are idle
+IDLE = {("selectors", "select"), ("asyncio.runners", "run")}
+
+
+class Profiler:
+    """
+    Profiles the running worker on demand, through endpoints under `/__bw/profile`.
+
+    Only requests that pass `allow` or send `Authorization: Bearer <token>` can use them, so one of the two is required.
+
+    - `token`: A secret that gives access.
+    - `allow`: Called with the `Request`, gives access if it returns True. `Profiler.local` allows requests from
+      the same machine, which behind a reverse proxy on that machine is every request.
+    - `max_seconds`: The longest CPU profile that can be asked for.
+    - `frames`: The number of frames `tracemalloc` keeps per allocation.
+    """
+
+    LOCAL = {"127.0.0.1", "::1", "localhost"}
+
+    def __init__(
+        self,
+        token: t.Optional[str] = None,
+        allow: "t.Optional[t.Callable[[Request], bool]]" = None,
+        max_seconds: float = 30.0,
+        frames: int = 1,
+    ):
+        if token is None and allow is None:
+            raise ValueError("Profiler needs a token or an allow function")
+        self.token = token
+        self.allow = allow
+        self.max_seconds = max_seconds
+        self.frames = frames
+        self.running = False
+        self.snapshot: t.Optional[tracemalloc.Snapshot] = None
+
+    def routes(self) -> "dict[str, APIRoute]":
+        return {
+            "/profile/cpu": APIRoute(["GET"], self.cpu),
+            "/profile/memory": APIRoute(["GET"], self.memory),
+            "/profile/memory/start": APIRoute(["POST"], self.start_memory),
+            "/profile/memory/stop": APIRoute(["POST"], self.stop_memory),
+        }
+
+    @classmethod
+    def local(cls, request: "Request") -> bool:
+        """
+        An `allow` for requests from the same machine.
+        """
+        client = request.client
+        return client is not None and client[0] in cls.LOCAL
+
+    def check(self, request: "Request"):
+        if self.allow is not None and self.allow(request):
+            return
+        if self.token is not None:
+            for value in request.headers.get(b"authorization"):
+                if hmac.compare_digest(value.encode(), f"Bearer {self.token}".encode()):
+                    return
+        raise RouteError(403, "Forbidden", Headers())
+
+    @staticmethod
+    def number(request: "Request", name: str, default: float) -> float:
+        try:
+            return float(request.query.get(name, [default])[0])
+        except ValueError:
+            raise RouteError(400, f"Invalid {name}", Headers()) from None
+
+    async def cpu(self, request: "Request", response: "ResponseConstructor"):
+        """
+        Samples the event loop's stack for `?seconds=` every `?interval=` seconds while it keeps serving,
+        and returns the samples as collapsed stacks, one `frame;frame;frame count` per line, for flamegraph tools.
+        Samples waiting for I/O are left out unless `?idle=1`.
+        """
+        self.check(request)
+        seconds = min(self.number(request, "seconds", 5.0), self.max_seconds)
+        interval = max(self.number(request, "interval", 0.005), 0.001)
+        idle = request.query.get("idle", ["0"])[0] == "1"
+
+        if self.running:
+            raise RouteError(409, "A CPU profile is already running", Headers())
+        self.running = True
+        try:
+            if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+                stacks = await self.interrupt(seconds, interval, idle)
+            else:
+                stacks = await io.to_thread(
+                    self.sample, threading.get_ident(), seconds, interval, idle
+                )
+        finally:
+            self.running = False
+
+        body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        await response(
+            body.encode(),
+            {
+                "status": 200,
+                "statusText": "",
+                "headers": Headers([(b"content-type", b"text/plain; charset=utf-8")]),
+            },
+        )
+
+    @classmethod
+    async def interrupt(cls, seconds: float, interval: float, idle: bool) -> "Counter[str]":
+        """
+        Records the stack every `interval` seconds of CPU time with `SIGPROF`.
+        The signal is handled on the event loop's thread while it runs, so every sample lands in the code that is running.
+        """
+        stacks: "Counter[str]" = Counter()
+
+        def record(signum, frame):
+            names = cls.stack(frame)
+            if names and (idle or names[-1] not in IDLE):
+                stacks[";".join(f"{module}:{func}" for module, func in names)] += 1
+
+        previous = signal.signal(signal.SIGPROF, record)
+        signal.setitimer(signal.ITIMER_PROF, interval, interval)
+        try:
+            await io.sleep(seconds)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous)
+        return stacks
+
+    @classmethod
+    def sample(
+        cls, thread: int, seconds: float, interval: float, idle: bool
+    ) -> "Counter[str]":
+        """
+        Runs in another thread, reading the stack of `thread` until `seconds` have passed.
+        Used where `SIGPROF` is not available. It can only read the stack when the loop releases the GIL,
+        so it over-counts I/O and C calls.
+        """
+        stacks: "Counter[str]" = Counter()
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            frame = sys._current_frames().get(thread)
+            if frame is not None:
+                names = cls.stack(frame)
+                if names and (idle or names[-1] not in IDLE):
+                    stacks[";".join(f"{module}:{func}" for module, func in names)] += 1
+            time.sleep(interval)
+        return stacks
+
+    @staticmethod
+    def stack(frame: "t.Optional[FrameType]") -> "list[tuple[str, str]]":
+        """
+        The module and function of each frame, outermost first.
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append((frame.f_globals.get("__name__", code.co_filename), code.co_name))
+            frame = frame.f_back
+        names.reverse()
+        return names
+
+    async def memory(self, request: "Request", response: "ResponseConstructor"):
+        """
+        Returns the memory allocated since `start_memory` by module, largest first, with the change since the previous call.
+        `?limit=` caps the number of modules returned.
+        """
+        self.check(request)
+        limit = int(self.number(request, "limit", 50))
+
+        if not tracemalloc.is_tracing():
+            raise RouteError(409, "tracemalloc is not running, POST /profile/memory/start first", Headers())
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        current = self.by_module(snapshot)
+        previous = self.by_module(self.snapshot) if self.snapshot is not None else {}
+        self.snapshot = snapshot
+
+        modules = sorted(current.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        await response.json(
+            {
+                "tracing": True,
+                "modules": [
+                    {
+                        "module": module,
+                        "size": size,
+                        "count": count,
+                        "size_diff": size - previous.get(module, (0, 0))[0],
+                        "count_diff": count - previous.get(module, (0, 0))[1],
+                    }
+                    for module, (size, count) in modules
+                ],
+            }
+        )
+
+    async def start_memory(self, request: "Request", response: "ResponseConstructor"):
+        self.check(request)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.snapshot = None
+        await response.json({"tracing": True})
+
+    async def stop_memory(self, request: "Request", response: "ResponseConstructor"):
+        self.check(request)
+        tracemalloc.stop()
+        self.snapshot = None
+        await response.json({"tracing": False})
+
+    @staticmethod
+    def by_module(snapshot: tracemalloc.Snapshot) -> "dict[str, tuple[int, int]]":
+        """
+        The size and count of the allocations of `snapshot`, grouped by the module that made them.
+        """
+        files: "dict[str, str]" = {}
+        for name, module in list(sys.modules.items()):
+            file = getattr(module, "__file__", None)
+            if file is not None:
+                files.setdefault(file, name)
+        modules: "dict[str, tuple[int, int]]" = {}
+        for stat in snapshot.statistics("filename"):
+            filename = stat.traceback[0].filename
+            module = files.get(filename, filename)
+            size, count = modules.get(module, (0, 0))
+            modules[module] = (size + stat.size, count + stat.count)
+        return modules
@@ -2,6 +2,9 @@ from .api import APIRoute, WSRoute, Route, StaticRoute
 import typing as t
 from .dom import DOMNode
 
+if t.TYPE_CHECKING:
+    from .middleware import Middleware
+
 class Router:
     def __init__(
         self,
@@ -9,13 +12,34 @@ class Router:
         websocket_routes: "t.Optional[dict[str, WSRoute]]" = None,
         routes: "t.Optional[dict[str, Route]]" = None,
         static_routes: "t.Optional[dict[str, StaticRoute]]" = None,
+        middleware: "t.Optional[list[Middleware]]" = None,
     ):
+        """
+        - `middleware`: Middleware run for every API, websocket and static route of this router, inside the app's.
+          Pages are rendered over the app's shared websocket rather than requested one by one, so it does not run for them.
+          Optional: defaults to none.
+        """
         self.api_routes = api_routes or {}
         self.websockets = websocket_routes or {}
         self.routes = routes or {}
         self.static_routes = static_routes or {}
+        self.middleware = middleware or []
+        self.route_middleware: "dict[str, list[Middleware]]" = {}
+
+    def scoped_middleware(self, prefix: str = "") -> "dict[str, list[Middleware]]":
+        """
+        The middleware of this router and the routers added to it, by prefixed path. Pages have none.
+        """
+        paths = [*self.api_routes, *self.websockets, *self.static_routes]
+        return {
+            f"{prefix}{path}": [*self.middleware, *self.route_middleware.get(path, [])]
+            for path in paths
+            if self.middleware or path in self.route_middleware
+        }
 
     def add_router(self, router: "Router", prefix: t.Optional[str] = None):
+        prefix = prefix or ""
+        self.route_middleware.update(router.scoped_middleware(prefix))
         self.api_routes.update(
             {f"{prefix}{path}": route for path, route in router.api_routes.items()}
         )
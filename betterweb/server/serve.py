@@ -0,0 +1,240 @@
+import typing as t
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import importlib
+import traceback
+import uvicorn
+from uvicorn.main import STARTUP_FAILURE
+
+if t.TYPE_CHECKING:
+    from .app import App
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def load(target: str, factory: bool = False) -> "App":
+    """
+    Imports the app from `target`, a `module:attribute` string.
+
+    - `factory`: `attribute` is a function returning the app, called once per worker.
+    """
+    module, _, attribute = target.partition(":")
+    if not module or not attribute:
+        raise ValueError(f"Expected the app as 'module:attribute', got {target!r}")
+
+    app: t.Any = importlib.import_module(module)
+    for name in attribute.split("."):
+        app = getattr(app, name)
+    return app() if factory else app
+
+
+def bind(host: str, port: int, reuse_port: bool, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def serve(
+    app: "App | str",
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    workers: int = 1,
+    reload: bool = False,
+    reuse_port: bool = False,
+    factory: bool = False,
+    **options: t.Any,
+):
+    """
+    Serves `app` with uvicorn, in `workers` processes.
+
+    - `app`: The app, or its import string. An import string is needed for `reload`, and for workers where `fork` is not available.
+    - `reuse_port`: Give each worker its own socket with `SO_REUSEPORT`, so the kernel spreads connections evenly. Otherwise workers share one socket.
+    - `factory`: The import string names a function that builds the app.
+    - `options`: Passed to `uvicorn.Config`, e.g. `loop="uvloop"`, `http="httptools"`, `backlog`, `limit_concurrency` or `timeout_keep_alive`.
+    """
+    if reload:
+        if not isinstance(app, str):
+            raise ValueError("reload needs the app as an import string, e.g. 'main:app'")
+        return uvicorn.run(app, host=host, port=port, reload=True, factory=factory, **options)
+
+    if workers <= 1:
+        if isinstance(app, str):
+            app = load(app, factory)
+        server = Server.of(app, uvicorn.Config(app, host=host, port=port, **options))
+        try:
+            server.run()
+        except KeyboardInterrupt:
+            pass
+        if not server.started:
+            sys.exit(STARTUP_FAILURE)
+        return
+
+    if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+        raise ValueError("SO_REUSEPORT is not available on this platform")
+
+    if not hasattr(os, "fork"):
+        # uvicorn's supervisor spawns fresh interpreters, which import the app themselves
+        if not isinstance(app, str):
+            raise ValueError("workers need the app as an import string on this platform, e.g. 'main:app'")
+        return uvicorn.run(app, host=host, port=port, workers=workers, factory=factory, **options)
+
+    Prefork(app, host, port, workers, reuse_port, factory, options).run()
+
+
+class Server(uvicorn.Server):
+    """
+    A uvicorn server that drains its `App` before closing connections.
+
+    uvicorn closes websockets as soon as it shuts down and only sends `lifespan.shutdown` once every connection is gone,
+    so the app would otherwise have no chance to tell its page sessions when to come back.
+    """
+
+    def __init__(self, config: uvicorn.Config, app: "App"):
+        super().__init__(config)
+        self.app = app
+
+    @classmethod
+    def of(cls, app: t.Any, config: uvicorn.Config) -> uvicorn.Server:
+        """
+        A server for `app`, draining it on shutdown if it is an `App`.
+        """
+        from .app import App
+
+        return cls(config, app) if isinstance(app, App) else uvicorn.Server(config)
+
+    async def shutdown(self, sockets: t.Optional[list[socket.socket]] = None):
+        # Stop accepting connections while draining, as uvicorn would
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+
+        await self.app.shutdown()
+        await super().shutdown(sockets)
+
+
+class Prefork:
+    """
+    Forks `workers` uvicorn servers and restarts any that crash, until stopped with SIGINT or SIGTERM.
+
+    An `App` is built once and copied into each worker by `fork`. An import string is imported in each worker instead,
+    so with `factory` every worker builds its own app, e.g. with its own connection pools.
+    """
+
+    # Workers that die sooner than this after starting are not restarted, as they would keep failing
+    MIN_UPTIME = 1.0
+
+    def __init__(
+        self,
+        app: "App | str",
+        host: str,
+        port: int,
+        workers: int,
+        reuse_port: bool,
+        factory: bool,
+        options: "dict[str, t.Any]",
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.reuse_port = reuse_port
+        self.factory = factory
+        self.options = options
+        self.backlog: int = options.get("backlog", 2048)
+        self.socket: t.Optional[socket.socket] = None
+        self.children: "dict[int, float]" = {}
+        self.stopping = False
+        self.failed = False
+
+    def run(self):
+        # Configures uvicorn's logging in the parent too
+        uvicorn.Config(self.app, host=self.host, port=self.port, **self.options)
+
+        if not self.reuse_port:
+            self.socket = bind(self.host, self.port, False, self.backlog)
+
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        logger.info(
+            "Started parent process [%d] with %d workers on %s:%d%s",
+            os.getpid(),
+            self.workers,
+            self.host,
+            self.port,
+            " (SO_REUSEPORT)" if self.reuse_port else "",
+        )
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - started < self.MIN_UPTIME:
+                logger.error("Worker [%d] exited with %d on startup, stopping", pid, code)
+                self.failed = True
+                self.stop(signal.SIGTERM, None)
+            else:
+                logger.warning("Worker [%d] exited with %d, restarting", pid, code)
+                self.spawn()
+
+        if self.socket is not None:
+            self.socket.close()
+        logger.info("Stopped parent process [%d]", os.getpid())
+        if self.failed:
+            sys.exit(1)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self.worker()
+        except SystemExit as exc:
+            code = exc.code if isinstance(exc.code, int) else 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def worker(self):
+        app = load(self.app, self.factory) if isinstance(self.app, str) else self.app
+        sock = self.socket or bind(self.host, self.port, True, self.backlog)
+        config = uvicorn.Config(app, host=self.host, port=self.port, **self.options)
+        Server.of(app, config).run(sockets=[sock])
+
+    def stop(self, signum: int, frame: t.Any):
+        """
+        Asks every worker to shut down gracefully.
+        """
+        self.stopping = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,455 @@
+import typing as t
+import sys
+import math
+import time
+import random
+import asyncio as io
+from collections import deque
+from contextvars import ContextVar
+from contextlib import nullcontext
+import msgspec as ms
+
+if t.TYPE_CHECKING:
+    from .middleware import ASGIApp, Middleware
+
+current: "ContextVar[t.Optional[Span]]" = ContextVar("betterweb_span", default=None)
+
+NULL_SPAN = nullcontext()
+
+
+class Span:
+    """
+    One timed stage of handling a request or event. Use it as a context manager,
+    stages started inside it become its children.
+    """
+
+    __slots__ = (
+        "name",
+        "trace",
+        "id",
+        "parent",
+        "kind",
+        "start",
+        "end",
+        "attributes",
+        "error",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace: int,
+        parent: t.Optional[int] = None,
+        kind: str = "internal",
+        attributes: "t.Optional[dict[str, t.Any]]" = None,
+    ):
+        # Ids are kept as integers and only formatted when exported, as formatting costs more than the span
+        self.name = name
+        self.trace = trace
+        self.id = random.getrandbits(64) or 1
+        self.parent = parent
+        self.kind = kind
+        self.start = 0
+        self.end = 0
+        self.attributes = attributes or {}
+        self.error: t.Optional[str] = None
+
+    @property
+    def trace_id(self) -> str:
+        return f"{self.trace:032x}"
+
+    @property
+    def span_id(self) -> str:
+        return f"{self.id:016x}"
+
+    @property
+    def parent_id(self) -> t.Optional[str]:
+        return f"{self.parent:016x}" if self.parent is not None else None
+
+    def set(self, key: str, value: t.Any):
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self._token = current.set(self)
+        self.start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.time_ns()
+        if exc is not None and not isinstance(exc, io.CancelledError):
+            self.error = repr(exc)
+        current.reset(self._token)
+        for exporter in Tracer.exporters:
+            exporter.export(self)
+
+    def to_dict(self) -> "dict[str, t.Any]":
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.end - self.start,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Exporter(t.Protocol):
+    def export(self, span: Span) -> None: ...
+
+    def close(self) -> "t.Optional[t.Awaitable[None]]": ...
+
+
+class Sampler:
+    """
+    Picks which traces are recorded, each with a chance of `rate`.
+
+    Draws the number of traces to skip before the next sampled one from the geometric distribution,
+    so only sampled traces need a random number. It is an instance rather than state on `Tracer`,
+    as writing a class attribute on every request would invalidate the attribute caches of the class.
+    """
+
+    __slots__ = ("rate", "skip")
+
+    def __init__(self, rate: float = 1.0):
+        self.rate = rate
+        self.skip = self.gap()
+
+    def gap(self) -> int:
+        if self.rate >= 1.0:
+            return 0
+        if self.rate <= 0.0:
+            return sys.maxsize
+        return int(math.log(1.0 - random.random()) / math.log(1.0 - self.rate))
+
+    def __call__(self) -> bool:
+        if self.skip:
+            self.skip -= 1
+            return False
+        self.skip = self.gap()
+        return True
+
+
+class Tracer:
+    """
+    Traces requests and websocket events across their stages.
+
+    A trace is sampled when it starts, and the stages inside it only record spans if it was,
+    so traces are complete and unsampled ones cost one context variable lookup per stage.
+    Unsampled HTTP requests skip the tracing middleware entirely.
+    """
+
+    enabled = False
+    sample_rate = 1.0
+    traceparent = True
+    exporters: "list[Exporter]" = []
+    sampler = Sampler()
+
+    @classmethod
+    def configure(cls, *exporters: Exporter, sample_rate: float = 1.0, traceparent: bool = True):
+        """
+        Starts tracing to `exporters`.
+
+        - `sample_rate`: The fraction of traces recorded.
+        - `traceparent`: Follow the sampling of callers that send a `traceparent` header. Looking for it scans
+          the headers of every request, so turn it off when no caller sends one. Sampled requests still continue
+          the caller's trace.
+        """
+        cls.exporters = list(exporters)
+        cls.sample_rate = sample_rate
+        cls.traceparent = traceparent
+        cls.enabled = bool(exporters)
+        cls.sampler = Sampler(sample_rate)
+
+    @classmethod
+    async def close(cls):
+        """
+        Sends what the exporters still hold, waiting for sends already under way.
+        """
+        for exporter in cls.exporters:
+            result = exporter.close()
+            if result is not None:
+                await result
+
+    @staticmethod
+    def parse(traceparent: str) -> "t.Optional[tuple[int, int, bool]]":
+        """
+        The trace id, parent span id and sampled flag of a W3C `traceparent` header, or None if it is malformed.
+        """
+        parts = traceparent.strip().split("-")
+        if len(parts) < 4:
+            return None
+        version, trace, parent, flags = parts[:4]
+        # Later versions may add fields, but must keep these four
+        if len(version) != 2 or version == "ff" or (version == "00" and len(parts) != 4):
+            return None
+        if len(trace) != 32 or len(parent) != 16 or len(flags) != 2:
+            return None
+        try:
+            int(version, 16)
+            trace_id, parent_id, sampled = int(trace, 16), int(parent, 16), int(flags, 16) & 1
+        except ValueError:
+            return None
+        if not trace_id or not parent_id or trace != trace.lower() or parent != parent.lower():
+            return None
+        return trace_id, parent_id, bool(sampled)
+
+    @classmethod
+    def sampled(cls, traceparent: bytes) -> bool:
+        """
+        Whether to trace a request with this `traceparent` header: as it says, or at `sample_rate` if it is malformed.
+        """
+        parent = cls.parse(traceparent.decode("latin-1"))
+        if parent is not None:
+            return parent[2]
+        return cls.sampler()
+
+    @classmethod
+    def trace(
+        cls,
+        name: str,
+        kind: str = "internal",
+        traceparent: t.Optional[str] = None,
+        *,
+        sampled: t.Optional[bool] = None,
+        **attributes: t.Any,
+    ) -> "t.ContextManager[t.Optional[Span]]":
+        """
+        Starts a trace for a request or event, if it is sampled. Inside another trace, starts a span of it instead.
+
+        - `kind`: `"server"` for requests or `"consumer"` for websocket messages.
+        - `traceparent`: A W3C `traceparent` header to continue the trace of the caller and follow its sampling.
+        - `sampled`: Whether to record the trace, if the caller already decided. Optional: defaults to sampling at `sample_rate`.
+        """
+        if not cls.enabled:
+            return NULL_SPAN
+
+        parent = current.get()
+        if parent is not None:
+            return Span(name, parent.trace, parent.id, kind, attributes)
+
+        if traceparent is not None:
+            caller = cls.parse(traceparent)
+            if caller is not None:
+                trace_id, parent_id, caller_sampled = caller
+                if not (caller_sampled if sampled is None else sampled):
+                    return NULL_SPAN
+                return Span(name, trace_id, parent_id, kind, attributes)
+
+        if sampled is None:
+            sampled = cls.sampler()
+        if not sampled:
+            return NULL_SPAN
+        return Span(name, random.getrandbits(128) or 1, None, kind, attributes)
+
+    @classmethod
+    def span(cls, name: str, **attributes: t.Any) -> "t.ContextManager[t.Optional[Span]]":
+        """
+        Starts a span for a stage of the current trace. Outside a sampled trace, does nothing.
+        """
+        if not cls.enabled:
+            return NULL_SPAN
+
+        parent = current.get()
+        if parent is None:
+            return NULL_SPAN
+        return Span(name, parent.trace, parent.id, "internal", attributes)
+
+    @classmethod
+    def middleware(cls, route: str) -> "Middleware":
+        """
+        Traces every HTTP request to `route`, continuing the caller's trace from its `traceparent` header.
+        The app only sends the requests `sampled` picks through it, so unsampled ones cost nothing more.
+        """
+
+        def wrap(app: "ASGIApp") -> "ASGIApp":
+            async def trace(scope, receive, send):
+                caller = None
+                # ASGI header names are lowercase
+                for k, v in scope["headers"]:
+                    if k == b"traceparent":
+                        caller = cls.parse(v.decode("latin-1"))
+                        break
+
+                attributes = {"http.method": scope["method"], "http.route": route}
+                if caller is not None:
+                    span = Span("http.request", caller[0], caller[1], "server", attributes)
+                else:
+                    span = Span("http.request", random.getrandbits(128) or 1, None, "server", attributes)
+
+                async def _send(message):
+                    if message["type"] == "http.response.start":
+                        attributes["http.status_code"] = message["status"]
+                    await send(message)
+
+                with span:
+                    await app(scope, receive, _send)
+
+            return trace
+
+        return wrap
+
+
+class RingBuffer:
+    """
+    Keeps the last `size` spans in memory.
+    """
+
+    def __init__(self, size: int = 1024):
+        self.buffer: "deque[Span]" = deque(maxlen=size)
+
+    def export(self, span: Span):
+        self.buffer.append(span)
+
+    def spans(self) -> list[Span]:
+        return list(self.buffer)
+
+    def traces(self) -> "dict[str, list[Span]]":
+        traces: "dict[str, list[Span]]" = {}
+        for span in self.buffer:
+            traces.setdefault(span.trace_id, []).append(span)
+        return traces
+
+    def close(self):
+        pass
+
+
+class JSONLines:
+    """
+    Appends each span to a file as one JSON object per line.
+    """
+
+    def __init__(self, path: str):
+        self.file = open(path, "ab")
+        self.encoder = ms.json.Encoder()
+
+    def export(self, span: Span):
+        self.file.write(self.encoder.encode(span.to_dict()) + b"\n")
+
+    def close(self):
+        self.file.close()
+
+
+class OTLP:
+    """
+    Sends spans in batches to an OpenTelemetry collector, as OTLP/JSON over HTTP.
+
+    - `endpoint`: The collector's traces endpoint.
+    - `service`: The `service.name` the spans are reported under.
+    - `batch_size`: Spans are sent once this many are waiting.
+    - `interval`: Or once the oldest waiting span is this many seconds old.
+    - `timeout`: Seconds to wait for the collector.
+    """
+
+    KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+
+    def __init__(
+        self,
+        endpoint: str = "http://localhost:4318/v1/traces",
+        service: str = "betterweb",
+        batch_size: int = 512,
+        interval: float = 5.0,
+        timeout: float = 10.0,
+    ):
+        self.endpoint = endpoint
+        self.service = service
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.batch: list[Span] = []
+        self.oldest = 0.0
+        self.tasks: "set[io.Future[None]]" = set()
+
+    def export(self, span: Span):
+        if not self.batch:
+            self.oldest = time.monotonic()
+        self.batch.append(span)
+        if len(self.batch) >= self.batch_size or time.monotonic() - self.oldest >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Sends the waiting spans in a thread, or right away if no event loop is running.
+        """
+        if not self.batch:
+            return
+        body = ms.json.encode(self.payload(self.batch))
+        self.batch = []
+
+        try:
+            loop = io.get_running_loop()
+        except RuntimeError:
+            return self.post(body)
+
+        task = loop.run_in_executor(None, self.post, body)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def post(self, body: bytes):
+        # Imported here as most apps never export to a collector
+        import urllib.request
+
+        request = urllib.request.Request(
+            self.endpoint,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except OSError:
+            # The collector is unavailable, drop the batch rather than slow down the app
+            pass
+
+    def payload(self, spans: list[Span]) -> "dict[str, t.Any]":
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [self.attribute("service.name", self.service)]},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "betterweb"},
+                            "spans": [self.span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def span(self, span: Span) -> "dict[str, t.Any]":
+        data: "dict[str, t.Any]" = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": self.KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start),
+            "endTimeUnixNano": str(span.end),
+            "attributes": [self.attribute(k, v) for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id is not None:
+            data["parentSpanId"] = span.parent_id
+        return data
+
+    @staticmethod
+    def attribute(key: str, value: t.Any) -> "dict[str, t.Any]":
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    async def close(self):
+        """
+        Sends the last batch and waits for every batch still being sent.
+        """
+        self.flush()
+        if self.tasks:
+            await io.gather(*self.tasks)
@@ -0,0 +1,105 @@
+import typing as t
+import time
+import inspect
+import logging
+import asyncio as io
+
+if t.TYPE_CHECKING:
+    from .app import App
+
+logger = logging.getLogger("betterweb")
+
+Hook = t.Callable[[], "t.Awaitable[None] | None"]
+
+
+async def call(hook: Hook):
+    """
+    Calls a sync or async hook.
+    """
+    result = hook()
+    if inspect.isawaitable(result):
+        await result
+
+
+class Warmup:
+    """
+    Work done on startup before the app reports ready, so the first requests after a deploy are not slower than the rest.
+    The route table is always built first, then the stages below run concurrently.
+
+    - `routes`: Paths of `Route`s to render once, running their handlers and filling `use_memo` caches.
+    - `static`: Read every `StaticRoute` and build its headers, instead of on its first request.
+    - `tasks`: Sync or async functions to run alongside, e.g. opening connection pools. If one fails, startup fails.
+    - `timeout`: Seconds warmup may take before startup fails. Optional: defaults to no limit.
+
+    Failed renders and unreadable static files are logged to the `betterweb` logger rather than failing startup,
+    as the same error would only be raised again on the first request.
+    """
+
+    def __init__(
+        self,
+        routes: t.Iterable[str] = (),
+        static: bool = True,
+        tasks: t.Iterable[Hook] = (),
+        timeout: t.Optional[float] = None,
+    ):
+        self.routes = list(routes)
+        self.static = static
+        self.tasks = list(tasks)
+        self.timeout = timeout
+
+    async def run(self, app: "App"):
+        start = time.perf_counter()
+        try:
+            async with io.timeout(self.timeout):
+                async with io.TaskGroup() as group:
+                    if self.static:
+                        group.create_task(io.to_thread(self.prepare, app))
+                    # Renders share the component stack, so they run one after another
+                    group.create_task(self.render(app))
+                    for task in self.tasks:
+                        group.create_task(call(task))
+        except ExceptionGroup as exc:
+            # Report the failed task itself when there is only one
+            if len(exc.exceptions) == 1:
+                raise exc.exceptions[0] from None
+            raise
+
+        logger.info(
+            "Warmed up %d routes, %d static routes and %d tasks in %.1fms",
+            len(self.routes),
+            len(app.static_routes) + 1 if self.static else 0,
+            len(self.tasks),
+            (time.perf_counter() - start) * 1e3,
+        )
+
+    @staticmethod
+    def prepare(app: "App"):
+        for path, route in [*app.static_routes.items(), ("default page", app.DEFAULT_PAGE)]:
+            try:
+                route.prepare()
+            except OSError as exc:
+                logger.warning("Could not warm up static route %s: %s", path, exc)
+
+    async def render(self, app: "App"):
+        from .dom import DOM
+        from .component import Component
+
+        for path in self.routes:
+            route = app.routes.get(path)
+            if route is None:
+                logger.warning("Could not warm up %s: no such route", path)
+                continue
+
+            first = DOM.id
+            root = None
+            try:
+                root = Component(f"__warmup__{path}", await route.handler())
+                DOM.to_html(await root.render())
+            except Exception as exc:
+                logger.warning("Could not warm up %s: %r", path, exc)
+            finally:
+                if root is not None:
+                    root.unmount()
+                # No client will send events for this render
+                for id in range(first, DOM.id):
+                    DOM.events.pop(f"dom-{id}", None)
@@ -0,0 +1,26 @@
+import typing as t
+import sys
+import importlib
+
+
+def lazy(package: str, exports: "dict[str, str]"):
+    """
+    Returns the `__getattr__` and `__dir__` of `package`, importing each of its exports from its module on first use.
+    Importing the package then does not import everything it exports.
+
+    - `exports`: Each exported name and the module it is defined in, relative to `package`.
+    """
+    module = sys.modules[package]
+
+    def __getattr__(name: str) -> t.Any:
+        source = exports.get(name)
+        if source is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(source, package), name)
+        setattr(module, name, value)
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted({*vars(module), *exports})
+
+    return __getattr__, __dir__
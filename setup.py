@@ -15,6 +15,7 @@ setup(
         long_description=read("README.md"),
         long_description_content_type="text/markdown",
         packages=find_packages(exclude="tests"),
+        package_data={"betterweb": ["js/dist/*.js"], "betterweb.server": ["default.html"]},
         install_requires=[],
         extras_require={},
         keywords=['python', 'better web', 'web', "react", "state", "client"],
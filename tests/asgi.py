@@ -0,0 +1,89 @@
+"""
+Calls an app in-process, the way an ASGI server would.
+"""
+
+import typing as t
+import asyncio as io
+
+
+class Response:
+    def __init__(self):
+        self.status: t.Optional[int] = None
+        self.headers: "list[tuple[bytes, bytes]]" = []
+        self.chunks: "list[bytes]" = []
+        self.complete = False
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(self.chunks)
+
+    def header(self, name: str) -> t.Optional[str]:
+        for key, value in self.headers:
+            if key.decode().lower() == name:
+                return value.decode()
+        return None
+
+
+def scope(
+    path: str = "/",
+    method: str = "GET",
+    headers: "t.Optional[list[tuple[bytes, bytes]]]" = None,
+    query_string: bytes = b"",
+    client: "tuple[str, int]" = ("203.0.113.7", 50000),
+) -> "dict[str, t.Any]":
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string,
+        "root_path": "",
+        "headers": [(b"host", b"localhost"), *(headers or [])],
+        "client": client,
+        "server": ("localhost", 8000),
+    }
+
+
+def receiver(chunks: "t.Sequence[bytes]" = (), disconnect: t.Optional[io.Event] = None):
+    """
+    A `receive` that returns `chunks` as the request body, then waits for `disconnect` to be set.
+    """
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks or [b""])
+    ]
+    disconnect = disconnect or io.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    return receive
+
+
+async def call(
+    app: t.Any,
+    path: str = "/",
+    method: str = "GET",
+    headers: "t.Optional[list[tuple[bytes, bytes]]]" = None,
+    body: "t.Sequence[bytes]" = (),
+    **options: t.Any,
+) -> Response:
+    response = Response()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+            response.headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            response.chunks.append(message.get("body", b""))
+            response.complete = not message.get("more_body", False)
+
+    await app(scope(path, method, headers, **options), receiver(body), send)
+    return response
+
@@ -0,0 +1,104 @@
+import asyncio as io
+
+import msgspec as ms
+import pytest
+
+from betterweb import App, APIRoute, Request, ResponseConstructor, RouteError
+from .asgi import call, scope, receiver
+
+
+class Item(ms.Struct):
+    name: str
+
+
+async def typed(request: Request, response: ResponseConstructor, item: Item):
+    await response.json({"name": item.name if item is not None else None})
+
+
+async def variadic(request: Request, response: ResponseConstructor, *args):
+    await response.json(len(args))
+
+
+async def defaulted(request: Request, response: ResponseConstructor, item: Item = None):  # type: ignore[assignment]
+    await response.json(item is None)
+
+
+async def unannotated(request, response, item):
+    pass
+
+
+def test_which_handlers_get_a_body():
+    assert APIRoute(["POST"], typed).decoder is not None
+    assert APIRoute(["POST"], variadic).decoder is None
+    assert APIRoute(["POST"], defaulted).decoder is None
+    assert APIRoute(["POST"], unannotated).decoder is None
+    assert APIRoute(["GET", "HEAD"], typed).decoder is None
+
+
+def test_body_is_decoded_except_for_get():
+    app = App({"/": APIRoute(["GET", "POST"], typed)}, {}, {}, {})
+    response = io.run(call(app, "/", "POST", body=[b'{"name": "a"}']))
+    assert ms.json.decode(response.body) == {"name": "a"}
+    assert io.run(call(app, "/", "POST", body=[b'{"name": 1}'])).status == 422
+    response = io.run(call(app, "/", "GET"))
+    assert ms.json.decode(response.body) == {"name": None}
+
+
+def test_variadic_handlers_are_called_without_a_body():
+    app = App({"/": APIRoute(["POST"], variadic)}, {}, {}, {})
+    response = io.run(call(app, "/", "POST", body=[b"not json"]))
+    assert ms.json.decode(response.body) == 0
+
+
+def test_null_body_is_decoded_once():
+    decoded = []
+
+    async def handler(request: Request, response: ResponseConstructor):
+        decode = request._decode
+
+        def counted(*args):
+            decoded.append(args)
+            return decode(*args)
+
+        request._decode = counted  # type: ignore[method-assign]
+        assert await request.json() is None
+        assert await request.json() is None
+        await response.json(None)
+
+    app = App({"/": APIRoute(["POST"], handler)}, {}, {}, {})
+    assert io.run(call(app, "/", "POST", body=[b"null"])).status == 200
+    assert len(decoded) == 1
+
+
+def test_decoder_cache_is_bounded():
+    for size in range(Request.MAX_DECODERS + 10):
+        Request.decoder(tuple[(int,) * (size + 1)])  # type: ignore[misc]
+    assert len(Request.DECODERS) == Request.MAX_DECODERS
+    assert Request.decoder(list[int]) is Request.decoder(list[int])
+
+
+def test_body_over_the_limit_is_a_413():
+    async def handler(request: Request, response: ResponseConstructor):
+        await request.body()
+        await response.json(None)
+
+    app = App({"/": APIRoute(["POST"], handler)}, {}, {}, {}, max_body_size=4)
+    response = io.run(call(app, "/", "POST", body=[b"12345678"]))
+    assert response.status == 413
+
+
+def test_route_error_after_the_response_started_aborts_it():
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def handler(request: Request, response: ResponseConstructor):
+        stream = await response.stream()
+        await stream.send(b"partial")
+        await request.body()
+
+    app = App({"/": APIRoute(["POST"], handler)}, {}, {}, {}, max_body_size=4)
+    with pytest.raises(RouteError):
+        io.run(app(scope("/", "POST"), receiver([b"12345678"]), send))
+    assert [message["type"] for message in messages] == ["http.response.start", "http.response.body"]
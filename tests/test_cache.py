@@ -0,0 +1,193 @@
+import asyncio as io
+
+import pytest
+
+from betterweb import App, APIRoute, Headers, Request, ResponseCache, ResponseConstructor
+from .asgi import call
+
+
+def cached(handler, cache: ResponseCache, paths=("/",)) -> App:
+    return App({path: APIRoute(["GET"], handler, cache=cache) for path in paths}, {}, {}, {})
+
+
+def counting(body: bytes = b"hello", wait: "io.Event | None" = None):
+    calls = []
+
+    async def handler(request: Request, response: ResponseConstructor):
+        calls.append(request.path)
+        if wait is not None:
+            await wait.wait()
+        await response(body)
+
+    return handler, calls
+
+
+def test_hits_do_not_call_the_handler():
+    handler, calls = counting()
+    cache = ResponseCache()
+    app = cached(handler, cache)
+
+    async def run():
+        return await call(app, "/"), await call(app, "/")
+
+    first, second = io.run(run())
+    assert calls == ["/"]
+    assert first.body == second.body == b"hello"
+    assert second.header("age") == "0"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_concurrent_misses_call_the_handler_once():
+    async def run():
+        ready = io.Event()
+        handler, calls = counting(wait=ready)
+        app = cached(handler, ResponseCache())
+        requests = [io.ensure_future(call(app, "/")) for _ in range(5)]
+        await io.sleep(0.01)
+        ready.set()
+        return calls, await io.gather(*requests)
+
+    calls, responses = io.run(run())
+    assert calls == ["/"]
+    assert all(response.status == 200 and response.body == b"hello" for response in responses)
+
+
+def test_waiters_compute_their_own_when_the_leader_fails():
+    async def run():
+        ready = io.Event()
+        calls = []
+
+        async def handler(request: Request, response: ResponseConstructor):
+            calls.append(len(calls))
+            if len(calls) == 1:
+                await ready.wait()
+                raise ValueError("broken")
+            await response(b"hello")
+
+        app = cached(handler, ResponseCache())
+        leader = io.ensure_future(call(app, "/"))
+        await io.sleep(0.01)
+        waiters = [io.ensure_future(call(app, "/")) for _ in range(3)]
+        await io.sleep(0.01)
+        ready.set()
+        with pytest.raises(ValueError):
+            await leader
+        return calls, await io.gather(*waiters)
+
+    calls, responses = io.run(run())
+    # Each waiter calls the handler itself
+    assert len(calls) == 4
+    assert all(response.body == b"hello" for response in responses)
+
+
+def test_waiters_go_on_when_the_leader_is_cancelled():
+    async def run():
+        handler, calls = counting(wait=io.Event())
+        app = cached(handler, ResponseCache())
+        leader = io.ensure_future(call(app, "/"))
+        await io.sleep(0.01)
+        waiter = io.ensure_future(call(app, "/"))
+        await io.sleep(0.01)
+        leader.cancel()
+        await io.sleep(0.01)
+        # The waiter calls the handler itself
+        assert not waiter.done() and len(calls) == 2
+        waiter.cancel()
+
+    io.run(run())
+
+
+def test_entries_expire():
+    handler, calls = counting()
+    app = cached(handler, ResponseCache(ttl=0.05))
+
+    async def run():
+        await call(app, "/")
+        await call(app, "/")
+        await io.sleep(0.1)
+        await call(app, "/")
+
+    io.run(run())
+    assert calls == ["/", "/"]
+
+
+def test_least_recently_used_entries_are_evicted_past_the_budget():
+    handler, calls = counting(b"x" * 1000)
+    # Room for two entries of a little over 1000 bytes
+    cache = ResponseCache(max_bytes=2500)
+    app = cached(handler, cache, ("/a", "/b", "/c"))
+
+    async def run():
+        for path in ("/a", "/b", "/a", "/c", "/a", "/b"):
+            await call(app, path)
+
+    io.run(run())
+    # /a was used after /b, so /b was evicted for /c
+    assert calls == ["/a", "/b", "/c", "/b"]
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["bytes"] <= 2500
+
+
+async def not_found(request: Request, response: ResponseConstructor):
+    await response(b"missing", {"status": 404, "statusText": "", "headers": Headers()})
+
+
+async def with_cookie(request: Request, response: ResponseConstructor):
+    await response(b"hello", {"status": 200, "statusText": "", "headers": Headers([("set-cookie", "a=1")])})
+
+
+async def no_store(request: Request, response: ResponseConstructor):
+    await response(b"hello", {"status": 200, "statusText": "", "headers": Headers([("cache-control", "no-store")])})
+
+
+async def streamed(request: Request, response: ResponseConstructor):
+    stream = await response.stream()
+    await stream.send(b"hello")
+    await stream.close()
+
+
+@pytest.mark.parametrize("handler", [not_found, with_cookie, no_store, streamed])
+def test_uncacheable_responses_pass_through(handler):
+    calls = []
+
+    async def counted(request: Request, response: ResponseConstructor):
+        calls.append(True)
+        await handler(request, response)
+
+    cache = ResponseCache()
+    app = cached(counted, cache)
+
+    async def run():
+        return [await call(app, "/") for _ in range(2)]
+
+    responses = io.run(run())
+    assert len(calls) == 2
+    assert responses[0].body == responses[1].body
+    assert responses[0].header("age") is None and responses[1].header("age") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_waiters_do_not_wait_for_a_stream_to_end():
+    async def run():
+        end = io.Event()
+        calls = []
+
+        async def handler(request: Request, response: ResponseConstructor):
+            calls.append(True)
+            stream = await response.stream()
+            await stream.send(b"tick")
+            await end.wait()
+            await stream.close()
+
+        app = cached(handler, ResponseCache())
+        leader = io.ensure_future(call(app, "/"))
+        await io.sleep(0.01)
+        waiter = io.ensure_future(call(app, "/"))
+        await io.sleep(0.01)
+        # The waiter started its own stream rather than wait for the leader's to end
+        assert not leader.done() and not waiter.done() and len(calls) == 2
+        end.set()
+        return await io.gather(leader, waiter)
+
+    leader, waiter = io.run(run())
+    assert leader.body == waiter.body == b"tick"
@@ -0,0 +1,43 @@
+import gzip
+import asyncio as io
+
+from betterweb.server.api.response.compression import Compression
+
+
+async def compress(headers, body: bytes):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    wrapped = Compression(encodings=("gzip",)).wrap("gzip", send)
+    await wrapped({"type": "http.response.start", "status": 200, "headers": headers})
+    await wrapped({"type": "http.response.body", "body": body})
+    return sent
+
+
+def test_strong_etag_is_made_weak():
+    body = b"hello " * 200
+    sent = io.run(
+        compress([(b"content-type", b"text/plain"), (b"etag", b'"abc"'), (b"content-length", b"1200")], body)
+    )
+    headers = dict(sent[0]["headers"])
+    assert headers[b"etag"] == b'W/"abc"'
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(sent[1]["body"]) == body
+    assert headers[b"content-length"] == str(len(sent[1]["body"])).encode()
+
+
+def test_vary_is_merged():
+    sent = io.run(compress([(b"content-type", b"text/plain"), (b"Vary", b"Cookie")], b"x" * 1000))
+    vary = [v for k, v in sent[0]["headers"] if k.lower() == b"vary"]
+    assert vary == [b"Cookie, accept-encoding"]
+
+    sent = io.run(compress([(b"content-type", b"text/plain"), (b"vary", b"Accept-Encoding")], b"x" * 1000))
+    assert [v for k, v in sent[0]["headers"] if k.lower() == b"vary"] == [b"Accept-Encoding"]
+
+
+def test_small_bodies_are_untouched():
+    headers = [(b"content-type", b"text/plain"), (b"etag", b'"abc"')]
+    sent = io.run(compress(headers, b"tiny"))
+    assert sent[0]["headers"] == headers
@@ -0,0 +1,204 @@
+import time
+import asyncio as io
+
+import msgspec as ms
+
+from betterweb import App, APIRoute, Drain, Headers, Request, ResponseConstructor, StreamResponse, WSRoute, Websocket
+from betterweb.server.api.state import State
+from betterweb.server.predefined.ws import WebsocketHandler
+from .asgi import call
+
+
+class Recorder:
+    def __init__(self):
+        self.messages: "list[dict]" = []
+
+    async def __call__(self, message):
+        self.messages.append(message)
+
+
+def websocket_receiver(*messages):
+    queue = list(messages)
+
+    async def receive():
+        if queue:
+            return queue.pop(0)
+        # The client stays connected
+        await io.sleep(3600)
+
+    return receive
+
+
+async def sse_stream(send) -> StreamResponse:
+    return await StreamResponse.init(
+        send, {"status": 200, "statusText": "", "headers": Headers([(b"content-type", b"text/event-stream")])}
+    )
+
+
+def test_event_streams_get_a_retry_and_close():
+    async def run():
+        app = App({}, {}, {}, {})
+        send = Recorder()
+        stream = await sse_stream(send)
+        await Drain(reconnect=(0.25, 0.25)).run(app)
+        return stream, send.messages
+
+    stream, messages = io.run(run())
+    assert stream.closed
+    assert stream not in StreamResponse.streams
+    assert messages[1] == {"type": "http.response.body", "body": b"retry: 250\n\n", "more_body": True}
+    assert messages[2] == {"type": "http.response.body", "body": b"", "more_body": False}
+
+
+def slow(seconds: float):
+    async def handler(request: Request, response: ResponseConstructor):
+        await io.sleep(seconds)
+        await response.json({"done": True})
+
+    return handler
+
+
+def test_inflight_requests_finish_within_the_deadline():
+    async def run():
+        app = App({"/": APIRoute(["GET"], slow(0.2))}, {}, {}, {}, drain=Drain(timeout=5))
+        request = io.ensure_future(call(app, "/"))
+        await io.sleep(0.05)
+        assert app.inflight == 1
+        await app.shutdown()
+        assert request.done()
+        return await request
+
+    response = io.run(run())
+    assert response.status == 200
+
+
+def test_inflight_requests_are_waited_for_up_to_the_deadline():
+    async def run():
+        app = App({"/": APIRoute(["GET"], slow(5))}, {}, {}, {}, drain=Drain(timeout=0.2))
+        request = io.ensure_future(call(app, "/"))
+        await io.sleep(0.05)
+        start = time.monotonic()
+        await app.shutdown()
+        elapsed = time.monotonic() - start
+        assert app.inflight == 1
+        request.cancel()
+        return elapsed
+
+    assert 0.15 < io.run(run()) < 1
+
+
+def test_new_sessions_are_told_to_reconnect():
+    async def run():
+        app = App({}, {}, {}, {}, drain=Drain(reconnect=(2, 2)))
+        await app.shutdown()
+        send = Recorder()
+        scope = {"type": "websocket", "path": "/__bw/ws", "headers": [], "query_string": b""}
+        await app(scope, websocket_receiver({"type": "websocket.connect"}), send)  # type: ignore[arg-type]
+        return send.messages
+
+    messages = io.run(run())
+    assert [message["type"] for message in messages] == ["websocket.accept", "websocket.send", "websocket.close"]
+    assert ms.json.decode(messages[1]["bytes"]) == {"type": "reconnect", "data": {"delay": 2000}}
+    assert messages[2]["code"] == 1012
+
+
+def test_new_websockets_on_other_routes_are_only_closed():
+    async def handler(websocket: Websocket):
+        raise AssertionError("not called while draining")
+
+    async def run():
+        app = App({}, {"/chat": WSRoute(handler)}, {}, {})
+        await app.shutdown()
+        send = Recorder()
+        scope = {"type": "websocket", "path": "/chat", "headers": [], "query_string": b""}
+        await app(scope, websocket_receiver({"type": "websocket.connect"}), send)  # type: ignore[arg-type]
+        return send.messages
+
+    messages = io.run(run())
+    assert [message["type"] for message in messages] == ["websocket.accept", "websocket.close"]
+    assert messages[1] == {"type": "websocket.close", "code": 1012, "reason": "Server restarting"}
+
+
+def test_open_sessions_are_told_to_reconnect_and_state_is_flushed():
+    flushed = []
+
+    async def run():
+        app = App({}, {}, {}, {})
+        send = Recorder()
+        websocket = Websocket(send, websocket_receiver())  # type: ignore[arg-type]
+        WebsocketHandler.sessions.add(websocket)
+        try:
+            await Drain(reconnect=(1, 1), flush=flushed.append).run(app)
+        finally:
+            WebsocketHandler.sessions.discard(websocket)
+        return send.messages
+
+    messages = io.run(run())
+    assert ms.json.decode(messages[0]["bytes"]) == {"type": "reconnect", "data": {"delay": 1000}}
+    assert messages[1] == {"type": "websocket.close", "code": 1012, "reason": "Server restarting"}
+    assert len(flushed) == 1 and isinstance(flushed[0], dict)
+
+
+def test_flush_gets_values_not_yet_rendered():
+    flushed = []
+
+    async def run():
+        state = State.create("drain-pending", 1)
+        # Dispatched, with the render that would catch `data` up still to come
+        state.new = 2
+        try:
+            await Drain(flush=flushed.append).run(App({}, {}, {}, {}))
+        finally:
+            del State.states["drain-pending"]
+
+    io.run(run())
+    assert flushed[0]["drain-pending"] == 2
+
+
+def test_end_stops_the_piped_source():
+    closed = []
+
+    async def source():
+        try:
+            while True:
+                yield b"data: tick\n\n"
+                await io.sleep(0.01)
+        finally:
+            closed.append(True)
+
+    async def run():
+        send = Recorder()
+        stream = await sse_stream(send)
+        piping = io.ensure_future(stream.pipe(source()))
+        await io.sleep(0.05)
+        await stream.end(500)
+        await piping
+        return stream, send.messages
+
+    stream, messages = io.run(run())
+    assert closed == [True]
+    assert stream.closed
+    assert messages[-2]["body"] == b"retry: 500\n\n"
+    assert messages[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+
+
+def test_disconnect_ends_a_websocket_route():
+    received = []
+
+    async def handler(websocket: Websocket):
+        while True:
+            received.append(await websocket.receive())
+
+    async def run():
+        send = Recorder()
+        receive = websocket_receiver(
+            {"type": "websocket.connect"},
+            {"type": "websocket.receive", "text": "hi"},
+            {"type": "websocket.disconnect", "code": 1001},
+        )
+        await WSRoute(handler)(send, receive)  # type: ignore[arg-type]
+        return send.messages
+
+    # The handler stops at the disconnect, and no close is sent to a client that is gone
+    assert io.run(run()) == []
+    assert received == [{"bytes": None, "text": "hi"}]
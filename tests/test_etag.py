@@ -0,0 +1,34 @@
+import asyncio as io
+
+from betterweb import App, APIRoute, Headers, Request, ResponseConstructor
+from betterweb.server.api.response.etag import make_etag, etag_matches
+from .asgi import call
+
+
+def test_strong_etags_hash_the_body():
+    body = b"x" * 100
+    tag = make_etag(body, weak=False)
+    assert not tag.startswith("W/")
+    # A different body of the same length and CRC-32 must not share the tag
+    assert tag != make_etag(b"y" * 100, weak=False)
+    assert len(tag) == 34
+    assert make_etag(body).startswith('W/"')
+    assert etag_matches([tag], tag)
+
+
+async def versioned(request: Request, response: ResponseConstructor):
+    if await response.etag("v1"):
+        return
+    if request.query.get("missing"):
+        await response.json({"error": "missing"}, {"status": 404, "headers": Headers(), "statusText": ""})
+    else:
+        await response.json({"version": 1})
+
+
+def test_explicit_etag_only_on_200():
+    app = App({"/": APIRoute(["GET"], versioned)}, {}, {}, {})
+    response = io.run(call(app, "/"))
+    assert response.header("etag") == '"v1"'
+    response = io.run(call(app, "/", query_string=b"missing=1"))
+    assert response.status == 404
+    assert response.header("etag") is None
@@ -0,0 +1,42 @@
+import asyncio as io
+
+from betterweb import App, APIRoute, Headers, Request, ResponseConstructor
+from betterweb.server.api.response.utils.headers import EMPTY_HEADERS
+from .asgi import call
+
+
+def test_copies_share_the_list_until_changed():
+    headers = Headers([("a", "1")])
+    copy = headers.copy()
+    assert copy.raw() is headers.raw()
+    copy.append("b", "2")
+    assert headers.raw() == [(b"a", b"1")]
+    assert copy.get("b") == ["2"]
+
+
+def test_changing_a_default_response_does_not_leak():
+    async def changed(request: Request, response: ResponseConstructor):
+        (await response(b"hi")).headers.append("x-leak", "1")
+
+    async def plain(request: Request, response: ResponseConstructor):
+        await response(b"hi")
+
+    async def stream(request: Request, response: ResponseConstructor):
+        response_stream = await response.stream()
+        response_stream.options["headers"].append("x-leak", "1")
+        await response_stream.close()
+
+    routes = {
+        "/changed": APIRoute(["GET"], changed),
+        "/stream": APIRoute(["GET"], stream),
+        "/plain": APIRoute(["GET"], plain),
+    }
+    app = App(routes, {}, {}, {})
+
+    async def run():
+        await call(app, "/changed")
+        await call(app, "/stream")
+        return await call(app, "/plain")
+
+    assert io.run(run()).header("x-leak") is None
+    assert len(EMPTY_HEADERS) == 0
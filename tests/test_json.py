@@ -0,0 +1,45 @@
+import decimal
+import asyncio as io
+
+import msgspec as ms
+import pytest
+
+from betterweb import App, APIRoute, JSONEncoder, Request, ResponseConstructor
+from .asgi import call
+
+
+class Point:
+    def __init__(self, x: int, y: int):
+        self.x = x
+        self.y = y
+
+
+def enc_hook(value):
+    if isinstance(value, Point):
+        return [value.x, value.y]
+    raise NotImplementedError(type(value))
+
+
+async def point(request: Request, response: ResponseConstructor):
+    await response.json({"point": Point(1, 2), "price": decimal.Decimal("1.50")})
+
+
+def test_app_encoder_encodes_custom_types():
+    app = App({"/": APIRoute(["GET"], point)}, {}, {}, {}, json_encoder=JSONEncoder(enc_hook=enc_hook))
+    response = io.run(call(app, "/"))
+    assert ms.json.decode(response.body) == {"point": [1, 2], "price": "1.50"}
+
+
+def test_other_apps_keep_the_shared_encoder():
+    App({}, {}, {}, {}, json_encoder=JSONEncoder(enc_hook=enc_hook))
+    app = App({"/": APIRoute(["GET"], point)}, {}, {}, {})
+    with pytest.raises(TypeError):
+        io.run(call(app, "/"))
+
+
+def test_app_encoder_is_used_for_ndjson():
+    async def points(request: Request, response: ResponseConstructor):
+        await response.ndjson([Point(1, 2), Point(3, 4)])
+
+    app = App({"/": APIRoute(["GET"], points)}, {}, {}, {}, json_encoder=JSONEncoder(enc_hook=enc_hook))
+    assert io.run(call(app, "/")).body == b"[1,2]\n[3,4]\n"
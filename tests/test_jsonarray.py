@@ -0,0 +1,48 @@
+import pytest
+
+from betterweb import RouteError
+from betterweb.server.api.jsonarray import JSONArrayParser
+
+
+def feed(*chunks: bytes, max_item_size=None) -> "list[bytes]":
+    parser = JSONArrayParser(max_item_size)
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    assert parser.done
+    return items
+
+
+def test_elements():
+    assert feed(b"[]") == []
+    assert feed(b" [ ] ") == []
+    assert feed(b'[1, "a,]", {"b": [2, 3]}]') == [b"1", b' "a,]"', b' {"b": [2, 3]}']
+    assert feed(b"[1", b",", b" 2]") == [b"1", b" 2"]
+
+
+@pytest.mark.parametrize("body", [b"[1,]", b"[,1]", b"[1,,2]", b"[ , ]", b"[1, ]"])
+def test_empty_elements_are_rejected(body):
+    with pytest.raises(RouteError) as exc:
+        feed(body)
+    assert exc.value.status == 422
+
+
+def test_trailing_comma_across_chunks():
+    with pytest.raises(RouteError):
+        feed(b"[1,", b"]")
+
+
+def test_max_item_size_within_one_chunk():
+    item = b'"' + b"x" * 24 + b'"'
+    assert feed(b"[" + item + b"]", max_item_size=26) == [item]
+    with pytest.raises(RouteError) as exc:
+        feed(b"[" + item + b", 1]", max_item_size=4)
+    assert exc.value.status == 413
+    with pytest.raises(RouteError):
+        feed(b"[1, " + item + b"]", max_item_size=4)
+
+
+def test_max_item_size_across_chunks():
+    with pytest.raises(RouteError) as exc:
+        feed(b'["xxxx', b"xxxx", max_item_size=4)
+    assert exc.value.status == 413
@@ -0,0 +1,65 @@
+import asyncio as io
+
+from betterweb import App
+from .asgi import call
+
+
+def lifespan(app: App, *messages: str) -> "list[dict]":
+    sent = []
+    queue = [{"type": message} for message in messages]
+
+    async def receive():
+        return queue.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    io.run(app({"type": "lifespan"}, receive, send))  # type: ignore[arg-type]
+    return sent
+
+
+def test_shutdown_failure_is_reported():
+    def on_shutdown():
+        raise RuntimeError("could not close the pool")
+
+    app = App({}, {}, {}, {}, on_shutdown=on_shutdown)
+    sent = lifespan(app, "lifespan.startup", "lifespan.shutdown")
+    assert sent[0] == {"type": "lifespan.startup.complete"}
+    assert sent[1]["type"] == "lifespan.shutdown.failed"
+    assert "could not close the pool" in sent[1]["message"]
+
+
+def test_ready_after_startup():
+    app = App({}, {}, {}, {})
+    lifespan(app, "lifespan.startup", "lifespan.shutdown")
+    assert io.run(call(app, "/__bw/ready")).status == 503
+
+
+def test_ready_without_lifespan():
+    app = App({}, {}, {}, {})
+    assert io.run(call(app, "/__bw/ready")).status == 200
+
+
+def test_not_ready_before_startup_finishes():
+    statuses = []
+
+    async def on_startup():
+        statuses.append((await call(app, "/__bw/ready")).status)
+
+    app = App({}, {}, {}, {}, on_startup=on_startup)
+
+    async def run():
+        messages = ["lifespan.startup", "lifespan.shutdown"]
+
+        async def receive():
+            if messages[0] == "lifespan.shutdown":
+                statuses.append((await call(app, "/__bw/ready")).status)
+            return {"type": messages.pop(0)}
+
+        async def send(message):
+            pass
+
+        await app({"type": "lifespan"}, receive, send)  # type: ignore[arg-type]
+
+    io.run(run())
+    assert statuses == [503, 200]
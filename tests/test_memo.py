@@ -0,0 +1,71 @@
+import asyncio as io
+
+import pytest
+
+from betterweb import use_memo
+from betterweb.server.api.state import Memo
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    Memo.states.clear()
+    yield
+    Memo.states.clear()
+
+
+def test_callable_values_are_not_called():
+    calls = []
+
+    def handler():
+        calls.append("handler")
+
+    def make():
+        return handler
+
+    assert use_memo(make, [1]) is handler
+    assert use_memo(make, [2]) is handler
+    assert calls == []
+
+
+def test_cleanup_gets_replaced_and_evicted_values():
+    cleaned = []
+
+    def value():
+        return len(cleaned)
+
+    use_memo(value, [1], cleanup=cleaned.append)
+    use_memo(value, [1], cleanup=cleaned.append)
+    assert cleaned == []
+    use_memo(value, [2], cleanup=cleaned.append)
+    assert cleaned == [0]
+
+    Memo.maxsize, maxsize = 0, Memo.maxsize
+    try:
+        Memo.evict()
+    finally:
+        Memo.maxsize = maxsize
+    assert cleaned == [0, 1]
+
+
+def test_deps_change_lets_the_running_call_finish():
+    cleaned = []
+    calls = []
+
+    async def fetch():
+        index = len(calls)
+        calls.append(index)
+        await io.sleep(0.05)
+        return f"result {index}"
+
+    async def run():
+        first = use_memo(fetch, [1], cleanup=cleaned.append)
+        waiting = io.ensure_future(first)
+        await io.sleep(0.01)
+        second = use_memo(fetch, [2], cleanup=cleaned.append)
+        return await waiting, await second
+
+    first, second = io.run(run())
+    assert first == "result 0"
+    assert second == "result 1"
+    # The first call's value was replaced before it finished, so it is cleaned up once it has
+    assert cleaned == ["result 0"]
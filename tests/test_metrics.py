@@ -0,0 +1,61 @@
+import asyncio as io
+
+import msgspec as ms
+
+from betterweb import App, APIRoute, DOM, Metrics, Request, ResponseConstructor, Route
+from betterweb.server.metrics import HTTP_REQUESTS, SESSION_HTML_BYTES
+from .asgi import call
+
+
+async def hello(request: Request, response: ResponseConstructor):
+    await response.json("hello")
+
+
+def test_metrics_flag_is_per_app():
+    HTTP_REQUESTS.clear()
+    measured = App({"/": APIRoute(["GET"], hello)}, {}, {}, {}, metrics=True)
+    unmeasured = App({"/": APIRoute(["GET"], hello)}, {}, {}, {})
+
+    io.run(call(measured, "/"))
+    io.run(call(unmeasured, "/"))
+    assert HTTP_REQUESTS.values == {("/", "GET", "200"): 1}
+    assert not hasattr(Metrics, "enabled")
+
+
+def test_session_html_bytes():
+    SESSION_HTML_BYTES.clear()
+
+    async def page():
+        async def client():
+            return DOM.create("main", {}, ["x" * 300])
+
+        return client
+
+    app = App({}, {}, {"/": Route("/", page)}, {}, metrics=True)
+    handshake = ms.json.encode({"type": "request", "data": {"url": "/", "query": [], "hash": ""}})
+    sent = []
+
+    async def run():
+        messages = [
+            {"type": "websocket.connect"},
+            {"type": "websocket.receive", "bytes": handshake},
+        ]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            return {"type": "websocket.disconnect", "code": 1001}
+
+        async def send(message):
+            if message["type"] == "websocket.send":
+                sent.append(message["bytes"])
+
+        scope = {"type": "websocket", "path": "/__bw/ws", "headers": [], "query_string": b""}
+        await app(scope, receive, send)  # type: ignore[arg-type]
+
+    io.run(run())
+    html = sum(len(frame) for frame in sent if ms.json.decode(frame)["type"] in ("html", "fragment"))
+    assert html > 300
+    counts = SESSION_HTML_BYTES.values[()]
+    assert sum(counts[:-1]) == 1
+    assert counts[-1] == html
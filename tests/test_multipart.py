@@ -0,0 +1,87 @@
+import asyncio as io
+
+import pytest
+
+from betterweb import Request, RouteError, UploadFile
+from .asgi import receiver, scope
+
+BOUNDARY = b"xyz"
+
+
+def multipart(*parts: "tuple[str, bytes, str | None]") -> bytes:
+    body = b""
+    for name, data, filename in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += b"--" + BOUNDARY + b"\r\n"
+        body += f"Content-Disposition: {disposition}\r\n\r\n".encode() + data + b"\r\n"
+    return body + b"--" + BOUNDARY + b"--\r\n"
+
+
+def request(chunks: "list[bytes]", max_body_size=None) -> Request:
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+    return Request(scope("/", "POST", headers), receiver(chunks), max_body_size)  # type: ignore[arg-type]
+
+
+async def collect(request: Request, **limits):
+    parts = []
+    async for name, value in request.parts(**limits):
+        parts.append((name, value.read() if isinstance(value, UploadFile) else value))
+    return parts
+
+
+def test_boundary_split_across_chunks():
+    body = multipart(("a", b"1", None), ("f", b"file contents", "f.txt"))
+    for split in range(1, len(body)):
+        chunks = [body[:split], body[split:]]
+        assert io.run(collect(request(chunks))) == [("a", "1"), ("f", b"file contents")]
+    # One byte at a time
+    assert io.run(collect(request([body[i : i + 1] for i in range(len(body))]))) == [
+        ("a", "1"),
+        ("f", b"file contents"),
+    ]
+
+
+def test_missing_final_boundary():
+    body = multipart(("f", b"data", "f.txt")).removesuffix(b"--" + BOUNDARY + b"--\r\n")
+    with pytest.raises(RouteError) as exc:
+        io.run(collect(request([body])))
+    assert exc.value.status == 400
+
+
+def test_max_part_size():
+    body = multipart(("f", b"x" * 100, "f.txt"))
+    assert io.run(collect(request([body]), max_part_size=100)) == [("f", b"x" * 100)]
+    with pytest.raises(RouteError) as exc:
+        io.run(collect(request([body]), max_part_size=99))
+    assert exc.value.status == 413
+
+
+def test_max_parts():
+    body = multipart(*((f"field{i}", b"v", None) for i in range(3)))
+    assert len(io.run(collect(request([body]), max_parts=3))) == 3
+    with pytest.raises(RouteError) as exc:
+        io.run(collect(request([body]), max_parts=2))
+    assert exc.value.status == 413
+
+
+def test_max_size_applies_to_the_call_only():
+    body = multipart(("a", b"x" * 50, None))
+    req = request([body], max_body_size=10_000)
+    with pytest.raises(RouteError) as exc:
+        io.run(collect(req, max_size=20))
+    assert exc.value.status == 413
+    assert req.max_body_size == 10_000
+
+
+def test_close_removes_uploaded_files():
+    async def run():
+        req = request([multipart(("f", b"data", "f.txt"), ("g", b"more", "g.txt"))])
+        uploads = [value async for _, value in req.parts()]
+        req.close()
+        return uploads
+
+    uploads = io.run(run())
+    assert len(uploads) == 2
+    assert all(upload.file.closed for upload in uploads)
@@ -0,0 +1,56 @@
+import asyncio as io
+import tracemalloc
+
+import pytest
+
+from betterweb import App, Profiler
+from .asgi import call
+
+
+def make_app(profiler: Profiler) -> App:
+    return App({}, {}, {}, {}, profiler=profiler)
+
+
+def test_needs_token_or_allow():
+    with pytest.raises(ValueError):
+        Profiler()
+
+
+def test_local_requests_are_not_let_in_by_default():
+    app = make_app(Profiler(token="secret"))
+    response = io.run(call(app, "/__bw/profile/memory/start", "POST", client=("127.0.0.1", 1)))
+    assert response.status == 403
+
+
+def test_token():
+    app = make_app(Profiler(token="secret"))
+    response = io.run(
+        call(app, "/__bw/profile/memory/stop", "POST", headers=[(b"authorization", b"Bearer secret")])
+    )
+    assert response.status == 200
+    response = io.run(
+        call(app, "/__bw/profile/memory/stop", "POST", headers=[(b"authorization", b"Bearer wrong")])
+    )
+    assert response.status == 403
+
+
+def test_local_allow():
+    app = make_app(Profiler(allow=Profiler.local))
+    assert io.run(call(app, "/__bw/profile/memory/stop", "POST", client=("127.0.0.1", 1))).status == 200
+    assert io.run(call(app, "/__bw/profile/memory/stop", "POST")).status == 403
+
+
+def test_memory_is_started_by_post_only():
+    app = make_app(Profiler(allow=lambda request: True))
+    try:
+        assert io.run(call(app, "/__bw/profile/memory")).status == 409
+        assert not tracemalloc.is_tracing()
+        assert io.run(call(app, "/__bw/profile/memory/start", "GET")).status == 405
+
+        assert io.run(call(app, "/__bw/profile/memory/start", "POST")).status == 200
+        assert tracemalloc.is_tracing()
+        response = io.run(call(app, "/__bw/profile/memory", query_string=b"limit=5"))
+        assert response.status == 200
+        assert b'"modules"' in response.body
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,51 @@
+import asyncio as io
+
+import msgspec as ms
+
+from betterweb import App, APIRoute, Request, ResponseConstructor, Route, middleware
+from betterweb.server.router import Router
+from .asgi import call
+
+
+def tagging(name: str):
+    @middleware
+    async def tag(scope, receive, send, call_next):
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message["headers"], (b"x-tag", name.encode())]}
+            await send(message)
+
+        await call_next(scope, receive, _send)
+
+    return tag
+
+
+async def hello(request: Request, response: ResponseConstructor):
+    await response.json("hello")
+
+
+async def page():
+    async def render():
+        return None
+
+    return render
+
+
+def test_router_middleware_covers_its_api_routes_only():
+    router = Router({"/hello": APIRoute(["GET"], hello)}, routes={"/page": Route("/page", page)}, middleware=[tagging("router")])
+    assert set(router.scoped_middleware("/api")) == {"/api/hello"}
+
+    app = App({}, {}, {}, {})
+    app.add_router(router, "/api")
+    response = io.run(call(app, "/api/hello"))
+    assert ms.json.decode(response.body) == "hello"
+    assert response.header("x-tag") == "router"
+
+
+def test_routes_added_after_compile_are_served():
+    app = App({}, {}, {}, {}, middleware=[tagging("app")])
+    app.compile()
+    app.api_routes["/late"] = APIRoute(["GET"], hello)
+    response = io.run(call(app, "/late"))
+    assert ms.json.decode(response.body) == "hello"
+    assert response.header("x-tag") == "app"
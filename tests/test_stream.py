@@ -0,0 +1,100 @@
+import asyncio as io
+
+import pytest
+
+from betterweb import Headers, StreamResponse
+from betterweb.server.api.response.constructor import ResponseConstructor
+
+
+class Recorder:
+    def __init__(self):
+        self.messages: "list[dict]" = []
+
+    async def __call__(self, message):
+        self.messages.append(message)
+
+
+def constructor(send) -> ResponseConstructor:
+    return ResponseConstructor(send, {"redirect": False, "type": "basic"})  # type: ignore[typeddict-item]
+
+
+def test_failing_source_is_closed_and_forgotten():
+    closed = []
+
+    class Source:
+        def __init__(self):
+            self.sent = False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if self.sent:
+                raise ValueError("broken")
+            self.sent = True
+            return b"first"
+
+        async def aclose(self):
+            closed.append(True)
+
+    async def run():
+        send = Recorder()
+        stream = await StreamResponse.init(send)
+        with pytest.raises(ValueError):
+            await stream.pipe(Source())
+        return stream, send.messages
+
+    stream, messages = io.run(run())
+    assert closed == [True]
+    assert stream.closed
+    assert stream not in StreamResponse.streams
+    # The body is not ended as if complete, so the server aborts the response
+    assert messages[-1] == {"type": "http.response.body", "body": b"first", "more_body": True}
+
+
+def test_stream_from_closes_after_the_source():
+    async def source():
+        yield b"a"
+        yield b"b"
+
+    async def run():
+        send = Recorder()
+        stream = await constructor(send).stream_from(source())
+        return stream, send.messages
+
+    stream, messages = io.run(run())
+    assert stream.closed
+    assert [message.get("body") for message in messages[1:]] == [b"a", b"b", b""]
+
+
+def test_stream_takes_options_positionally():
+    async def run():
+        send = Recorder()
+        stream = await constructor(send).stream({"status": 201, "statusText": "", "headers": Headers()})
+        await stream.close()
+        return send.messages
+
+    assert io.run(run())[0]["status"] == 201
+
+
+def test_sse_data_splits_only_at_line_breaks():
+    frame = constructor(Recorder()).sse_frame({"data": "a\u2028b\x85c\x0cd\r\ne\rf\ng"})
+    assert frame == "data: a\u2028b\x85c\x0cd\ndata: e\ndata: f\ndata: g\n\n".encode()
+
+
+def test_sse_json_with_a_line_separator_is_one_data_line():
+    frame = constructor(Recorder()).sse_frame({"text": "a\u2028b"}).decode()
+    assert frame.count("data:") == 1
+    assert frame == 'data: {"text":"a\u2028b"}\n\n'
+
+
+@pytest.mark.parametrize("field", ["event", "id"])
+@pytest.mark.parametrize("value", ["a\nevent: injected", "a\rb", "a\0b"])
+def test_sse_fields_cannot_add_fields(field, value):
+    with pytest.raises(ValueError):
+        constructor(Recorder()).sse_frame({"data": "x", field: value})
+
+
+def test_sse_fields():
+    frame = constructor(Recorder()).sse_frame({"data": "x", "event": "tick", "id": 7, "retry": 500})
+    assert frame == b"event: tick\nid: 7\nretry: 500\ndata: x\n\n"
@@ -0,0 +1,171 @@
+import json
+import time
+import asyncio as io
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from betterweb import App, APIRoute, Request, ResponseConstructor
+from betterweb.server.tracing import Tracer, Sampler, RingBuffer, OTLP
+from .asgi import call
+
+TRACE = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT = "00f067aa0ba902b7"
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    yield
+    Tracer.configure()
+
+
+async def handler(request: Request, response: ResponseConstructor):
+    await response.json({"hello": "world"})
+
+
+def make_app() -> App:
+    return App({"/": APIRoute(["GET"], handler)}, {}, {}, {})
+
+
+@pytest.mark.parametrize(
+    "traceparent, expected",
+    [
+        (f"00-{TRACE}-{PARENT}-01", (int(TRACE, 16), int(PARENT, 16), True)),
+        (f"00-{TRACE}-{PARENT}-00", (int(TRACE, 16), int(PARENT, 16), False)),
+        # Only the lowest bit says whether the caller samples
+        (f"00-{TRACE}-{PARENT}-03", (int(TRACE, 16), int(PARENT, 16), True)),
+        (f"00-{TRACE}-{PARENT}-02", (int(TRACE, 16), int(PARENT, 16), False)),
+        # Later versions may add fields
+        (f"01-{TRACE}-{PARENT}-01-extra", (int(TRACE, 16), int(PARENT, 16), True)),
+        (f"ff-{TRACE}-{PARENT}-01", None),
+        (f"00-{TRACE}-{PARENT}-01-extra", None),
+        (f"0-{TRACE}-{PARENT}-01", None),
+        (f"00-{'0' * 32}-{PARENT}-01", None),
+        (f"00-{TRACE}-{'0' * 16}-01", None),
+        (f"00-{TRACE.upper()}-{PARENT}-01", None),
+        (f"00-{TRACE}-{PARENT}-zz", None),
+        (f"00-{TRACE}-{PARENT}", None),
+        ("", None),
+    ],
+)
+def test_parse(traceparent, expected):
+    assert Tracer.parse(traceparent) == expected
+
+
+def test_sampler_rate():
+    assert all(Sampler(1.0)() for _ in range(100))
+    assert not any(Sampler(0.0)() for _ in range(100))
+    sampler = Sampler(0.1)
+    sampled = sum(sampler() for _ in range(100000))
+    assert 9000 < sampled < 11000
+
+
+def test_unsampled_requests_record_nothing():
+    buffer = RingBuffer()
+    Tracer.configure(buffer, sample_rate=0.0)
+    response = io.run(call(make_app(), "/"))
+    assert response.status == 200
+    assert buffer.spans() == []
+
+
+def test_sampled_requests_record_their_stages():
+    buffer = RingBuffer()
+    Tracer.configure(buffer, sample_rate=1.0)
+    io.run(call(make_app(), "/"))
+    spans = {span.name: span for span in buffer.spans()}
+    assert set(spans) == {"http.request", "handler"}
+    assert spans["handler"].parent == spans["http.request"].id
+    assert spans["http.request"].attributes["http.status_code"] == 200
+
+
+def test_caller_sampling_is_followed():
+    buffer = RingBuffer()
+    Tracer.configure(buffer, sample_rate=0.0)
+    app = make_app()
+
+    io.run(call(app, "/", headers=[(b"traceparent", f"00-{TRACE}-{PARENT}-01".encode())]))
+    request = next(span for span in buffer.spans() if span.name == "http.request")
+    assert request.trace_id == TRACE
+    assert request.parent_id == PARENT
+
+    Tracer.configure(buffer, sample_rate=1.0)
+    buffer.buffer.clear()
+    io.run(call(app, "/", headers=[(b"traceparent", f"00-{TRACE}-{PARENT}-00".encode())]))
+    assert buffer.spans() == []
+
+
+def test_traceparent_off_samples_locally():
+    buffer = RingBuffer()
+    Tracer.configure(buffer, sample_rate=0.0, traceparent=False)
+    io.run(call(make_app(), "/", headers=[(b"traceparent", f"00-{TRACE}-{PARENT}-01".encode())]))
+    assert buffer.spans() == []
+
+
+class Collector(BaseHTTPRequestHandler):
+    """
+    Stands in for an OpenTelemetry collector, answering slowly so sends are still under way at shutdown.
+    """
+
+    bodies: "list[dict]" = []
+    delay = 0.2
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.delay)
+        self.bodies.append(json.loads(body))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def collector():
+    Collector.bodies = []
+    server = HTTPServer(("127.0.0.1", 0), Collector)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/traces", Collector.bodies
+    server.shutdown()
+    server.server_close()
+
+
+def test_otlp_exporter(collector):
+    endpoint, bodies = collector
+    Tracer.configure(OTLP(endpoint, service="test", batch_size=2), sample_rate=1.0)
+
+    async def run():
+        with Tracer.trace("job", kind="consumer", id=7):
+            with Tracer.span("step", ok=True):
+                pass
+        # The batch is full, so it is already being sent, and close must wait for it
+        await Tracer.close()
+
+    io.run(run())
+
+    assert len(bodies) == 1
+    resource = bodies[0]["resourceSpans"][0]
+    assert resource["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "test"}}]
+    spans = {span["name"]: span for span in resource["scopeSpans"][0]["spans"]}
+    assert spans["step"]["parentSpanId"] == spans["job"]["spanId"]
+    assert spans["step"]["traceId"] == spans["job"]["traceId"]
+    assert spans["job"]["kind"] == 5
+    assert spans["job"]["attributes"] == [{"key": "id", "value": {"intValue": "7"}}]
+    assert spans["step"]["attributes"] == [{"key": "ok", "value": {"boolValue": True}}]
+    assert "parentSpanId" not in spans["job"]
+
+
+def test_otlp_close_sends_the_last_batch(collector):
+    endpoint, bodies = collector
+    Tracer.configure(OTLP(endpoint, batch_size=100), sample_rate=1.0)
+
+    async def run():
+        with Tracer.trace("job"):
+            pass
+        assert bodies == []
+        await Tracer.close()
+
+    io.run(run())
+    assert [span["name"] for span in bodies[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]] == ["job"]